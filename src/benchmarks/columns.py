@@ -0,0 +1,51 @@
+"""
+Benchmark collecting streamed responses into columns against converting each
+response to a dict, as unary_stream does.
+
+Both read the same TestResponse messages; the dicts are kept in a list, as a
+caller accumulating a stream would, and the memory held is reported with
+tracemalloc.
+
+Usage: python src/benchmarks/columns.py [message_count]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from grpc_requests.columns import ColumnCollector
+from grpc_requests.converters import get_message_to_dict_converter
+from tests.test_servers.client_tester.client_tester_pb2 import TestResponse
+
+
+def bench(collect, messages):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = collect(messages)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return elapsed, memory
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    messages = [
+        TestResponse(average=i / 7, feedback="Acceptable") for i in range(message_count)
+    ]
+    converter = get_message_to_dict_converter(
+        TestResponse, preserving_proto_field_name=True
+    )
+    collector = ColumnCollector(TestResponse.DESCRIPTOR, ["average"])
+    print(f"{message_count} messages, numpy columns: {collector.use_numpy}")
+    results = {
+        "dicts": bench(lambda m: [converter(message) for message in m], messages),
+        "columns": bench(lambda m: list(collector.collect(m)), messages),
+    }
+    for name, (elapsed, memory) in results.items():
+        print(f"{name:>8}: {elapsed * 1e3:.1f} ms, {memory / 2**20:.1f} MiB held")
+
+
+if __name__ == "__main__":
+    main()
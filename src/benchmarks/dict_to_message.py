@@ -0,0 +1,58 @@
+"""
+Benchmark the compiled dict to message converter against json_format.ParseDict.
+
+Both convert the same dicts into client_tester TestRequest messages: a small request
+with only scalar fields and a larger one carrying repeated floats and bytes.
+
+Usage: python src/benchmarks/dict_to_message.py [call_count]
+"""
+
+import sys
+import time
+
+from google.protobuf.json_format import ParseDict
+from grpc_requests.converters import get_dict_to_message_converter
+from tests.test_servers.client_tester.client_tester_pb2 import TestRequest
+
+REQUESTS = {
+    "scalars": {
+        "factor": 10,
+        "uuid": 1234567890,
+        "sample_flag": True,
+        "request_name": "benchmark",
+    },
+    "repeated": {
+        "factor": 10,
+        "readings": [float(i) / 3 for i in range(64)],
+        "uuid": "18446744073709551615",
+        "sample_flag": True,
+        "request_name": "benchmark",
+        "extra_data": ["YmVuY2htYXJr"] * 8,
+    },
+}
+
+
+def bench(convert, data, call_count):
+    start = time.perf_counter()
+    for _ in range(call_count):
+        convert(data)
+    return time.perf_counter() - start
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    converter = get_dict_to_message_converter(TestRequest)
+    print(f"{call_count} conversions")
+    for name, data in REQUESTS.items():
+        assert converter(data) == ParseDict(data, TestRequest())
+        parse_dict = bench(lambda d: ParseDict(d, TestRequest()), data, call_count)
+        compiled = bench(converter, data, call_count)
+        print(
+            f"{name:>8}: ParseDict {parse_dict / call_count * 1e6:.2f} us, "
+            f"compiled {compiled / call_count * 1e6:.2f} us "
+            f"({parse_dict / compiled:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
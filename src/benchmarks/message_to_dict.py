@@ -0,0 +1,62 @@
+"""
+Benchmark the compiled message to dict converter against json_format.MessageToDict.
+
+Both convert the same client_tester messages with preserving_proto_field_name=True,
+the options MessageParsers uses: a TestResponse, and a TestRequest carrying repeated
+floats, an unsigned 64 bit integer and repeated bytes.
+
+Usage: python src/benchmarks/message_to_dict.py [call_count]
+"""
+
+import sys
+import time
+
+from google.protobuf.json_format import MessageToDict
+from grpc_requests.converters import get_message_to_dict_converter
+from tests.test_servers.client_tester.client_tester_pb2 import TestRequest, TestResponse
+
+MESSAGES = {
+    "response": TestResponse(average=12.5, feedback="Acceptable"),
+    "repeated": TestRequest(
+        factor=10,
+        readings=[float(i) / 3 for i in range(64)],
+        uuid=18446744073709551615,
+        sample_flag=True,
+        request_name="benchmark",
+        extra_data=[b"benchmark"] * 8,
+    ),
+}
+
+
+def bench(convert, message, call_count):
+    start = time.perf_counter()
+    for _ in range(call_count):
+        convert(message)
+    return time.perf_counter() - start
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{call_count} conversions")
+    for name, message in MESSAGES.items():
+        converter = get_message_to_dict_converter(
+            type(message), preserving_proto_field_name=True
+        )
+        assert converter(message) == MessageToDict(
+            message, preserving_proto_field_name=True
+        )
+        generic = bench(
+            lambda m: MessageToDict(m, preserving_proto_field_name=True),
+            message,
+            call_count,
+        )
+        compiled = bench(converter, message, call_count)
+        print(
+            f"{name:>8}: MessageToDict {generic / call_count * 1e6:.2f} us, "
+            f"compiled {compiled / call_count * 1e6:.2f} us "
+            f"({generic / compiled:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark reading a few keys of responses converted eagerly and as MessageView dicts.
+
+Uses the wide response of response_fields.py, a total and 100 items of 200 fields,
+and reads the total, then the id of the second item, after converting it with
+json_format.MessageToDict, the compiled converter and the view converter. Dumping
+the whole response to JSON from the compiled dicts and from views is compared last.
+
+Usage: python src/benchmarks/message_view.py [call_count]
+"""
+
+import json
+import sys
+import time
+
+from benchmarks.response_fields import make_response, make_response_class
+from google.protobuf.json_format import MessageToDict
+from grpc_requests.converters import (
+    get_message_to_dict_converter,
+    get_message_view_converter,
+)
+
+
+def bench(read, message, call_count):
+    start = time.perf_counter()
+    for _ in range(call_count):
+        read(message)
+    return (time.perf_counter() - start) / call_count * 1e3
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    response_class = make_response_class()
+    response = make_response(response_class)
+    compiled = get_message_to_dict_converter(
+        response_class, preserving_proto_field_name=True
+    )
+    view = get_message_view_converter(response_class, preserving_proto_field_name=True)
+    assert view(response) == MessageToDict(response, preserving_proto_field_name=True)
+    print(f"{call_count} conversions of a response with 100 items of 200 fields")
+    converters = [
+        ("MessageToDict", lambda m: MessageToDict(m, preserving_proto_field_name=True)),
+        ("compiled", compiled),
+        ("view", view),
+    ]
+    for name, convert in converters:
+        total = bench(
+            lambda m, convert=convert: convert(m)["total"], response, call_count
+        )
+        item = bench(
+            lambda m, convert=convert: convert(m)["items"][1]["id"],
+            response,
+            call_count,
+        )
+        print(f"{name:>13}: total {total:.3f} ms, item id {item:.3f} ms")
+    for name, convert in converters[1:]:
+        dumped = bench(
+            lambda m, convert=convert: json.dumps(convert(m)), response, call_count
+        )
+        print(f"{name:>13}: json.dumps {dumped:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark the per call dispatch overhead of StubClient.request and MethodInvoker.
+
+The SayHello handler is replaced with a local function returning a canned reply, so
+no server is needed and only the client side work is measured: the previous request
+path (availability check, method meta lookup and parser properties on every call),
+the current request path (a cached invoker lookup) and a directly held invoker.
+
+Usage: python src/benchmarks/method_invoker.py [call_count]
+"""
+
+import sys
+import time
+
+from grpc_requests.client import MethodType, StubClient
+from tests.test_servers.helloworld.helloworld_pb2 import _GREETER, HelloReply
+
+SERVICE = "helloworld.Greeter"
+METHOD = "SayHello"
+
+
+def legacy_request(client, service, method, request=None, raw_output=False, **kwargs):
+    client.check_method_available(service, method, MethodType.UNARY_UNARY)
+    method_meta = client.get_method_meta(service, method)
+    _request = method_meta.request_parser(request, method_meta.input_type)
+    result = method_meta.handler(_request, **kwargs)
+    if raw_output:
+        return result
+    return method_meta.response_parser(result)
+
+
+def bench(call, call_count):
+    start = time.perf_counter()
+    for _ in range(call_count):
+        call()
+    return time.perf_counter() - start
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    # Connect to not a real server, the handler never leaves the process
+    client = StubClient("localhost:notaport", [_GREETER])
+    reply = HelloReply(message="Hello, sinsky!")
+    methods_meta = client._service_methods_meta[SERVICE]
+    methods_meta[METHOD] = methods_meta[METHOD]._replace(
+        handler=lambda request, **kwargs: reply
+    )
+    request = {"name": "sinsky"}
+    invoker = client.get_invoker(SERVICE, METHOD)
+
+    legacy = bench(lambda: legacy_request(client, SERVICE, METHOD, request), call_count)
+    requested = bench(lambda: client.request(SERVICE, METHOD, request), call_count)
+    invoked = bench(lambda: invoker(request), call_count)
+    print(f"{call_count} calls")
+    print(f"previous request path: {legacy / call_count * 1e6:.2f} us/call")
+    print(f"client.request:        {requested / call_count * 1e6:.2f} us/call")
+    print(f"invoker:               {invoked / call_count * 1e6:.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
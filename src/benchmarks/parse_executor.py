@@ -0,0 +1,73 @@
+"""
+Benchmark how long converting large responses blocks the event loop, with and
+without a parse executor.
+
+An async invoker calls a handler returning the wide response of the
+response_fields benchmark, while a ticker coroutine measures the longest gap
+between its wakeups, the latency every other coroutine would see.
+
+Usage: python src/benchmarks/parse_executor.py [call_count]
+"""
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.response_fields import make_response, make_response_class
+from grpc_requests.aio import MessageParsers, MethodInvoker, MethodMetaData, MethodType
+
+
+async def measure(invoker, call_count):
+    stalls = []
+    done = asyncio.Event()
+
+    async def tick():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0)
+            stalls.append(time.perf_counter() - start)
+
+    ticker = asyncio.ensure_future(tick())
+    start = time.perf_counter()
+    for _ in range(call_count):
+        await invoker({})
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker
+    return elapsed, max(stalls)
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    response_class = make_response_class()
+    response = make_response(response_class)
+
+    async def handler(request, **kwargs):
+        # receiving the response lets other coroutines run
+        await asyncio.sleep(0.001)
+        return response
+
+    method_meta = MethodMetaData(
+        input_type=response_class,
+        output_type=response_class,
+        method_type=MethodType.UNARY_UNARY,
+        handler=handler,
+        descriptor=None,
+        parsers=MessageParsers(),
+    )
+    print(f"{call_count} calls, responses of {response.ByteSize()} bytes")
+    with ThreadPoolExecutor(1) as executor:
+        for name, parse_executor in (("inline", None), ("executor", executor)):
+            invoker = MethodInvoker(
+                "Benchmark", "Call", method_meta, parse_executor=parse_executor
+            )
+            elapsed, stall = asyncio.run(measure(invoker, call_count))
+            print(
+                f"{name:>8}: {elapsed / call_count * 1e3:.1f} ms per call, "
+                f"longest event loop stall {stall * 1e3:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
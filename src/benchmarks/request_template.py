@@ -0,0 +1,57 @@
+"""
+Benchmark building requests from a template and a delta against building them whole.
+
+The request is a client_tester TestRequest carrying 1024 readings and 64 extra data
+entries, of which each call changes only the factor and the request name. It is built
+with json_format.ParseDict, with the compiled dict to message converter and from a
+RequestTemplate with a two field delta.
+
+Usage: python src/benchmarks/request_template.py [call_count]
+"""
+
+import sys
+import time
+
+from google.protobuf.json_format import ParseDict
+from grpc_requests.converters import get_dict_to_message_converter
+from grpc_requests.templates import RequestTemplate
+from tests.test_servers.client_tester.client_tester_pb2 import TestRequest
+
+REQUEST = {
+    "factor": 10,
+    "readings": [float(i) / 3 for i in range(1024)],
+    "uuid": "18446744073709551615",
+    "sample_flag": True,
+    "request_name": "benchmark",
+    "extra_data": ["YmVuY2htYXJr"] * 64,
+}
+DELTA = {"factor": 11, "request_name": "benchmark 11"}
+
+
+def bench(build, call_count):
+    start = time.perf_counter()
+    for _ in range(call_count):
+        build()
+    return (time.perf_counter() - start) / call_count * 1e6
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    converter = get_dict_to_message_converter(TestRequest)
+    template = RequestTemplate(ParseDict(REQUEST, TestRequest()))
+    full_request = {**REQUEST, **DELTA}
+    expected = ParseDict(full_request, TestRequest())
+    assert converter(full_request) == expected
+    assert template.build(DELTA) == expected
+
+    print(f"{call_count} requests")
+    for name, build in [
+        ("ParseDict", lambda: ParseDict(full_request, TestRequest())),
+        ("compiled", lambda: converter(full_request)),
+        ("template + delta", lambda: template.build(DELTA)),
+    ]:
+        print(f"{name:>16}: {bench(build, call_count):.1f} us")
+
+
+if __name__ == "__main__":
+    main()
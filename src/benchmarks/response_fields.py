@@ -0,0 +1,110 @@
+"""
+Benchmark converting a wide response with and without a field projection.
+
+The response is a dynamically built message holding 100 items of 200 fields each;
+only "items.id,items.price" is selected by the projection. The time and the peak
+memory allocated by a conversion are compared for json_format.MessageToDict, the
+compiled converter of the whole message and the projected converter.
+
+Usage: python src/benchmarks/response_fields.py [call_count]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from google.protobuf import descriptor_pb2, descriptor_pool
+from google.protobuf.json_format import MessageToDict
+from google.protobuf.message_factory import GetMessageClass
+from grpc_requests.converters import get_message_to_dict_converter
+
+FieldProto = descriptor_pb2.FieldDescriptorProto
+FIELD_COUNT = 200
+ITEM_COUNT = 100
+FIELDS = "items.id,items.price"
+
+
+def make_response_class():
+    file_descriptor = descriptor_pb2.FileDescriptorProto(
+        name="response_fields_benchmark.proto",
+        package="response_fields_benchmark",
+        syntax="proto3",
+    )
+    item = file_descriptor.message_type.add(name="Item")
+    item.field.add(name="id", number=1, type=FieldProto.TYPE_INT64)
+    item.field.add(name="price", number=2, type=FieldProto.TYPE_DOUBLE)
+    field_types = [FieldProto.TYPE_STRING, FieldProto.TYPE_INT32, FieldProto.TYPE_BOOL]
+    for number in range(3, FIELD_COUNT + 1):
+        item.field.add(
+            name=f"field_{number}",
+            number=number,
+            type=field_types[number % len(field_types)],
+        )
+    response = file_descriptor.message_type.add(name="Response")
+    response.field.add(
+        name="items",
+        number=1,
+        type=FieldProto.TYPE_MESSAGE,
+        type_name=".response_fields_benchmark.Item",
+        label=FieldProto.LABEL_REPEATED,
+    )
+    response.field.add(name="total", number=2, type=FieldProto.TYPE_INT64)
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_descriptor)
+    return GetMessageClass(
+        pool.FindMessageTypeByName("response_fields_benchmark.Response")
+    )
+
+
+def make_response(response_class):
+    response = response_class(total=ITEM_COUNT)
+    for index in range(ITEM_COUNT):
+        item = response.items.add(id=index, price=index * 1.25)
+        for number in range(3, FIELD_COUNT + 1):
+            value = [f"value {number}", number, True][number % 3]
+            setattr(item, f"field_{number}", value)
+    return response
+
+
+def bench(convert, message, call_count):
+    start = time.perf_counter()
+    for _ in range(call_count):
+        convert(message)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    convert(message)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / call_count * 1e3, peak / 1024
+
+
+def main():
+    call_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    response_class = make_response_class()
+    response = make_response(response_class)
+    compiled = get_message_to_dict_converter(
+        response_class, preserving_proto_field_name=True
+    )
+    projected = get_message_to_dict_converter(
+        response_class, fields=FIELDS, preserving_proto_field_name=True
+    )
+    full = MessageToDict(response, preserving_proto_field_name=True)
+    assert compiled(response) == full
+    assert projected(response) == {
+        "items": [
+            {key: item[key] for key in ("id", "price") if key in item}
+            for item in full["items"]
+        ]
+    }
+    print(f"{call_count} conversions of {ITEM_COUNT} items with {FIELD_COUNT} fields")
+    for name, convert in [
+        ("MessageToDict", lambda m: MessageToDict(m, preserving_proto_field_name=True)),
+        ("compiled", compiled),
+        (FIELDS, projected),
+    ]:
+        elapsed, peak = bench(convert, response, call_count)
+        print(f"{name:>20}: {elapsed:.2f} ms, peak {peak:.0f} KiB allocated")
+
+
+if __name__ == "__main__":
+    main()
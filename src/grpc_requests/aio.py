@@ -1,15 +1,24 @@
+import asyncio
 import logging
-from contextlib import suppress
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager, suppress
 from enum import Enum
-from functools import partial
 from typing import (
     Any,
+    AsyncGenerator,
     AsyncIterable,
+    Awaitable,
+    Callable,
+    Deque,
     Dict,
     Iterable,
     List,
+    Mapping,
     NamedTuple,
     Optional,
+    Set,
     Tuple,
     Union,
 )
@@ -31,12 +40,44 @@ from google.protobuf import (
 
 # noqa: E501
 from google.protobuf.descriptor import MethodDescriptor, ServiceDescriptor
-from google.protobuf.descriptor_pb2 import ServiceDescriptorProto
+from google.protobuf.descriptor_pb2 import MethodDescriptorProto
 from google.protobuf.json_format import MessageToDict, ParseDict
 from grpc_reflection.v1alpha import reflection_pb2, reflection_pb2_grpc
 
-from .client import CredentialsInfo
-from .utils import load_data
+from .client import CredentialsInfo, raw_request_bytes
+from .channels import (
+    DEFAULT_EJECT_AFTER_UNAVAILABLE,
+    DEFAULT_EJECTION_SECONDS,
+    AsyncChannelPool,
+    ChannelPicker,
+    pool_channel_options,
+)
+from .coalescing import RequestCoalescer
+from .client_cache import ClientCache, client_key, freeze_option
+from .columns import DEFAULT_BATCH_SIZE, get_column_collector
+from .converters import (
+    FieldPaths,
+    MessageToDictConverters,
+    get_dict_to_message_converter,
+)
+from .descriptor_cache import (
+    DescriptorCache,
+    add_cached_file_descriptors,
+    collect_file_descriptors,
+    service_names_from_file_descriptors,
+)
+from .fanout import DEFAULT_MAX_IN_FLIGHT, map_completed_async, map_ordered_async
+from .hedging import HedgingPolicy
+from .limiter import AdaptiveLimiter, EndpointLimiters
+from .retry import RetryPolicy
+from .schema import (
+    MethodSchema,
+    ServiceSchema,
+    fingerprint_service,
+    schema_registry,
+)
+from .templates import RequestTemplate, build_request_template
+from .utils import LazyMapping, load_data, sort_file_descriptors
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +117,88 @@ def reflection_request(channel, requests):
         logger.error(err)
 
 
+class ReflectionSession:
+    """
+    Carries many reflection requests over a single ServerReflectionInfo stream.
+
+    The stream is opened on first use. Responses arrive in the order requests were
+    written, so concurrent callers can pipeline requests on the same stream.
+    """
+
+    def __init__(self, reflection_stub):
+        self._reflection_stub = reflection_stub
+        self._call = None
+        self._pending: Deque[asyncio.Future] = deque()
+        self._write_lock = asyncio.Lock()
+        self._reader: Optional[asyncio.Future] = None
+
+    async def request(self, request):
+        response = asyncio.get_running_loop().create_future()
+        async with self._write_lock:
+            if self._call is None:
+                self._call = self._reflection_stub.ServerReflectionInfo()
+            self._pending.append(response)
+            try:
+                await self._call.write(request)
+            except BaseException:
+                self._pending.remove(response)
+                raise
+        if self._reader is None:
+            self._reader = asyncio.ensure_future(self._read_responses())
+        return await response
+
+    async def pipeline(self, requests):
+        """
+        Send all requests before awaiting their responses.
+
+        :param requests: ServerReflectionRequests to send.
+        :return: The ServerReflectionResponses, in request order.
+        """
+        return await asyncio.gather(*(self.request(request) for request in requests))
+
+    async def _read_responses(self):
+        try:
+            while self._pending:
+                result = await self._call.read()
+                if result is grpc.aio.EOF:
+                    raise ValueError(
+                        "reflection stream closed before all responses arrived"
+                    )
+                response = self._pending.popleft()
+                if not response.done():
+                    response.set_result(result)
+        except Exception as err:
+            while self._pending:
+                response = self._pending.popleft()
+                if not response.done():
+                    response.set_exception(err)
+        finally:
+            self._reader = None
+
+    async def close(self):
+        if self._call is None:
+            return
+        with suppress(Exception):
+            await self._call.done_writing()
+            await self._call.code()
+        self._call = None
+
+
+async def gather_with_concurrency(limit: int, awaitables: Iterable[Awaitable]):
+    """
+    Await the given awaitables with at most limit of them running at once.
+
+    :return: The results in the order the awaitables were given.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(*(run(awaitable) for awaitable in awaitables))
+
+
 class BaseAsyncClient:
     def __init__(
         self,
@@ -87,13 +210,33 @@ class BaseAsyncClient:
         compression=None,
         credentials: Optional[CredentialsInfo] = None,
         interceptors=None,
+        channel_pool_size: int = 1,
+        channel_picker: Union[str, ChannelPicker] = "round_robin",
+        eject_after_unavailable: int = DEFAULT_EJECT_AFTER_UNAVAILABLE,
+        ejection_seconds: float = DEFAULT_EJECTION_SECONDS,
         **kwargs,
     ):
+        """
+        :param endpoint: The address of the server, or a list of the addresses of
+            servers of the same services to balance calls over.
+        :param channel_pool_size: The number of channels calls to each endpoint are
+            spread over, each with its own connection; see ChannelPool.
+        :param channel_picker: The ChannelPicker choosing the channel of each call
+            of a pool, or the name of one: "round_robin", "least_outstanding",
+            "power_of_two" or "ewma".
+        :param eject_after_unavailable: The consecutive UNAVAILABLE calls ejecting a
+            channel of a pool until it is probed again, 0 to never eject channels.
+        :param ejection_seconds: The time an ejected channel waits for a probe.
+        """
         self.endpoint = endpoint
+        self.endpoints = [endpoint] if isinstance(endpoint, str) else list(endpoint)
+        if not self.endpoints:
+            raise ValueError("no endpoint to connect to")
         self._symbol_db = symbol_db or _symbol_database.Default()
         self._desc_pool = descriptor_pool or _descriptor_pool.Default()
         self.compression = compression
         self.channel_options = channel_options
+        channel_credentials = None
         if ssl:
             _credentials = {}
             if credentials:
@@ -101,22 +244,58 @@ class BaseAsyncClient:
                     k: load_data(v) if isinstance(v, str) else v
                     for k, v in credentials.items()
                 }
+            channel_credentials = grpc.ssl_channel_credentials(**_credentials)
 
-            self._channel = grpc.aio.secure_channel(
-                endpoint,
-                grpc.ssl_channel_credentials(**_credentials),
-                options=self.channel_options,
-                compression=self.compression,
-                interceptors=interceptors,
+        if channel_pool_size < 1:
+            raise ValueError(
+                f"channel_pool_size must be positive, got {channel_pool_size}"
+            )
+        if len(self.endpoints) == 1 and channel_pool_size == 1:
+            self._channel = self._create_channel(
+                self.endpoints[0],
+                channel_credentials,
+                self.channel_options,
+                interceptors,
             )
-
         else:
-            self._channel = grpc.aio.insecure_channel(
+            options = (
+                pool_channel_options(self.channel_options)
+                if channel_pool_size > 1
+                else self.channel_options
+            )
+            endpoints = [
+                endpoint
+                for endpoint in self.endpoints
+                for _ in range(channel_pool_size)
+            ]
+            self._channel = AsyncChannelPool(
+                [
+                    self._create_channel(
+                        endpoint, channel_credentials, options, interceptors
+                    )
+                    for endpoint in endpoints
+                ],
+                channel_picker,
+                endpoints,
+                eject_after_unavailable,
+                ejection_seconds,
+            )
+
+    def _create_channel(self, endpoint, channel_credentials, options, interceptors):
+        if channel_credentials is not None:
+            return grpc.aio.secure_channel(
                 endpoint,
-                options=self.channel_options,
+                channel_credentials,
+                options=options,
                 compression=self.compression,
                 interceptors=interceptors,
             )
+        return grpc.aio.insecure_channel(
+            endpoint,
+            options=options,
+            compression=self.compression,
+            interceptors=interceptors,
+        )
 
     @property
     def channel(self):
@@ -124,10 +303,12 @@ class BaseAsyncClient:
 
     @classmethod
     def get_by_endpoint(cls, endpoint: str, **kwargs):
-        global _cached_clients
-        if endpoint not in _cached_clients:
-            _cached_clients[endpoint] = cls(endpoint, **kwargs)
-        return _cached_clients[endpoint]
+        """
+        Get the cached client of an endpoint and options, creating it once.
+        """
+        return async_client_cache.get(
+            client_key(cls, endpoint, kwargs), lambda: cls(endpoint, **kwargs)
+        )
 
     async def __aenter__(self):
         return self
@@ -138,7 +319,7 @@ class BaseAsyncClient:
         return False
 
     def __del__(self):
-        if self._channel:
+        if getattr(self, "_channel", None):
             with suppress(Exception):
                 del self._channel
 
@@ -148,59 +329,116 @@ class MessageParsersProtocol(Protocol):
 
     def parse_stream_requests(self, stream_requests_data: Iterable, input_type): ...
 
-    async def parse_response(self, response): ...
+    async def parse_response(self, response, fields: Optional[FieldPaths] = None): ...
 
-    async def parse_stream_responses(self, responses: AsyncIterable): ...
+    async def parse_stream_responses(
+        self, responses: AsyncIterable, fields: Optional[FieldPaths] = None
+    ): ...
 
 
 class MessageParsers(MessageParsersProtocol):
+    def __init__(
+        self,
+        compiled_request_parser: bool = False,
+        compiled_response_parser: bool = False,
+        lazy_response_parser: bool = False,
+    ):
+        """
+        :param compiled_request_parser: Convert request dicts with converters compiled
+            per message type instead of json_format.ParseDict, with the same results.
+        :param compiled_response_parser: Convert responses with converters compiled
+            per message type instead of json_format.MessageToDict, with the same results.
+        :param lazy_response_parser: Return responses as read-only MessageView dicts,
+            which convert each field only when it is first read.
+        """
+        self._compiled_request_parser = compiled_request_parser
+        self._compiled_response_parser = (
+            compiled_response_parser or lazy_response_parser
+        )
+        self._response_converters = MessageToDictConverters(
+            lazy=lazy_response_parser, preserving_proto_field_name=True
+        )
+
     def parse_request_data(self, request_data, input_type):
         _data = request_data or {}
-        request = ParseDict(_data, input_type()) if isinstance(_data, dict) else _data
-        return request
+        if not isinstance(_data, dict):
+            return _data
+        if self._compiled_request_parser:
+            return get_dict_to_message_converter(input_type)(_data)
+        return ParseDict(_data, input_type())
 
     def parse_stream_requests(self, stream_requests_data: Iterable, input_type):
         for request_data in stream_requests_data:
             yield self.parse_request_data(request_data or {}, input_type)
 
-    async def parse_response(self, response):
+    def convert_response(self, response, fields: Optional[FieldPaths] = None):
+        if fields is not None or self._compiled_response_parser:
+            # field projections are only supported by the compiled converters
+            return self._response_converters.convert(response, fields)
         return MessageToDict(response, preserving_proto_field_name=True)
 
-    async def parse_stream_responses(self, responses: AsyncIterable):
+    async def parse_response(self, response, fields: Optional[FieldPaths] = None):
+        return self.convert_response(response, fields)
+
+    async def parse_stream_responses(
+        self, responses: AsyncIterable, fields: Optional[FieldPaths] = None
+    ):
         async for resp in responses:
-            yield await self.parse_response(resp)
+            yield await self.parse_response(resp, fields)
 
 
 class CustomArgumentParsers(MessageParsersProtocol):
-    _message_to_dict_kwargs: Optional[Dict[str, Any]]
-    _parse_dict_kwargs: Optional[Dict[str, Any]]
+    _message_to_dict_kwargs: Dict[str, Any]
+    _parse_dict_kwargs: Dict[str, Any]
 
     def __init__(
         self,
         message_to_dict_kwargs: Optional[Dict[str, Any]] = None,
         parse_dict_kwargs: Optional[Dict[str, Any]] = None,
+        compiled_request_parser: bool = False,
+        compiled_response_parser: bool = False,
+        lazy_response_parser: bool = False,
     ):
         self._message_to_dict_kwargs = message_to_dict_kwargs or {}
         self._parse_dict_kwargs = parse_dict_kwargs or {}
+        self._compiled_request_parser = compiled_request_parser
+        self._compiled_response_parser = (
+            compiled_response_parser or lazy_response_parser
+        )
+        self._response_converters = MessageToDictConverters(
+            lazy=lazy_response_parser, **self._message_to_dict_kwargs
+        )
 
     def parse_request_data(self, request_data, input_type):
         _data = request_data or {}
-        if isinstance(_data, dict):
-            request = ParseDict(_data, input_type(), **self._parse_dict_kwargs)
-        else:
+        if not isinstance(_data, dict):
             request = _data
+        elif self._compiled_request_parser:
+            request = get_dict_to_message_converter(input_type)(
+                _data, **self._parse_dict_kwargs
+            )
+        else:
+            request = ParseDict(_data, input_type(), **self._parse_dict_kwargs)
         return request
 
     def parse_stream_requests(self, stream_requests_data: Iterable, input_type):
         for request_data in stream_requests_data:
             yield self.parse_request_data(request_data or {}, input_type)
 
-    async def parse_response(self, response):
+    def convert_response(self, response, fields: Optional[FieldPaths] = None):
+        if fields is not None or self._compiled_response_parser:
+            # field projections are only supported by the compiled converters
+            return self._response_converters.convert(response, fields)
         return MessageToDict(response, **self._message_to_dict_kwargs)
 
-    async def parse_stream_responses(self, responses: AsyncIterable):
+    async def parse_response(self, response, fields: Optional[FieldPaths] = None):
+        return self.convert_response(response, fields)
+
+    async def parse_stream_responses(
+        self, responses: AsyncIterable, fields: Optional[FieldPaths] = None
+    ):
         async for resp in responses:
-            yield await self.parse_response(resp)
+            yield await self.parse_response(resp, fields)
 
 
 class MethodType(Enum):
@@ -249,6 +487,405 @@ MethodTypeMatch: Dict[Tuple[bool, bool], MethodType] = {
 }
 
 
+# responses and request dicts from this size in bytes are parsed in the parse
+# executor of a client, smaller ones are parsed inline
+DEFAULT_PARSE_OFFLOAD_THRESHOLD = 64 * 1024
+# the responses of a stream received and converted ahead of its reader when
+# responses are parsed in the parse executor
+STREAM_READ_AHEAD = 4
+
+
+def _estimate_request_size(request_data: dict) -> int:
+    # a cheap estimate from the top level values, never walking nested values
+    size = 0
+    for value in request_data.values():
+        if isinstance(value, (str, bytes)):
+            size += len(value)
+        elif isinstance(value, (list, dict)):
+            size += 8 * len(value)
+        else:
+            size += 8
+    return size
+
+
+class MethodInvoker:
+    """
+    Calls a single method with its handler, parsers and input type resolved up front,
+    so a call only parses the request, invokes the handler and parses the response.
+
+    Invokers are created by BaseAsyncGrpcClient.get_invoker, which validates the
+    method once.
+
+    Setting response_fields projects every response of the method onto the given
+    field paths, such as "items.id,items.price", so only those fields are converted;
+    a response_fields argument of a call takes precedence over it.
+
+    Raw bytes calls send already serialized requests and return the serialized
+    responses through a handler without serializers, skipping protobuf parsing and
+    dict conversion; they are the default of invokers of raw_bytes clients.
+
+    With a request template set, requests are deltas applied onto a copy of the
+    template, see RequestTemplate.
+
+    With a parse executor, request dicts and responses of at least the offload
+    threshold are parsed in the executor, so converting them does not block the
+    event loop; a large streamed response is converted while the next one is
+    received.
+    """
+
+    __slots__ = (
+        "service",
+        "method",
+        "method_meta",
+        "method_type",
+        "_handler",
+        "_input_type",
+        "_parse_request",
+        "_parse_response",
+        "_unary_response",
+        "response_fields",
+        "raw_bytes",
+        "_channel",
+        "_raw_handler",
+        "request_template",
+        "hedging",
+        "retry",
+        "coalescer",
+        "limiter",
+        "endpoint_limiters",
+        "_executor",
+        "_offload_threshold",
+        "_convert_response",
+    )
+
+    def __init__(
+        self,
+        service: str,
+        method: str,
+        method_meta: MethodMetaData,
+        channel=None,
+        raw_bytes: bool = False,
+        parse_executor: Optional[Executor] = None,
+        parse_offload_threshold: int = DEFAULT_PARSE_OFFLOAD_THRESHOLD,
+    ):
+        """
+        :param channel: The channel raw bytes handlers are created on.
+        :param raw_bytes: Whether method_meta.handler is a raw bytes handler, making
+            raw bytes calls the default.
+        :param parse_executor: The executor requests and responses of at least
+            parse_offload_threshold bytes are parsed in, instead of the event loop.
+        :param parse_offload_threshold: The size in bytes from which parsing runs in
+            parse_executor.
+        """
+        self.service = service
+        self.method = method
+        self.method_meta = method_meta
+        self.method_type = method_meta.method_type
+        self._handler = method_meta.handler
+        self._input_type = method_meta.input_type
+        self._parse_request = method_meta.request_parser
+        self._parse_response = method_meta.response_parser
+        self._unary_response = method_meta.method_type.is_unary_response
+        self.response_fields: Optional[FieldPaths] = None
+        self.raw_bytes = raw_bytes
+        self._channel = channel
+        self._raw_handler = method_meta.handler if raw_bytes else None
+        self.request_template: Optional[RequestTemplate] = None
+        self.hedging: Optional[HedgingPolicy] = None
+        self.retry: Optional[RetryPolicy] = None
+        self.coalescer: Optional[RequestCoalescer] = None
+        self.limiter: Optional[AdaptiveLimiter] = None
+        self.endpoint_limiters: Optional[EndpointLimiters] = None
+        self._executor = parse_executor
+        self._offload_threshold = parse_offload_threshold
+        # responses are only converted off the loop by parsers with a synchronous
+        # convert_response, others are parsed on the loop
+        self._convert_response: Optional[Callable] = (
+            getattr(method_meta.parsers, "convert_response", None)
+            if parse_executor is not None
+            else None
+        )
+
+    def set_request_template(self, template: Optional[RequestTemplate]):
+        """
+        Build the requests of every call from a template updated with the request
+        of the call as a delta, or from the request alone again with None.
+        """
+        self.request_template = template
+        if template is None:
+            self._parse_request = self.method_meta.request_parser
+        elif self.method_type.is_unary_request:
+            self._parse_request = template.parse_request_data
+        else:
+            self._parse_request = template.parse_stream_requests
+
+    def set_hedging_policy(self, policy: Optional[HedgingPolicy]):
+        """
+        Hedge the calls of the method with a HedgingPolicy, or stop hedging them
+        with None. Only unary unary methods are hedged, as the request of a call
+        is sent again.
+        """
+        if policy is not None and self.method_type != MethodType.UNARY_UNARY:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary unary methods can be hedged"
+            )
+        self.hedging = policy
+
+    def set_retry_policy(self, policy: Optional[RetryPolicy]):
+        """
+        Retry the failed calls of the method with a RetryPolicy, or stop retrying
+        them with None. Only unary unary methods are retried, as the request of a
+        call is sent again.
+        """
+        if policy is not None and self.method_type != MethodType.UNARY_UNARY:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary unary methods can be retried"
+            )
+        self.retry = policy
+
+    def _send(self, handler, request, kwargs) -> Awaitable:
+        # a unary unary call with the retry and hedging policies of the method
+        if self.retry is None:
+            return self._attempt(handler, request, kwargs)
+        return self.retry.call_async(
+            lambda attempt_kwargs: self._attempt(handler, request, attempt_kwargs),
+            kwargs,
+        )
+
+    def _attempt(self, handler, request, kwargs) -> Awaitable:
+        if self.hedging is None:
+            return handler(request, **kwargs)
+        return self.hedging.call_async(handler, request, kwargs)
+
+    def set_request_coalescer(self, coalescer: Optional[RequestCoalescer]):
+        """
+        Coalesce concurrent identical calls of the method with a RequestCoalescer,
+        or make every call with None. Only unary unary methods are coalesced.
+        """
+        if coalescer is not None and self.method_type != MethodType.UNARY_UNARY:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary unary methods can be coalesced"
+            )
+        self.coalescer = coalescer
+
+    def _unary_call(self, handler, request, raw: bool, kwargs) -> Awaitable:
+        # a call with the coalescer and the policies of the method, which are only
+        # set on unary unary methods
+        if self.coalescer is not None:
+            return self._coalesce(self.coalescer, handler, request, raw, kwargs)
+        if self.hedging is None and self.retry is None:
+            return handler(request, **kwargs)
+        return self._send(handler, request, kwargs)
+
+    def _coalesce(
+        self, coalescer: RequestCoalescer, handler, request, raw: bool, kwargs
+    ) -> Awaitable:
+        # raw bytes calls have responses of their own, they are never coalesced
+        # with message calls
+        request_bytes = (
+            request if raw else request.SerializeToString(deterministic=True)
+        )
+        return coalescer.call_async(
+            (self.service, self.method, raw, request_bytes, freeze_option(kwargs)),
+            lambda: self._send(handler, request, kwargs),
+        )
+
+    def set_concurrency_limiter(
+        self, limiter: Union[AdaptiveLimiter, EndpointLimiters, None]
+    ):
+        """
+        Make the calls of the method within the limit of an AdaptiveLimiter, or of
+        the limiters of the endpoints of its channel pool with EndpointLimiters, or
+        without a limit with None. Only unary response methods are limited.
+        """
+        if limiter is not None and not self._unary_response:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary response methods can be limited"
+            )
+        if isinstance(limiter, EndpointLimiters):
+            self.limiter = None
+            self.endpoint_limiters = limiter
+            self._handler = self.method_meta.handler.limited(limiter)
+        else:
+            self.limiter = limiter
+            self.endpoint_limiters = None
+            self._handler = self.method_meta.handler
+
+    def _get_raw_handler(self):
+        if self._raw_handler is None:
+            if self._channel is None:
+                raise ValueError(f"{self!r} has no channel for raw bytes calls")
+            self._raw_handler = getattr(self._channel, self.method_type.value)(
+                method=f"/{self.service}/{self.method}"
+            )
+        return self._raw_handler
+
+    async def _call_raw(self, request, **kwargs):
+        if self.method_type.is_unary_request:
+            request = raw_request_bytes(request)
+        else:
+            request = map(raw_request_bytes, request)
+        if self._unary_response:
+            handler = self._get_raw_handler()
+            if self.endpoint_limiters is not None:
+                handler = handler.limited(self.endpoint_limiters)
+            return await self._unary_call(handler, request, True, kwargs)
+        return self._get_raw_handler()(request, **kwargs)
+
+    def __call__(
+        self,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        # returns the coroutine of the call, made within the concurrency limit
+        # when the invoker has a limiter; endpoint limiters limit the handler
+        # calls instead
+        if self.limiter is None:
+            return self._call(request, raw_output, response_fields, raw_bytes, kwargs)
+        return self._call_limited(
+            request, raw_output, response_fields, raw_bytes, kwargs
+        )
+
+    async def _call_limited(
+        self, request, raw_output, response_fields, raw_bytes, kwargs
+    ):
+        limiter = self.limiter
+        await limiter.acquire()
+        start = time.monotonic()
+        try:
+            result = await self._call(
+                request, raw_output, response_fields, raw_bytes, kwargs
+            )
+        except grpc.RpcError as e:
+            limiter.release(time.monotonic() - start, e.code())
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.release(time.monotonic() - start, grpc.StatusCode.OK)
+        return result
+
+    async def _call(self, request, raw_output, response_fields, raw_bytes, kwargs):
+        if raw_bytes is None:
+            raw_bytes = self.raw_bytes
+        elif self.raw_bytes and not raw_bytes:
+            raise ValueError(f"{self!r} only supports raw bytes calls")
+        if raw_bytes:
+            return await self._call_raw(request, **kwargs)
+        if self._executor is None:
+            _request = self._parse_request(request, self._input_type)
+        else:
+            _request = await self._offload_request(request)
+        fields = self.response_fields if response_fields is None else response_fields
+        if self._unary_response:
+            result = await self._unary_call(self._handler, _request, False, kwargs)
+            if raw_output:
+                return result
+            convert = self._convert_response
+            if convert is not None:
+                return await self._offload_response(convert, result, fields)
+            if fields is None:
+                return await self._parse_response(result)
+            return await self._parse_response(result, fields)
+        return self._parse_stream_responses(self._handler(_request, **kwargs), fields)
+
+    def _parse_stream_responses(self, responses: AsyncIterable, fields):
+        convert = self._convert_response
+        if convert is not None:
+            return self._offload_stream_responses(convert, responses, fields)
+        if fields is None:
+            return self._parse_response(responses)
+        return self._parse_response(responses, fields)
+
+    async def _offload_request(self, request):
+        if (
+            isinstance(request, dict)
+            and _estimate_request_size(request) >= self._offload_threshold
+        ):
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._parse_request, request, self._input_type
+            )
+        return self._parse_request(request, self._input_type)
+
+    async def _offload_response(self, convert: Callable, response, fields):
+        if response.ByteSize() >= self._offload_threshold:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, convert, response, fields
+            )
+        return convert(response, fields)
+
+    async def _offload_stream_responses(
+        self, convert: Callable, responses: AsyncIterable, fields
+    ):
+        # responses are received by a task of their own while large ones are
+        # converted in the executor, so every response is yielded as soon as it
+        # and the responses before it are converted, without waiting for the next
+        # one to arrive
+        converted: "asyncio.Queue[Optional[asyncio.Future]]" = asyncio.Queue(
+            STREAM_READ_AHEAD
+        )
+        reader = asyncio.ensure_future(
+            self._read_stream_responses(convert, responses, fields, converted)
+        )
+        try:
+            while True:
+                response = await converted.get()
+                if response is None:
+                    break
+                yield await response
+        finally:
+            reader.cancel()
+            while not converted.empty():
+                response = converted.get_nowait()
+                if response is not None:
+                    response.cancel()
+
+    async def _read_stream_responses(
+        self,
+        convert: Callable,
+        responses: AsyncIterable,
+        fields,
+        converted: "asyncio.Queue[Optional[asyncio.Future]]",
+    ):
+        # puts the futures of the converted responses in the order they arrived,
+        # then None, or a future of the error of the call
+        loop = asyncio.get_running_loop()
+        try:
+            async for response in responses:
+                if response.ByteSize() >= self._offload_threshold:
+                    future = loop.run_in_executor(
+                        self._executor, convert, response, fields
+                    )
+                else:
+                    future = loop.create_future()
+                    future.set_result(convert(response, fields))
+                await converted.put(future)
+        except Exception as e:  # raised by the reader of the responses
+            failed = loop.create_future()
+            failed.set_exception(e)
+            await converted.put(failed)
+            return
+        await converted.put(None)
+
+    def call_stream(self, request=None, **kwargs):
+        """
+        Call a stream response method and return its response messages unparsed.
+        """
+        if self.raw_bytes:
+            raise ValueError(f"{self!r} only supports raw bytes calls")
+        return self._handler(self._parse_request(request, self._input_type), **kwargs)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} /{self.service}/{self.method}>"
+
+
 class BaseAsyncGrpcClient(BaseAsyncClient):
     def __init__(
         self,
@@ -260,8 +897,37 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
         compression=None,
         skip_check_method_available=False,
         message_parsers: Optional[MessageParsersProtocol] = None,
+        registration_concurrency: int = 10,
+        share_schema=False,
+        lazy_methods=False,
+        raw_bytes=False,
+        parse_executor: Optional[Executor] = None,
+        parse_offload_threshold: int = DEFAULT_PARSE_OFFLOAD_THRESHOLD,
+        concurrency_limiter: Optional[AdaptiveLimiter] = None,
+        per_method_limits=False,
+        retry_policy: Optional[RetryPolicy] = None,
+        request_coalescer: Optional[RequestCoalescer] = None,
         **kwargs,
     ):
+        """
+        :param parse_executor: A thread pool executor parsing request dicts and
+            responses of at least parse_offload_threshold bytes off the event loop.
+            Process pools are not supported, as message classes built from
+            reflection and compiled converters can not be pickled.
+        :param parse_offload_threshold: The size in bytes from which requests and
+            responses are parsed in parse_executor; smaller ones are parsed inline,
+            where a round trip through the executor would cost more than parsing.
+        :param concurrency_limiter: An AdaptiveLimiter limiting the unary response
+            calls in flight to the endpoint; clients of the same endpoint may share
+            it. A client of several endpoints limits each endpoint with a copy of
+            its own, see endpoint_limiters.
+        :param per_method_limits: Limit the calls of each method with a copy of
+            concurrency_limiter of its own instead.
+        :param retry_policy: A RetryPolicy retrying the failed calls of every unary
+            unary method, see set_retry_policy for a policy per method.
+        :param request_coalescer: A RequestCoalescer sharing one call between
+            concurrent identical calls of every unary unary method.
+        """
         super().__init__(
             endpoint,
             symbol_db,
@@ -270,12 +936,36 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
             compression=compression,
             **kwargs,
         )
+        if isinstance(parse_executor, ProcessPoolExecutor):
+            raise ValueError("parse_executor must be a thread pool, not a process pool")
         self._service_names: Optional[List] = None
+        self._service_names_fetch: Optional[asyncio.Future] = None
         self._lazy = lazy
         self.has_server_registered = False
         self._skip_check_method_available = skip_check_method_available
         self._message_parsers = message_parsers if message_parsers else MessageParsers()
-        self._service_methods_meta: Dict[str, Dict[str, MethodMetaData]] = {}
+        self._registration_concurrency = registration_concurrency
+        self._service_registrations: Dict[str, asyncio.Future] = {}
+        self._service_methods_meta: Dict[str, Mapping[str, MethodMetaData]] = {}
+        self._method_invokers: Dict[Tuple[str, str], MethodInvoker] = {}
+        self._share_schema = share_schema
+        self._lazy_methods = lazy_methods
+        self._raw_bytes = raw_bytes
+        self._parse_executor = parse_executor
+        self._parse_offload_threshold = parse_offload_threshold
+        self.concurrency_limiter = concurrency_limiter
+        # a client of several endpoints limits the calls to each endpoint with a
+        # copy of concurrency_limiter of its own
+        self.endpoint_limiters: Optional[EndpointLimiters] = (
+            EndpointLimiters(concurrency_limiter, self.endpoints)
+            if concurrency_limiter is not None and len(self.endpoints) > 1
+            else None
+        )
+        self._per_method_limits = per_method_limits
+        self.retry_policy = retry_policy
+        self.request_coalescer = request_coalescer
+        self._service_schemas: Dict[str, ServiceSchema] = {}
+        self._service_fingerprints: Dict[str, str] = {}
 
     @classmethod
     async def create(cls, endpoint: str, **kwargs) -> "BaseAsyncGrpcClient":
@@ -314,61 +1004,152 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
             )
         return True
 
-    def _register_methods(
-        self, service_descriptor: ServiceDescriptor
-    ) -> Dict[str, MethodMetaData]:
-        svc_desc_proto = ServiceDescriptorProto()
-        service_descriptor.CopyToProto(svc_desc_proto)
-        service_full_name = service_descriptor.full_name
-        metadata: Dict[str, MethodMetaData] = {}
-        for method_proto in svc_desc_proto.method:
-            method_name = method_proto.name
-            method_desc: MethodDescriptor = service_descriptor.methods_by_name[
-                method_name
-            ]
+    def _build_method_schema(self, method_desc: MethodDescriptor) -> MethodSchema:
+        method_proto = MethodDescriptorProto()
+        method_desc.CopyToProto(method_proto)
 
-            if get_message_class_supported:
-                input_type = GetMessageClass(method_desc.input_type)
-                output_type = GetMessageClass(method_desc.output_type)
-            else:
-                msg_factory = message_factory.MessageFactory(self._desc_pool)
-                input_type = msg_factory.GetPrototype(method_desc.input_type)
-                output_type = msg_factory.GetPrototype(method_desc.output_type)
+        if get_message_class_supported:
+            input_type = GetMessageClass(method_desc.input_type)
+            output_type = GetMessageClass(method_desc.output_type)
+        else:
+            msg_factory = message_factory.MessageFactory(self._desc_pool)
+            input_type = msg_factory.GetPrototype(method_desc.input_type)
+            output_type = msg_factory.GetPrototype(method_desc.output_type)
+
+        return MethodSchema(
+            input_type=input_type,
+            output_type=output_type,
+            descriptor=method_desc,
+            client_streaming=method_proto.client_streaming,
+            server_streaming=method_proto.server_streaming,
+        )
 
-            method_type = MethodTypeMatch[
-                (method_proto.client_streaming, method_proto.server_streaming)
-            ]
+    def _build_method_schemas(
+        self, service_descriptor: ServiceDescriptor
+    ) -> Mapping[str, MethodSchema]:
+        method_names = [method.name for method in service_descriptor.methods]
+        if self._lazy_methods:
+            return LazyMapping(
+                method_names,
+                lambda method_name: self._build_method_schema(
+                    service_descriptor.methods_by_name[method_name]
+                ),
+            )
+        return {
+            method_name: self._build_method_schema(
+                service_descriptor.methods_by_name[method_name]
+            )
+            for method_name in method_names
+        }
+
+    def _get_method_schemas(
+        self, service_descriptor: ServiceDescriptor
+    ) -> Mapping[str, MethodSchema]:
+        service_full_name = service_descriptor.full_name
+        schema = self._service_schemas.get(service_full_name)
+        if schema is None and self._share_schema:
+            schema = schema_registry.get_for_descriptor(service_descriptor)
+            if schema is None:
+                schema = schema_registry.register(
+                    ServiceSchema(
+                        fingerprint=self._service_fingerprints.get(service_full_name),
+                        descriptor=service_descriptor,
+                        methods=self._build_method_schemas(service_descriptor),
+                    )
+                )
+            self._service_schemas[service_full_name] = schema
+        if schema is not None:
+            return schema.methods
+        return self._build_method_schemas(service_descriptor)
+
+    def _build_method_meta(
+        self, service_full_name: str, method_name: str, method_schema: MethodSchema
+    ) -> MethodMetaData:
+        method_type = MethodTypeMatch[
+            (method_schema.client_streaming, method_schema.server_streaming)
+        ]
 
-            method_register_func = getattr(self.channel, method_type.value)
+        method_register_func = getattr(self.channel, method_type.value)
+        if self._raw_bytes:
+            # requests and responses pass through as serialized bytes
+            handler = method_register_func(
+                method=self._make_method_full_name(service_full_name, method_name)
+            )
+        else:
             handler = method_register_func(
                 method=self._make_method_full_name(service_full_name, method_name),
-                request_serializer=input_type.SerializeToString,
-                response_deserializer=output_type.FromString,
+                request_serializer=method_schema.input_type.SerializeToString,
+                response_deserializer=method_schema.output_type.FromString,
+            )
+        return MethodMetaData(
+            method_type=method_type,
+            input_type=method_schema.input_type,
+            output_type=method_schema.output_type,
+            handler=handler,
+            descriptor=method_schema.descriptor,
+            parsers=self._message_parsers,
+        )
+
+    def _register_methods(
+        self, service_descriptor: ServiceDescriptor
+    ) -> Mapping[str, MethodMetaData]:
+        service_full_name = service_descriptor.full_name
+        method_schemas = self._get_method_schemas(service_descriptor)
+        if self._lazy_methods:
+            return LazyMapping(
+                method_schemas,
+                lambda method_name: self._build_method_meta(
+                    service_full_name, method_name, method_schemas[method_name]
+                ),
             )
-            metadata[method_name] = MethodMetaData(
-                method_type=method_type,
-                input_type=input_type,
-                output_type=output_type,
-                handler=handler,
-                descriptor=method_desc,
-                parsers=self._message_parsers,
+        return {
+            method_name: self._build_method_meta(
+                service_full_name, method_name, method_schema
             )
-        return metadata
+            for method_name, method_schema in method_schemas.items()
+        }
 
     async def register_service(self, service_name):
         logger.debug(f"start {service_name} register")
         svc_desc = self.get_service_descriptor(service_name)
         self._service_methods_meta[service_name] = self._register_methods(svc_desc)
+        self._discard_invokers(service_name)
         logger.debug(f"end {service_name} register")
 
+    async def _register_service_once(self, service_name):
+        """
+        Register a service, sharing a single registration between concurrent callers.
+        """
+        registration = self._service_registrations.get(service_name)
+        if registration is None:
+            registration = asyncio.ensure_future(self.register_service(service_name))
+            self._service_registrations[service_name] = registration
+            registration.add_done_callback(
+                lambda _: self._service_registrations.pop(service_name, None)
+            )
+        await asyncio.shield(registration)
+
     async def register_all_service(self):
-        for service in await self.service_names():
-            await self.register_service(service)
+        await gather_with_concurrency(
+            self._registration_concurrency,
+            (
+                self._register_service_once(service)
+                for service in await self.service_names()
+            ),
+        )
         self.has_server_registered = True
 
     async def service_names(self):
         if self._service_names is None:
-            self._service_names = await self._get_service_names()
+            fetch = self._service_names_fetch
+            if fetch is None:
+                fetch = asyncio.ensure_future(self._get_service_names())
+                self._service_names_fetch = fetch
+            try:
+                self._service_names = await asyncio.shield(fetch)
+            finally:
+                if fetch.done() and self._service_names_fetch is fetch:
+                    self._service_names_fetch = None
         return self._service_names
 
     async def get_methods_meta(self, service_name: str):
@@ -380,7 +1161,7 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
             and service_name in await self.service_names()
             and service_name not in self._service_methods_meta
         ):
-            await self.register_service(service_name)
+            await self._register_service_once(service_name)
 
         try:
             return self._service_methods_meta[service_name]
@@ -391,55 +1172,440 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
     def _make_method_full_name(service: str, method: str):
         return f"/{service}/{method}"
 
-    async def _request(
-        self, service: str, method: str, request, raw_output=False, **kwargs
-    ):
+    def _discard_invokers(self, service_name: str):
+        for key in [key for key in self._method_invokers if key[0] == service_name]:
+            del self._method_invokers[key]
+
+    def _cache_invoker(
+        self, service: str, method: str, method_meta: MethodMetaData
+    ) -> MethodInvoker:
+        invoker = self._method_invokers.get((service, method))
+        if invoker is None:
+            invoker = MethodInvoker(
+                service,
+                method,
+                method_meta,
+                channel=self.channel,
+                raw_bytes=self._raw_bytes,
+                parse_executor=self._parse_executor,
+                parse_offload_threshold=self._parse_offload_threshold,
+            )
+            limiter = self.endpoint_limiters or self.concurrency_limiter
+            if limiter is not None and method_meta.method_type.is_unary_response:
+                invoker.set_concurrency_limiter(
+                    limiter.copy() if self._per_method_limits else limiter
+                )
+            if method_meta.method_type == MethodType.UNARY_UNARY:
+                invoker.retry = self.retry_policy
+                invoker.coalescer = self.request_coalescer
+            self._method_invokers[(service, method)] = invoker
+        return invoker
+
+    async def _get_cached_invoker(self, service: str, method: str) -> MethodInvoker:
         # does not check request is available
-        method_meta = await self.get_method_meta(service, method)
+        invoker = self._method_invokers.get((service, method))
+        if invoker is None:
+            method_meta = await self.get_method_meta(service, method)
+            invoker = self._cache_invoker(service, method, method_meta)
+        return invoker
 
-        _request = method_meta.request_parser(request, method_meta.input_type)
-        if method_meta.method_type.is_unary_response:
-            result = await method_meta.handler(_request, **kwargs)
+    def get_registered_invoker(self, service: str, method: str) -> MethodInvoker:
+        """
+        Get the invoker of a method of a registered service without awaiting: the
+        cached invoker, or one built from the registered methods meta. Unlike
+        get_invoker, the service is neither registered nor checked.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :return: The cached MethodInvoker of the method.
+        :raises ValueError: When the service is not registered or has no such
+            method.
+        """
+        invoker = self._method_invokers.get((service, method))
+        if invoker is not None:
+            return invoker
+        methods_meta = self._service_methods_meta.get(service)
+        if methods_meta is None or method not in methods_meta:
+            raise ValueError(f"{service} has no registered method {method}")
+        return self._cache_invoker(service, method, methods_meta[method])
 
-            if raw_output:
-                return result
-            else:
-                return await method_meta.response_parser(result)
-        else:
-            result = method_meta.handler(_request, **kwargs)
-            return method_meta.response_parser(result)
+    async def get_invoker(
+        self, service: str, method: str, method_type: Optional[MethodType] = None
+    ) -> MethodInvoker:
+        """
+        Get a callable bound to a single method, taking the request (or request
+        iterator), raw_output, response_fields, raw_bytes and the handler keyword
+        arguments of request.
+
+        The method is validated when its invoker is first created; later calls
+        reuse the cached invoker without awaiting registration or availability checks.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param method_type: Optional method type the method must have.
+        :return: The cached MethodInvoker of the method.
+        """
+        invoker = self._method_invokers.get((service, method))
+        if invoker is None:
+            await self.check_method_available(service, method, method_type)
+            return await self._get_cached_invoker(service, method)
+        if (
+            method_type
+            and method_type != invoker.method_type
+            and not self._skip_check_method_available
+        ):
+            raise ValueError(
+                f"{method} is {invoker.method_type.value} not {method_type.value}"
+            )
+        return invoker
+
+    async def set_request_template(
+        self,
+        service: str,
+        method: str,
+        template,
+        parse_dict_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> Optional[RequestTemplate]:
+        """
+        Register a request template for a method: the template is parsed once, and
+        the request of every later call of the method is a delta applied onto a copy
+        of it, see RequestTemplate. Stream request methods apply each request of
+        the stream onto the template.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param template: The template request as a dict or message, or None to
+            remove the template of the method.
+        :param parse_dict_kwargs: Keyword arguments of ParseDict for dict deltas.
+        :return: The RequestTemplate of the method, or None.
+        """
+        invoker = await self.get_invoker(service, method)
+        if template is None:
+            invoker.set_request_template(None)
+            return None
+        request_template = build_request_template(
+            template,
+            invoker.method_meta.input_type,
+            invoker.method_meta.parsers.parse_request_data,
+            parse_dict_kwargs,
+        )
+        invoker.set_request_template(request_template)
+        return request_template
+
+    async def set_hedging_policy(
+        self, service: str, method: str, policy: Optional[HedgingPolicy]
+    ) -> Optional[HedgingPolicy]:
+        """
+        Hedge the calls of an idempotent unary unary method, sending a second copy
+        of a request whose response is late and keeping the first successful
+        response, see HedgingPolicy.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param policy: The HedgingPolicy of the method, holding its hedge counters,
+            or None to stop hedging its calls.
+        :return: The policy.
+        """
+        invoker = await self.get_invoker(service, method, MethodType.UNARY_UNARY)
+        invoker.set_hedging_policy(policy)
+        return policy
+
+    async def set_retry_policy(
+        self, service: str, method: str, policy: Optional[RetryPolicy]
+    ) -> Optional[RetryPolicy]:
+        """
+        Retry the failed calls of an idempotent unary unary method with a policy
+        of its own, instead of the retry_policy of the client, see RetryPolicy.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param policy: The RetryPolicy of the method, holding its retry counters,
+            or None to stop retrying its calls.
+        :return: The policy.
+        """
+        invoker = await self.get_invoker(service, method, MethodType.UNARY_UNARY)
+        invoker.set_retry_policy(policy)
+        return policy
+
+    async def set_request_coalescer(
+        self, service: str, method: str, coalescer: Optional[RequestCoalescer]
+    ) -> Optional[RequestCoalescer]:
+        """
+        Coalesce concurrent identical calls of a unary unary method with a
+        coalescer of its own, instead of the request_coalescer of the client: calls
+        with the same request and keyword arguments as a call in flight share its
+        response, see RequestCoalescer.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param coalescer: The RequestCoalescer of the method, or None to make every
+            call of the method.
+        :return: The coalescer.
+        """
+        invoker = await self.get_invoker(service, method, MethodType.UNARY_UNARY)
+        invoker.set_request_coalescer(coalescer)
+        return coalescer
+
+    async def set_concurrency_limiter(
+        self, service: str, method: str, limiter: Optional[AdaptiveLimiter]
+    ) -> Union[AdaptiveLimiter, EndpointLimiters, None]:
+        """
+        Limit the calls in flight of a unary response method with a limiter of its
+        own, instead of the concurrency_limiter of the client.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param limiter: The AdaptiveLimiter of the method, or None to make its
+            calls without a limit.
+        :return: The limiter, or the EndpointLimiters copying it for each endpoint
+            of a client of several endpoints.
+        """
+        invoker = await self.get_invoker(service, method)
+        limits: Union[AdaptiveLimiter, EndpointLimiters, None] = limiter
+        if limiter is not None and len(self.endpoints) > 1:
+            limits = EndpointLimiters(limiter, self.endpoints)
+        invoker.set_concurrency_limiter(limits)
+        return limits
+
+    async def _request(
+        self,
+        service: str,
+        method: str,
+        request,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        # does not check request is available
+        invoker = await self._get_cached_invoker(service, method)
+        return await invoker(request, raw_output, response_fields, raw_bytes, **kwargs)
 
     async def request(
-        self, service: str, method: str, request=None, raw_output=False, **kwargs
+        self,
+        service: str,
+        method: str,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
     ):
-        await self.check_method_available(service, method)
-        return await self._request(service, method, request, raw_output, **kwargs)
+        """
+        Call a method of a service.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param request: The request dict or message, or an iterator of them for
+            stream request methods.
+        :param raw_output: Return the response messages instead of dicts.
+        :param response_fields: Optional field paths, such as "items.id,items.price",
+            to convert from the responses; other fields are left out of the dicts.
+        :param raw_bytes: Send the request as already serialized bytes (or memoryview)
+            and return the serialized responses, skipping protobuf parsing and dict
+            conversion. Defaults to the raw_bytes option of the client.
+        """
+        invoker = await self.get_invoker(service, method)
+        return await invoker(request, raw_output, response_fields, raw_bytes, **kwargs)
+
+    async def _mapped_call(
+        self, service: str, method: str, raw_output, response_fields, raw_bytes, kwargs
+    ):
+        invoker = await self.get_invoker(service, method)
+        if not invoker.method_type.is_unary_response:
+            raise ValueError(
+                f"{method} is {invoker.method_type.value}, "
+                "only unary response methods can be mapped"
+            )
+
+        def call(request):
+            return invoker(request, raw_output, response_fields, raw_bytes, **kwargs)
+
+        return call
+
+    async def gather(
+        self,
+        service: str,
+        method: str,
+        requests,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        return_exceptions=False,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ) -> list:
+        """
+        Call a unary response method with every request, with at most
+        max_in_flight calls in flight, and return the responses in the order of
+        the requests.
+
+        The method is resolved once for every call; the keyword arguments, such as
+        timeout and metadata, are passed to each call. Cancelling gather cancels
+        the calls in flight.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param requests: The requests, an iterable or async iterable, or request
+            iterators for stream request methods.
+        :param max_in_flight: The maximum number of calls in flight.
+        :param return_exceptions: Return the exceptions of failed calls in place
+            of their responses instead of raising the first one.
+        :return: The responses, converted like request converts them.
+        """
+        call = await self._mapped_call(
+            service, method, raw_output, response_fields, raw_bytes, kwargs
+        )
+        results = map_ordered_async(call, requests, max_in_flight, return_exceptions)
+        try:
+            return [response async for response in results]
+        finally:
+            # cancels the calls in flight when gather is cancelled or a call fails
+            await results.aclose()
+
+    async def as_completed(
+        self,
+        service: str,
+        method: str,
+        requests,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        return_exceptions=False,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ) -> AsyncGenerator[Tuple[int, Any], None]:
+        """
+        Call a unary response method with every request like gather, yielding
+        (index, response) pairs as the calls complete instead of building a list,
+        index being the position of the request.
+
+        Requests are read as calls are started, so very large batches are never
+        held in memory; closing the iterator early cancels the calls in flight.
+        """
+        call = await self._mapped_call(
+            service, method, raw_output, response_fields, raw_bytes, kwargs
+        )
+        results = map_completed_async(call, requests, max_in_flight, return_exceptions)
+        try:
+            async for item in results:
+                yield item
+        finally:
+            await results.aclose()
+
+    async def map_unordered(
+        self,
+        service: str,
+        method: str,
+        requests,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        return_exceptions=False,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ) -> AsyncGenerator[Any, None]:
+        """
+        Call a unary response method with every request like as_completed,
+        yielding the responses alone as the calls complete.
+        """
+        call = await self._mapped_call(
+            service, method, raw_output, response_fields, raw_bytes, kwargs
+        )
+        results = map_completed_async(call, requests, max_in_flight, return_exceptions)
+        try:
+            async for _, response in results:
+                yield response
+        finally:
+            await results.aclose()
 
     async def unary_unary(
-        self, service: str, method: str, request=None, raw_output=False, **kwargs
+        self,
+        service: str,
+        method: str,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
     ):
-        await self.check_method_available(service, method, MethodType.UNARY_UNARY)
-        return await self._request(service, method, request, raw_output, **kwargs)
+        invoker = await self.get_invoker(service, method, MethodType.UNARY_UNARY)
+        return await invoker(request, raw_output, response_fields, raw_bytes, **kwargs)
 
     async def unary_stream(
-        self, service: str, method: str, request=None, raw_output=False, **kwargs
+        self,
+        service: str,
+        method: str,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
     ):
-        await self.check_method_available(service, method, MethodType.UNARY_STREAM)
-        return await self._request(service, method, request, raw_output, **kwargs)
+        invoker = await self.get_invoker(service, method, MethodType.UNARY_STREAM)
+        return await invoker(request, raw_output, response_fields, raw_bytes, **kwargs)
 
     async def stream_unary(
-        self, service: str, method: str, requests, raw_output=False, **kwargs
+        self,
+        service: str,
+        method: str,
+        requests,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
     ):
-        await self.check_method_available(service, method, MethodType.STREAM_UNARY)
-        return await self._request(service, method, requests, raw_output, **kwargs)
+        invoker = await self.get_invoker(service, method, MethodType.STREAM_UNARY)
+        return await invoker(requests, raw_output, response_fields, raw_bytes, **kwargs)
 
     async def stream_stream(
-        self, service: str, method: str, requests, raw_output=False, **kwargs
+        self,
+        service: str,
+        method: str,
+        requests,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
     ):
-        await self.check_method_available(service, method, MethodType.STREAM_STREAM)
-        return await self._request(service, method, requests, raw_output, **kwargs)
+        invoker = await self.get_invoker(service, method, MethodType.STREAM_STREAM)
+        return await invoker(requests, raw_output, response_fields, raw_bytes, **kwargs)
+
+    async def collect_columns(
+        self,
+        service: str,
+        method: str,
+        fields,
+        request=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        use_numpy=None,
+        **kwargs,
+    ):
+        """
+        Call a stream response method and collect fields of its responses into
+        typed columns instead of a dict per response, see ColumnCollector.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param fields: Scalar field paths of the columns, such as "id,price".
+        :param request: The request dict or message, or an iterator of them for
+            stream request methods.
+        :param batch_size: The number of responses of each batch of columns.
+        :param use_numpy: Build numpy arrays, defaults to whether numpy is installed.
+        :return: An async iterator of batches, dicts of columns by field path.
+        """
+        invoker = await self.get_invoker(service, method)
+        if invoker.method_type.is_unary_response:
+            raise ValueError(f"{method} is {invoker.method_type.value}, not a stream")
+        collector = get_column_collector(
+            invoker.method_meta.output_type.DESCRIPTOR, fields, batch_size, use_numpy
+        )
+        return collector.collect_async(invoker.call_stream(request, **kwargs))
 
     def get_service_descriptor(self, service):
+        schema = self._service_schemas.get(service)
+        if schema is not None:
+            return schema.descriptor
         return self._desc_pool.FindServiceByName(service)
 
     def get_method_descriptor(self, service: str, method: str):
@@ -456,7 +1622,7 @@ class BaseAsyncGrpcClient(BaseAsyncClient):
             and service in await self.service_names()
             and service not in self._service_methods_meta
         ):
-            await self.register_service(service)
+            await self._register_service_once(service)
 
         return self._service_methods_meta[service][method]
 
@@ -490,6 +1656,7 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         ssl=False,
         compression=None,
         message_parsers: Optional[MessageParsersProtocol] = None,
+        descriptor_cache: Optional[DescriptorCache] = None,
         **kwargs,
     ):
         super().__init__(
@@ -503,6 +1670,13 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
             **kwargs,
         )
         self.reflection_stub = reflection_pb2_grpc.ServerReflectionStub(self.channel)
+        self._reflection_session: Optional[ReflectionSession] = None
+        self._reflection_session_users = 0
+        self._file_descriptor_fetches: Dict[str, asyncio.Future] = {}
+        self._descriptor_cache = descriptor_cache
+        self._loaded_from_descriptor_cache = (
+            self._load_descriptor_cache() if descriptor_cache else False
+        )
 
     @classmethod
     async def create(cls, endpoint: str, **kwargs) -> "ReflectionAsyncClient":
@@ -514,9 +1688,64 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         responses = self.reflection_stub.ServerReflectionInfo((r for r in requests))
         return responses
 
+    def _load_descriptor_cache(self):
+        file_descriptors = self._descriptor_cache.load(",".join(self.endpoints))
+        if file_descriptors is None:
+            return False
+        if not add_cached_file_descriptors(self._desc_pool, file_descriptors):
+            return False
+        self._service_names = tuple(
+            service_names_from_file_descriptors(file_descriptors)
+        )
+        logger.debug(f"loaded {self.endpoint} descriptors from cache")
+        return True
+
+    async def _store_descriptor_cache(self):
+        file_descriptors = [
+            self.get_service_descriptor(service_name).file
+            for service_name in await self.service_names()
+            if self._is_service_registered(service_name)
+        ]
+        self._descriptor_cache.store(
+            ",".join(self.endpoints), collect_file_descriptors(file_descriptors)
+        )
+
+    @asynccontextmanager
+    async def reflection_session(self):
+        """
+        Keep a single reflection stream open for every reflection request made by
+        this client within the context. Concurrent and nested sessions share the
+        stream, which is closed when the last of them exits.
+        """
+        if self._reflection_session is None:
+            self._reflection_session = ReflectionSession(self.reflection_stub)
+        session = self._reflection_session
+        self._reflection_session_users += 1
+        try:
+            yield session
+        finally:
+            self._reflection_session_users -= 1
+            if self._reflection_session_users == 0:
+                self._reflection_session = None
+                await session.close()
+
+    async def _reflection_pipeline(self, requests):
+        async with self.reflection_session() as session:
+            return await gather_with_concurrency(
+                self._registration_concurrency,
+                (session.request(request) for request in requests),
+            )
+
     async def _reflection_single_request(self, request):
-        async for result in self._reflection_request(request):
-            return result
+        async with self.reflection_session() as session:
+            return await session.request(request)
+
+    @staticmethod
+    def _file_descriptors_from_response(response):
+        return [
+            descriptor_pb2.FileDescriptorProto.FromString(proto)
+            for proto in response.file_descriptor_response.file_descriptor_proto
+        ]
 
     async def _get_service_names(self):
         request = reflection_pb2.ServerReflectionRequest(list_services="")
@@ -527,17 +1756,55 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
     async def get_file_descriptors_by_name(self, name):
         request = reflection_pb2.ServerReflectionRequest(file_by_filename=name)
         result = await self._reflection_single_request(request)
-        return [
-            descriptor_pb2.FileDescriptorProto.FromString(proto)
-            for proto in result.file_descriptor_response.file_descriptor_proto
-        ]
+        return self._file_descriptors_from_response(result)
 
     async def get_file_descriptors_by_symbol(self, symbol):
         request = reflection_pb2.ServerReflectionRequest(file_containing_symbol=symbol)
         result = await self._reflection_single_request(request)
+        return self._file_descriptors_from_response(result)
+
+    async def _get_file_descriptors_by_name_once(self, name):
+        """
+        Fetch file descriptors by name, sharing a single request between concurrent
+        registrations that depend on the same file.
+        """
+        fetch = self._file_descriptor_fetches.get(name)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self.get_file_descriptors_by_name(name))
+            self._file_descriptor_fetches[name] = fetch
+            fetch.add_done_callback(
+                lambda _: self._file_descriptor_fetches.pop(name, None)
+            )
+        return await asyncio.shield(fetch)
+
+    async def get_file_descriptors_by_names(self, names):
+        """
+        Pipeline file_by_filename requests for several files over one stream.
+        Requests for files already being fetched by a concurrent registration are shared.
+
+        :param names: The file names to look up.
+        :return: A list of FileDescriptorProto lists, one per name in the given order.
+        """
+        async with self.reflection_session():
+            return await gather_with_concurrency(
+                self._registration_concurrency,
+                (self._get_file_descriptors_by_name_once(name) for name in names),
+            )
+
+    async def get_file_descriptors_by_symbols(self, symbols):
+        """
+        Pipeline file_containing_symbol requests for several symbols over one stream.
+
+        :param symbols: The symbols to look up.
+        :return: A list of FileDescriptorProto lists, one per symbol in the given order.
+        """
+        requests = [
+            reflection_pb2.ServerReflectionRequest(file_containing_symbol=symbol)
+            for symbol in symbols
+        ]
         return [
-            descriptor_pb2.FileDescriptorProto.FromString(proto)
-            for proto in result.file_descriptor_response.file_descriptor_proto
+            self._file_descriptors_from_response(result)
+            for result in await self._reflection_pipeline(requests)
         ]
 
     def _is_descriptor_registered(self, filename):
@@ -552,44 +1819,56 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         self, file_descriptors: List[descriptor_pb2.FileDescriptorProto]
     ):
         """
-        Iterate over descriptors for registration, including returned descriptors as possible dependencies.
-        This is necessary as while in practice descriptors appear to be returned in an order that works for dependency
-        registration, this is not guaranteed in the reflection specification.
+        Register descriptors, including returned descriptors as possible dependencies.
+        The descriptors are indexed by name and added to the pool in dependency order,
+        as while in practice descriptors appear to be returned in an order that works for
+        dependency registration, this is not guaranteed in the reflection specification.
+        Dependencies that are neither passed in nor registered are requested in one batch.
         :param file_descriptors: List of FileDescriptorProto to register
         """
+        file_descriptors_by_name: Dict[str, descriptor_pb2.FileDescriptorProto] = {}
         for file_descriptor in file_descriptors:
-            await self._register_file_descriptor(file_descriptor, file_descriptors)
-
-    async def _register_file_descriptor(self, file_descriptor, file_descriptors):
-        if not self._is_descriptor_registered(file_descriptor.name):
-            logger.debug(f"start {file_descriptor.name} register")
-            dependencies = list(file_descriptor.dependency)
-            logger.debug(
-                f"found {len(dependencies)} dependencies for {file_descriptor.name}"
-            )
-            for dep_file_name in dependencies:
-                if not self._is_descriptor_registered(dep_file_name):
-                    # First look for dependency in the passed in descriptors
-                    dep_desc = next(
-                        (x for x in file_descriptors if x.name == dep_file_name), None
-                    )
-                    # Otherwise get it from the client
-                    if not dep_desc:
-                        dep_descs = await self.get_file_descriptors_by_name(
-                            dep_file_name
-                        )
-                        dep_desc = dep_descs[0]
-                        if len(dep_descs) > 1:
-                            file_descriptors += dep_descs[1:]
-                    # Remove the one we are looking for and use the rest as dependencies
-                    await self._register_file_descriptor(dep_desc, file_descriptors)
-            try:
-                self._desc_pool.Add(file_descriptor)
-            except TypeError:
-                logger.debug(
-                    f"{file_descriptor.name} already present in pool. Skipping."
-                )
-            logger.debug(f"{file_descriptor.name} registration complete")
+            file_descriptors_by_name.setdefault(file_descriptor.name, file_descriptor)
+
+        requested: Set[str] = set()
+        missing = self._missing_dependencies(file_descriptors_by_name)
+        while missing:
+            unresolved = requested.intersection(missing)
+            if unresolved:
+                raise ValueError(f"can not resolve dependencies {sorted(unresolved)}")
+            logger.debug(f"requesting missing dependencies {missing}")
+            requested.update(missing)
+            for dep_descs in await self.get_file_descriptors_by_names(missing):
+                for dep_desc in dep_descs:
+                    file_descriptors_by_name.setdefault(dep_desc.name, dep_desc)
+            missing = self._missing_dependencies(file_descriptors_by_name)
+
+        for file_descriptor in sort_file_descriptors(file_descriptors_by_name):
+            self._add_file_descriptor(file_descriptor)
+
+    def _missing_dependencies(
+        self, file_descriptors_by_name: Dict[str, descriptor_pb2.FileDescriptorProto]
+    ) -> List[str]:
+        missing: Dict[str, None] = {}
+        for file_descriptor in file_descriptors_by_name.values():
+            if self._is_descriptor_registered(file_descriptor.name):
+                continue
+            for dep_file_name in file_descriptor.dependency:
+                if dep_file_name not in file_descriptors_by_name and (
+                    not self._is_descriptor_registered(dep_file_name)
+                ):
+                    missing[dep_file_name] = None
+        return list(missing)
+
+    def _add_file_descriptor(self, file_descriptor):
+        if self._is_descriptor_registered(file_descriptor.name):
+            return
+        logger.debug(f"start {file_descriptor.name} register")
+        try:
+            self._desc_pool.Add(file_descriptor)
+        except TypeError:
+            logger.debug(f"{file_descriptor.name} already present in pool. Skipping.")
+        logger.debug(f"{file_descriptor.name} registration complete")
 
     def _is_service_registered(self, service_name):
         try:
@@ -599,14 +1878,55 @@ class ReflectionAsyncClient(BaseAsyncGrpcClient):
         except KeyError:
             return False
 
+    async def _register_service_files(self, service_names):
+        """
+        Reflect the files of several services in one pipelined batch and register them
+        in the given service order. When sharing schemas, services whose reflected files
+        match an already known schema reuse it instead of registering the files.
+        """
+        requests = [
+            reflection_pb2.ServerReflectionRequest(file_containing_symbol=service_name)
+            for service_name in service_names
+        ]
+        responses = await self._reflection_pipeline(requests)
+        for service_name, response in zip(service_names, responses):
+            if self._share_schema:
+                fingerprint = fingerprint_service(
+                    service_name,
+                    response.file_descriptor_response.file_descriptor_proto,
+                )
+                schema = schema_registry.get(fingerprint)
+                if schema is not None:
+                    logger.debug(f"{service_name} reuses a shared schema")
+                    self._service_schemas[service_name] = schema
+                    continue
+                self._service_fingerprints[service_name] = fingerprint
+            await self.register_file_descriptors(
+                self._file_descriptors_from_response(response)
+            )
+
     async def register_service(self, service_name):
         if not self._is_service_registered(service_name):
             logger.debug(f"start {service_name} registration")
-            file_descriptors = await self.get_file_descriptors_by_symbol(service_name)
-            await self.register_file_descriptors(file_descriptors)
+            async with self.reflection_session():
+                await self._register_service_files([service_name])
             logger.debug(f"{service_name} registration complete")
         await super(ReflectionAsyncClient, self).register_service(service_name)
 
+    async def register_all_service(self):
+        async with self.reflection_session():
+            await self._register_service_files(
+                [
+                    service_name
+                    for service_name in await self.service_names()
+                    if not self._is_service_registered(service_name)
+                ]
+            )
+            await super(ReflectionAsyncClient, self).register_all_service()
+        if self._descriptor_cache and not self._loaded_from_descriptor_cache:
+            await self._store_descriptor_cache()
+            self._loaded_from_descriptor_cache = True
+
 
 class StubAsyncClient(BaseAsyncGrpcClient):
     def __init__(
@@ -646,14 +1966,34 @@ class ServiceClient:
         self.client = client
         self.name = service_name
 
-    def _register_methods(self):
-        for method in self._method_names:
-            setattr(self, method, partial(self.client.request, self.name, method))
-
     async def register(self):
         self._methods_meta = await self.client.get_methods_meta(self.name)
         self._method_names = tuple(self._methods_meta.keys())
-        self._register_methods()
+
+    def __getattr__(self, name):
+        # methods resolve to the cached invokers of the client on every access,
+        # rather than being bound once, as registering the service again
+        # replaces them; invokers are built from the registered methods meta, so
+        # calls never await the client's checks
+        if name.startswith("_") or name not in self._method_names:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            )
+        return self.client.get_registered_invoker(self.name, name)
+
+    async def set_request_template(
+        self,
+        method: str,
+        template,
+        parse_dict_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> Optional[RequestTemplate]:
+        """
+        Register a request template for a method of the service, making the
+        requests of its calls deltas, see BaseAsyncGrpcClient.set_request_template.
+        """
+        return await self.client.set_request_template(
+            self.name, method, template, parse_dict_kwargs
+        )
 
     @classmethod
     async def create(cls, client: BaseAsyncGrpcClient, service_name: str):
@@ -672,27 +2012,45 @@ class ServiceClient:
 
 AsyncClient = ReflectionAsyncClient
 
-_cached_clients: Dict[
-    str, Union[BaseAsyncClient, StubAsyncClient, ReflectionAsyncClient]
-] = {}
+
+# the tasks closing the channels of evicted clients, which the event loop only
+# holds weakly
+_closing_channels: Set[asyncio.Task] = set()
+
+
+def _channel_closed(task: asyncio.Task):
+    _closing_channels.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("can not close channel", exc_info=task.exception())
+
+
+def _close_cached_client(client):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # grpc.aio channels are closed by their event loop, which is gone
+        logger.debug("no running event loop to close the channel of %s", client)
+        return
+    task = loop.create_task(client.channel.close())
+    _closing_channels.add(task)
+    task.add_done_callback(_channel_closed)
+
+
+# clients of get_by_endpoint, keyed by their class, endpoint and options
+async_client_cache = ClientCache(_close_cached_client)
 
 
 def get_by_endpoint(endpoint, service_descriptors=None, **kwargs) -> AsyncClient:
-    global _cached_clients
-    if endpoint not in _cached_clients:
-        if service_descriptors:
-            _cached_clients[endpoint] = StubAsyncClient(
-                endpoint, service_descriptors=service_descriptors, **kwargs
-            )
-        else:
-            _cached_clients[endpoint] = AsyncClient(endpoint, **kwargs)
-    return _cached_clients[endpoint]  # type: ignore[return-value]
+    if service_descriptors:
+        return StubAsyncClient.get_by_endpoint(  # type: ignore[return-value]
+            endpoint, service_descriptors=service_descriptors, **kwargs
+        )
+    return AsyncClient.get_by_endpoint(endpoint, **kwargs)
 
 
 def reset_cached_async_client(endpoint=None):
-    global _cached_clients
-    if endpoint:
-        if endpoint in _cached_clients:
-            del _cached_clients[endpoint]
-    else:
-        _cached_clients = {}
+    """
+    Forget the cached clients of an endpoint, or every cached client, without
+    closing their channels.
+    """
+    async_client_cache.remove(endpoint)
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+DEFAULT_CONCURRENCY = 16
+# requests read and parsed at once off the event loop by async runs
+DEFAULT_CHUNK_SIZE = 256
+# records joined into a single write of the output
+WRITE_BATCH_SIZE = 256
+
+Requests = Union[str, os.PathLike, Iterable[str]]
+Output = Union[str, os.PathLike, IO[str]]
+
+
+class BulkResult(NamedTuple):
+    total: int
+    succeeded: int
+    failed: int
+    elapsed: float
+
+
+def _describe_error(error: Exception) -> dict:
+    code = getattr(error, "code", None)
+    details = getattr(error, "details", None)
+    if callable(code) and callable(details):
+        # the grpc.RpcError of failed calls, grpc.aio.AioRpcError in async calls
+        return {"code": code().name, "message": details()}
+    return {"code": type(error).__name__, "message": str(error)}
+
+
+def _dump_record(index: int, response=None, error=None) -> str:
+    if error is not None:
+        record = {"index": index, "error": _describe_error(error)}
+    else:
+        record = {"index": index, "response": response}
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _request_lines(lines: Iterable[str]) -> Iterator[str]:
+    return (line for line in lines if line.strip())
+
+
+@contextmanager
+def _open_requests(requests: Requests):
+    if isinstance(requests, (str, os.PathLike)):
+        with open(requests, encoding="utf8") as lines:
+            yield _request_lines(lines)
+    else:
+        yield _request_lines(requests)
+
+
+class _RecordWriter:
+    """
+    Writes output records in batches, counting the succeeded and failed requests.
+    """
+
+    def __init__(self, output: Output):
+        self._output = output
+        self._file = None
+        self._records: List[str] = []
+        self.succeeded = 0
+        self.failed = 0
+
+    def __enter__(self):
+        if isinstance(self._output, (str, os.PathLike)):
+            self._file = open(self._output, "w", encoding="utf8")
+        else:
+            self._file = self._output
+        return self
+
+    def write(self, result: Tuple[bool, str]):
+        succeeded, record = result
+        if succeeded:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self._records.append(record)
+        if len(self._records) >= WRITE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        self._file.write("".join(self._records))
+        self._records = []
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+        if self._file is not self._output:
+            self._file.close()
+        else:
+            self._file.flush()
+        return False
+
+
+def _call(invoker, kwargs, index: int, line: str) -> Tuple[bool, str]:
+    try:
+        response = invoker(json.loads(line), **kwargs)
+        if not invoker.method_type.is_unary_response:
+            response = list(response)
+        record = _dump_record(index, response)
+    except Exception as e:  # every failed request gets an error record
+        return False, _dump_record(index, error=e)
+    return True, record
+
+
+def _start_call(
+    executor, invoker, kwargs, index: int, line: str, record: Future
+) -> None:
+    # parses the request and starts the call on a worker, the record of the call
+    # is built on a worker once it ends, so no thread waits for the call
+    try:
+        call = invoker.future(json.loads(line), **kwargs)
+    except Exception as e:  # every failed request gets an error record
+        record.set_result((False, _dump_record(index, error=e)))
+        return
+    call.add_done_callback(
+        lambda call: executor.submit(_finish_call, index, call, record)
+    )
+
+
+def _finish_call(index: int, call, record: Future) -> None:
+    try:
+        response = call.result()
+    except Exception as e:  # every failed request gets an error record
+        record.set_result((False, _dump_record(index, error=e)))
+        return
+    record.set_result((True, _dump_record(index, response)))
+
+
+def _submit_call(executor, invoker, kwargs, index: int, line: str) -> Future:
+    record: Future = Future()
+    executor.submit(_start_call, executor, invoker, kwargs, index, line, record)
+    return record
+
+
+def _submit_blocking_call(executor, invoker, kwargs, index: int, line: str) -> Future:
+    return executor.submit(_call, invoker, kwargs, index, line)
+
+
+def run_bulk(
+    client,
+    service: str,
+    method: str,
+    requests: Requests,
+    output: Output,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    ordered: bool = True,
+    workers: Optional[int] = None,
+    **kwargs,
+) -> BulkResult:
+    """
+    Call a method with every request of a JSONL input, and write a JSONL record of
+    each call: {"index": ..., "response": ...} or {"index": ..., "error": {"code":
+    ..., "message": ...}}, where index is the position of the request in the input.
+
+    Requests are streamed from the input, with at most concurrency requests in
+    flight. Unary response methods are called with the futures of the invoker: a
+    pool of workers threads parses the requests, starts the calls and converts
+    the responses, so the number of threads does not depend on concurrency.
+    Stream response methods have no futures, each of their calls holds one of a
+    pool of concurrency threads until its responses are read. Stream request
+    methods take a JSON list of requests per line, and stream response methods
+    write the list of their responses.
+
+    :param client: The client calling the method.
+    :param service: The name of the service.
+    :param method: The name of the method.
+    :param requests: The path of a JSONL file, or an iterable of JSON lines.
+    :param output: The path of the output JSONL file, or a writable text file.
+    :param concurrency: The maximum number of requests in flight.
+    :param ordered: Write the records in input order, otherwise as calls complete.
+    :param workers: The threads parsing the requests and converting the responses
+        of unary response methods, None for the ThreadPoolExecutor default.
+    :return: A BulkResult counting the requests.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be positive, got {concurrency}")
+    invoker = client.get_invoker(service, method)
+    start = time.perf_counter()
+    run = _run_ordered if ordered else _run_unordered
+    if invoker.method_type.is_unary_response:
+        executor = ThreadPoolExecutor(workers)
+        submit = partial(_submit_call, executor, invoker, kwargs)
+    else:
+        executor = ThreadPoolExecutor(concurrency)
+        submit = partial(_submit_blocking_call, executor, invoker, kwargs)
+    with _open_requests(requests) as lines, _RecordWriter(output) as writer, executor:
+        run(submit, lines, writer, concurrency)
+    return BulkResult(
+        writer.succeeded + writer.failed,
+        writer.succeeded,
+        writer.failed,
+        time.perf_counter() - start,
+    )
+
+
+def _run_ordered(submit, lines, writer, concurrency):
+    pending: deque = deque()
+    for index, line in enumerate(lines):
+        if len(pending) >= concurrency:
+            writer.write(pending.popleft().result())
+        pending.append(submit(index, line))
+    while pending:
+        writer.write(pending.popleft().result())
+
+
+def _run_unordered(submit, lines, writer, concurrency):
+    pending: set = set()
+    for index, line in enumerate(lines):
+        if len(pending) >= concurrency:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                writer.write(future.result())
+        pending.add(submit(index, line))
+    for future in wait(pending).done:
+        writer.write(future.result())
+
+
+def _load_request(line: str):
+    # invalid lines become error records of their own
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return e
+
+
+def _read_chunk(lines: Iterator[str], chunk_size: int) -> list:
+    return [_load_request(line) for line in islice(lines, chunk_size)]
+
+
+async def _call_async(invoker, kwargs, index: int, request) -> Tuple[bool, str]:
+    try:
+        if isinstance(request, ValueError):
+            raise request
+        response = await invoker(request, **kwargs)
+        if not invoker.method_type.is_unary_response:
+            response = [item async for item in response]
+        record = _dump_record(index, response)
+    except Exception as e:  # every failed request gets an error record
+        return False, _dump_record(index, error=e)
+    return True, record
+
+
+async def run_bulk_async(
+    client,
+    service: str,
+    method: str,
+    requests: Requests,
+    output: Output,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    ordered: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **kwargs,
+) -> BulkResult:
+    """
+    Call a method of an async client with every request of a JSONL input, see
+    run_bulk.
+
+    The input is read and parsed in chunks of chunk_size lines in the default
+    executor of the event loop, and calls run as tasks of the event loop.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be positive, got {concurrency}")
+    invoker = await client.get_invoker(service, method)
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    pending: Union[deque, set] = deque() if ordered else set()
+    add_task = pending.append if isinstance(pending, deque) else pending.add
+    index = 0
+    with _open_requests(requests) as lines, _RecordWriter(output) as writer:
+        while True:
+            chunk = await loop.run_in_executor(None, _read_chunk, lines, chunk_size)
+            if not chunk:
+                break
+            for request in chunk:
+                if len(pending) >= concurrency:
+                    await _write_completed(pending, writer)
+                add_task(loop.create_task(_call_async(invoker, kwargs, index, request)))
+                index += 1
+        while pending:
+            await _write_completed(pending, writer)
+    return BulkResult(
+        writer.succeeded + writer.failed,
+        writer.succeeded,
+        writer.failed,
+        time.perf_counter() - start,
+    )
+
+
+async def _write_completed(pending: Union[deque, set], writer: _RecordWriter):
+    if isinstance(pending, deque):
+        writer.write(await pending.popleft())
+        return
+    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+    for task in done:
+        pending.discard(task)
+        writer.write(task.result())
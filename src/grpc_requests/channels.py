@@ -0,0 +1,462 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from itertools import count
+from typing import Callable, Dict, List, Optional, Sequence, Set, Union
+
+import grpc
+
+logger = logging.getLogger(__name__)
+
+# makes each channel of a pool connect with subchannels of its own, rather than
+# sharing the process wide subchannels of channels with identical arguments
+LOCAL_SUBCHANNEL_POOL_OPTION = ("grpc.use_local_subchannel_pool", 1)
+
+# consecutive UNAVAILABLE calls ejecting a channel, and the seconds it stays
+# ejected before a call probes it again
+DEFAULT_EJECT_AFTER_UNAVAILABLE = 3
+DEFAULT_EJECTION_SECONDS = 10.0
+# the weight of the latest call in the latency average of a channel
+LATENCY_EWMA_WEIGHT = 0.2
+
+
+class ChannelPicker:
+    """
+    Chooses the channel of a pool each call is sent on.
+    """
+
+    def pick(self, pool: "ChannelPool") -> int:
+        """
+        :param pool: The pool; pool.candidates() are the indexes of the channels
+            calls may be sent on, pool.outstanding and pool.latencies hold the
+            calls in progress and the average latency of each channel.
+        :return: The index of the channel to call on.
+        """
+        raise NotImplementedError()
+
+
+class RoundRobinPicker(ChannelPicker):
+    """
+    Sends calls to the channels in turn.
+    """
+
+    def __init__(self):
+        self._counter = count()
+
+    def pick(self, pool: "ChannelPool") -> int:
+        candidates = pool.candidates()
+        return candidates[next(self._counter) % len(candidates)]
+
+
+class LeastOutstandingPicker(ChannelPicker):
+    """
+    Sends each call to the channel with the fewest calls in progress, in turn
+    among the channels with as few.
+    """
+
+    def __init__(self):
+        self._counter = count()
+
+    def pick(self, pool: "ChannelPool") -> int:
+        candidates = pool.candidates()
+        outstanding = pool.outstanding
+        size = len(candidates)
+        start = next(self._counter) % size
+        best = candidates[start]
+        for offset in range(1, size):
+            index = candidates[(start + offset) % size]
+            if outstanding[index] < outstanding[best]:
+                best = index
+        return best
+
+
+class PowerOfTwoChoicesPicker(ChannelPicker):
+    """
+    Sends each call to the channel with fewer calls in progress of two channels
+    chosen at random, which spreads load almost as well as the least outstanding
+    channel without every call looking at every channel.
+    """
+
+    def cost(self, pool: "ChannelPool", index: int) -> float:
+        return pool.outstanding[index]
+
+    def pick(self, pool: "ChannelPool") -> int:
+        candidates = pool.candidates()
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        if self.cost(pool, second) < self.cost(pool, first):
+            return second
+        return first
+
+
+class EwmaPicker(PowerOfTwoChoicesPicker):
+    """
+    Power of two choices weighing the calls in progress of a channel by its
+    average latency, so slower channels get fewer calls. Channels without a
+    measured latency are tried first.
+    """
+
+    def cost(self, pool: "ChannelPool", index: int) -> float:
+        # a microsecond floor keeps channels without a measured latency apart by
+        # their calls in progress
+        return (pool.latencies[index] + 1e-6) * (pool.outstanding[index] + 1)
+
+
+PICKERS: Dict[str, Callable[[], ChannelPicker]] = {
+    "round_robin": RoundRobinPicker,
+    "least_outstanding": LeastOutstandingPicker,
+    "power_of_two": PowerOfTwoChoicesPicker,
+    "ewma": EwmaPicker,
+}
+
+
+def get_picker(picker: Union[str, ChannelPicker]) -> ChannelPicker:
+    """
+    Get a ChannelPicker, or a new picker of one of the names of PICKERS.
+    """
+    if isinstance(picker, ChannelPicker):
+        return picker
+    factory = PICKERS.get(picker)
+    if factory is None:
+        raise ValueError(
+            f"unknown channel picker {picker}, available pickers are {list(PICKERS)}"
+        )
+    return factory()
+
+
+def pool_channel_options(options) -> list:
+    """
+    The options of the channels of a pool: options with a local subchannel pool.
+    """
+    return [*(options or ()), LOCAL_SUBCHANNEL_POOL_OPTION]
+
+
+class _PooledMultiCallable:
+    """
+    A multi-callable sending each call through the multi-callable of the channel
+    the pool picks, counting the call as outstanding on that channel until it ends.
+    """
+
+    __slots__ = ("_pool", "_callables", "_blocking")
+
+    def __init__(self, pool: "ChannelPool", callables: list, blocking: bool):
+        self._pool = pool
+        self._callables = callables
+        # blocking calls return once they ended, other calls return a call object
+        # telling when they end with add_done_callback
+        self._blocking = blocking
+
+    def __call__(self, request=None, **kwargs):
+        # grpc.aio stream request calls may be made without a request iterator
+        return self._invoke("__call__", request, kwargs)
+
+    def with_call(self, request, **kwargs):
+        return self._invoke("with_call", request, kwargs)
+
+    def future(self, request, **kwargs):
+        return self._invoke_call("future", request, kwargs)
+
+    def _invoke(self, name: str, request, kwargs):
+        if not self._blocking:
+            return self._invoke_call(name, request, kwargs)
+        pool = self._pool
+        index = pool.acquire()
+        start = time.monotonic()
+        try:
+            result = getattr(self._callables[index], name)(request, **kwargs)
+        except grpc.RpcError as e:
+            pool.release(index, time.monotonic() - start, e.code())
+            raise
+        except BaseException:
+            pool.release(index, time.monotonic() - start)
+            raise
+        pool.release(index, time.monotonic() - start, grpc.StatusCode.OK)
+        return result
+
+    def _invoke_call(self, name: str, request, kwargs):
+        pool = self._pool
+        index = pool.acquire()
+        start = time.monotonic()
+        try:
+            call = getattr(self._callables[index], name)(request, **kwargs)
+        except BaseException:
+            pool.release(index, time.monotonic() - start)
+            raise
+        call.add_done_callback(pool.release_callback(index, start))
+        return call
+
+    def limited(self, limiters) -> "_LimitedMultiCallable":
+        """
+        This unary response multi-callable of an async pool, making each call
+        within the limiter of the endpoint the pool picks for it.
+
+        :param limiters: The EndpointLimiters of the endpoints of the pool.
+        """
+        endpoints = self._pool.endpoints
+        if endpoints is None:
+            raise ValueError("calls are limited by endpoint, the pool has none")
+        return _LimitedMultiCallable(
+            self, [limiters[endpoint] for endpoint in endpoints]
+        )
+
+    async def _invoke_limited(self, limiters: list, request, kwargs):
+        # the channel is picked before the call waits for the limiter of its
+        # endpoint, so the call counts as outstanding on it while it waits
+        pool = self._pool
+        index = pool.acquire()
+        limiter = limiters[index]
+        try:
+            await limiter.acquire()
+        except BaseException:
+            pool.release(index)
+            raise
+        start = time.monotonic()
+        try:
+            call = self._callables[index](request, **kwargs)
+        except BaseException:
+            pool.release(index, time.monotonic() - start)
+            limiter.release()
+            raise
+        call.add_done_callback(pool.release_callback(index, start))
+        try:
+            response = await call
+        except grpc.RpcError as e:
+            limiter.release(time.monotonic() - start, e.code())
+            raise
+        except BaseException:
+            limiter.release()
+            raise
+        limiter.release(time.monotonic() - start, grpc.StatusCode.OK)
+        return response
+
+
+class _LimitedMultiCallable:
+    """
+    A unary response multi-callable of an async pool whose calls are made within
+    the limiter of the endpoint of their channel, see _PooledMultiCallable.limited.
+    """
+
+    __slots__ = ("_pooled", "_limiters")
+
+    def __init__(self, pooled: _PooledMultiCallable, limiters: list):
+        self._pooled = pooled
+        # the limiter of every channel of the pool
+        self._limiters = limiters
+
+    def __call__(self, request=None, **kwargs):
+        return self._pooled._invoke_limited(self._limiters, request, kwargs)
+
+
+class ChannelPool:
+    """
+    Spreads the calls of a client over several channels, so they are not limited
+    by the concurrent streams and throughput of a single HTTP/2 connection, or
+    by a single endpoint when the channels connect to several.
+
+    The pool creates multi-callables like a channel does, so it is used in place
+    of a channel: each multi-callable holds one of every channel, and every call
+    picks the channel it is sent on with the picker.
+
+    A channel whose calls fail with UNAVAILABLE eject_after_unavailable times in a
+    row is ejected: calls are sent to the other channels, until ejection_seconds
+    later a single call probes it; a probe failing with UNAVAILABLE ejects it
+    again, and any other outcome brings it back. When every channel is ejected,
+    calls are sent to all of them.
+
+    :param channels: The channels of the pool.
+    :param picker: A ChannelPicker, or the name of one of PICKERS.
+    :param endpoints: The endpoints of the channels, for their descriptions.
+    :param eject_after_unavailable: The consecutive UNAVAILABLE calls ejecting a
+        channel, 0 to never eject channels.
+    :param ejection_seconds: The time a channel stays ejected before a probe.
+    """
+
+    # unary response calls of synchronous channels block until they end
+    _blocking_unary_response = True
+
+    def __init__(
+        self,
+        channels: Sequence,
+        picker: Union[str, ChannelPicker] = "round_robin",
+        endpoints: Optional[Sequence[str]] = None,
+        eject_after_unavailable: int = DEFAULT_EJECT_AFTER_UNAVAILABLE,
+        ejection_seconds: float = DEFAULT_EJECTION_SECONDS,
+    ):
+        if not channels:
+            raise ValueError("a channel pool needs at least one channel")
+        self.channels = list(channels)
+        self.endpoints = list(endpoints) if endpoints else None
+        self.picker = get_picker(picker)
+        self.eject_after_unavailable = eject_after_unavailable
+        self.ejection_seconds = ejection_seconds
+        self.outstanding: List[int] = [0] * len(self.channels)
+        self.latencies: List[float] = [0.0] * len(self.channels)
+        self.unavailable: List[int] = [0] * len(self.channels)
+        self.ejected_until: List[float] = [0.0] * len(self.channels)
+        self._all = list(range(len(self.channels)))
+        self._ejected: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def ejected(self) -> List[int]:
+        """
+        The indexes of the ejected channels.
+        """
+        return sorted(self._ejected)
+
+    def candidates(self) -> List[int]:
+        """
+        The indexes of the channels calls may be sent on: the channels that are
+        not ejected, or due a probe, or all of them when every channel is ejected.
+        """
+        if not self._ejected:
+            return self._all
+        now = time.monotonic()
+        ejected_until = self.ejected_until
+        candidates = [
+            index
+            for index in self._all
+            if index not in self._ejected or ejected_until[index] <= now
+        ]
+        return candidates or self._all
+
+    def acquire(self) -> int:
+        """
+        Pick the channel of a call and count the call as outstanding on it.
+        """
+        with self._lock:
+            index = self.picker.pick(self)
+            self.outstanding[index] += 1
+            if index in self._ejected:
+                # the call probes the channel, other calls keep away until it ends
+                self.ejected_until[index] = time.monotonic() + self.ejection_seconds
+        return index
+
+    def release(
+        self,
+        index: int,
+        elapsed: Optional[float] = None,
+        code: Optional[grpc.StatusCode] = None,
+    ):
+        """
+        Count a call of a channel as ended.
+
+        :param index: The index of the channel.
+        :param elapsed: The duration of the call in seconds.
+        :param code: The status code of the call, if known.
+        """
+        with self._lock:
+            self.outstanding[index] -= 1
+            if elapsed is not None:
+                latency = self.latencies[index]
+                self.latencies[index] = (
+                    latency + LATENCY_EWMA_WEIGHT * (elapsed - latency)
+                    if latency
+                    else elapsed
+                )
+            if code is not None:
+                self._record_status(index, code)
+
+    def _record_status(self, index: int, code: grpc.StatusCode):
+        if code != grpc.StatusCode.UNAVAILABLE:
+            self.unavailable[index] = 0
+            self._ejected.discard(index)
+            return
+        self.unavailable[index] += 1
+        if 0 < self.eject_after_unavailable <= self.unavailable[index]:
+            self._ejected.add(index)
+            self.ejected_until[index] = time.monotonic() + self.ejection_seconds
+
+    def release_callback(self, index: int, start: float):
+        def release(call):
+            self.release(index, time.monotonic() - start, call.code())
+
+        return release
+
+    def _multi_callable(self, method_type: str, blocking: bool, method, kwargs):
+        return _PooledMultiCallable(
+            self,
+            [
+                getattr(channel, method_type)(method, **kwargs)
+                for channel in self.channels
+            ],
+            blocking,
+        )
+
+    def unary_unary(self, method, **kwargs):
+        return self._multi_callable(
+            "unary_unary", self._blocking_unary_response, method, kwargs
+        )
+
+    def unary_stream(self, method, **kwargs):
+        return self._multi_callable("unary_stream", False, method, kwargs)
+
+    def stream_unary(self, method, **kwargs):
+        return self._multi_callable(
+            "stream_unary", self._blocking_unary_response, method, kwargs
+        )
+
+    def stream_stream(self, method, **kwargs):
+        return self._multi_callable("stream_stream", False, method, kwargs)
+
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+
+    def _close(self):
+        self.close()
+
+    def __repr__(self):
+        if self.endpoints:
+            return f"<{type(self).__name__} of {', '.join(self.endpoints)}>"
+        return f"<{type(self).__name__} of {len(self.channels)} channels>"
+
+
+class AsyncChannelPool(ChannelPool):
+    """
+    A ChannelPool of grpc.aio channels, see ChannelPool.
+    """
+
+    # calls of grpc.aio channels return call objects for every method type
+    _blocking_unary_response = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # the tasks recording call statuses, which the event loop only holds
+        # weakly
+        self._status_tasks: Set[asyncio.Task] = set()
+
+    def release_callback(self, index: int, start: float):
+        def release(call):
+            elapsed = time.monotonic() - start
+            if call.cancelled():
+                self.release(index, elapsed, grpc.StatusCode.CANCELLED)
+                return
+            # the status of grpc.aio calls is read with a coroutine, which returns
+            # at once as the call is done
+            self.release(index, elapsed)
+            task = asyncio.ensure_future(self._record_call_status(index, call))
+            self._status_tasks.add(task)
+            task.add_done_callback(self._status_recorded)
+
+        return release
+
+    def _status_recorded(self, task: asyncio.Task):
+        self._status_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("can not record a call status", exc_info=task.exception())
+
+    async def _record_call_status(self, index: int, call):
+        code = await call.code()
+        with self._lock:
+            self._record_status(index, code)
+
+    async def close(self, grace=None):
+        for channel in self.channels:
+            await channel.close(grace)
+
+    async def _close(self, grace=None):
+        await self.close(grace)
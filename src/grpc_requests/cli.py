@@ -0,0 +1,157 @@
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from .aio import AsyncClient
+from .bulk import DEFAULT_CHUNK_SIZE, DEFAULT_CONCURRENCY, run_bulk, run_bulk_async
+from .client import Client
+
+
+def _metadata_item(value: str):
+    key, separator, item = value.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"{value} is not KEY=VALUE")
+    return key, item
+
+
+def _call_kwargs(args) -> dict:
+    kwargs = {}
+    if args.metadata:
+        kwargs["metadata"] = args.metadata
+    if args.timeout is not None:
+        kwargs["timeout"] = args.timeout
+    return kwargs
+
+
+def _open_arguments(args):
+    requests = sys.stdin if args.input == "-" else args.input
+    output = sys.stdout if args.output == "-" else args.output
+    return requests, output
+
+
+async def _bulk_async(args):
+    requests, output = _open_arguments(args)
+    # the channel is closed before asyncio.run closes the event loop
+    async with AsyncClient(args.endpoint, ssl=args.ssl) as client:
+        return await run_bulk_async(
+            client,
+            args.service,
+            args.method,
+            requests,
+            output,
+            concurrency=args.concurrency,
+            ordered=not args.unordered,
+            chunk_size=args.chunk_size,
+            **_call_kwargs(args),
+        )
+
+
+def bulk(args) -> int:
+    if args.use_async:
+        result = asyncio.run(_bulk_async(args))
+    else:
+        requests, output = _open_arguments(args)
+        client = Client(args.endpoint, ssl=args.ssl)
+        try:
+            result = run_bulk(
+                client,
+                args.service,
+                args.method,
+                requests,
+                output,
+                concurrency=args.concurrency,
+                ordered=not args.unordered,
+                workers=args.workers,
+                **_call_kwargs(args),
+            )
+        finally:
+            client.channel.close()
+    print(
+        f"{result.total} requests, {result.succeeded} succeeded, "
+        f"{result.failed} failed in {result.elapsed:.3f}s",
+        file=sys.stderr,
+    )
+    return 1 if result.failed else 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="grequests", description="Call gRPC servers supporting reflection."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bulk_parser = commands.add_parser(
+        "bulk",
+        help="call a method with every request of a JSONL file",
+        description="Call a method with every request of a JSONL file, writing a "
+        'JSONL record {"index": ..., "response": ...} or {"index": ..., '
+        '"error": ...} of each call.',
+    )
+    bulk_parser.add_argument("endpoint", help="the server address, such as host:port")
+    bulk_parser.add_argument("service", help="the full name of the service")
+    bulk_parser.add_argument("method", help="the name of the method")
+    bulk_parser.add_argument(
+        "-i", "--input", default="-", help="the JSONL requests, - for stdin"
+    )
+    bulk_parser.add_argument(
+        "-o", "--output", default="-", help="the JSONL output, - for stdout"
+    )
+    bulk_parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="the maximum number of requests in flight",
+    )
+    bulk_parser.add_argument(
+        "--unordered",
+        action="store_true",
+        help="write records as calls complete instead of in input order",
+    )
+    bulk_parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="call with the asyncio client instead of futures",
+    )
+    bulk_parser.add_argument(
+        "--workers",
+        type=int,
+        help="the threads parsing requests and converting responses without --async",
+    )
+    bulk_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help="the requests parsed at once by --async runs",
+    )
+    bulk_parser.add_argument("--ssl", action="store_true", help="use a TLS channel")
+    bulk_parser.add_argument(
+        "--timeout", type=float, help="the timeout of each call in seconds"
+    )
+    bulk_parser.add_argument(
+        "-m",
+        "--metadata",
+        action="append",
+        type=_metadata_item,
+        metavar="KEY=VALUE",
+        help="call metadata, may be repeated",
+    )
+    bulk_parser.set_defaults(func=bulk)
+    return parser
+
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    """
+    The grequests command line entry point.
+
+    :param argv: The command line arguments, defaults to sys.argv.
+    :return: The exit status, 1 when any request failed.
+    """
+    args = _build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
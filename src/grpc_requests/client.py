@@ -1,13 +1,18 @@
 import logging
+import queue
+import threading
+from contextlib import contextmanager, suppress
 from enum import Enum
-from functools import partial
 from typing import (
     Any,
     Dict,
+    Hashable,
     Iterable,
     List,
+    Mapping,
     NamedTuple,
     Optional,
+    Set,
     Tuple,
     Union,
 )
@@ -16,11 +21,47 @@ import grpc
 from google.protobuf import descriptor_pb2, message_factory
 from google.protobuf import descriptor_pool as _descriptor_pool
 from google.protobuf.descriptor import MethodDescriptor, ServiceDescriptor
-from google.protobuf.descriptor_pb2 import ServiceDescriptorProto
+from google.protobuf.descriptor_pb2 import MethodDescriptorProto
 from google.protobuf.json_format import MessageToDict, ParseDict
 from grpc_reflection.v1alpha import reflection_pb2, reflection_pb2_grpc
 
-from .utils import describe_descriptor, load_data
+from .channels import (
+    DEFAULT_EJECT_AFTER_UNAVAILABLE,
+    DEFAULT_EJECTION_SECONDS,
+    ChannelPicker,
+    ChannelPool,
+    pool_channel_options,
+)
+from .client_cache import ClientCache, client_key, freeze_option
+from .columns import DEFAULT_BATCH_SIZE, get_column_collector
+from .converters import (
+    FieldPaths,
+    MessageToDictConverters,
+    get_dict_to_message_converter,
+)
+from .descriptor_cache import (
+    DescriptorCache,
+    add_cached_file_descriptors,
+    collect_file_descriptors,
+    service_names_from_file_descriptors,
+)
+from .fanout import DEFAULT_MAX_IN_FLIGHT, ResponseFuture, map_completed, map_ordered
+from .coalescing import RequestCoalescer
+from .hedging import HedgingPolicy
+from .retry import RetryPolicy
+from .schema import (
+    MethodSchema,
+    ServiceSchema,
+    fingerprint_service,
+    schema_registry,
+)
+from .templates import RequestTemplate, build_request_template
+from .utils import (
+    LazyMapping,
+    describe_descriptor,
+    load_data,
+    sort_file_descriptors,
+)
 
 import importlib.metadata
 from typing import (
@@ -66,6 +107,54 @@ def reflection_request(channel, requests):
         logger.exception(err)
 
 
+class ReflectionSession:
+    """
+    Carries many reflection requests over a single ServerReflectionInfo stream.
+
+    The stream is opened on first use. Responses arrive in the order requests were
+    sent, so a batch of requests can be written before any response is read.
+    """
+
+    def __init__(self, reflection_stub):
+        self._reflection_stub = reflection_stub
+        self._requests: queue.SimpleQueue = queue.SimpleQueue()
+        self._responses = None
+
+    def pipeline(self, requests):
+        """
+        Send all requests before reading their responses.
+
+        :param requests: ServerReflectionRequests to send.
+        :return: The ServerReflectionResponses, in request order.
+        """
+        if not requests:
+            return []
+        if self._responses is None:
+            self._responses = self._reflection_stub.ServerReflectionInfo(
+                iter(self._requests.get, None)
+            )
+        for request in requests:
+            self._requests.put(request)
+        results = []
+        for _ in requests:
+            response = next(self._responses, None)
+            if response is None:
+                raise ValueError(
+                    "reflection stream closed before all responses arrived"
+                )
+            results.append(response)
+        return results
+
+    def close(self):
+        if self._responses is None:
+            return
+        self._requests.put(None)
+        with suppress(grpc.RpcError):
+            for _ in self._responses:
+                pass
+        self._responses = None
+
+
 PathLikeString = str
 
 
@@ -86,12 +175,32 @@ class BaseClient:
         compression=None,
         credentials: Optional[CredentialsInfo] = None,
         interceptors=None,
+        channel_pool_size: int = 1,
+        channel_picker: Union[str, ChannelPicker] = "round_robin",
+        eject_after_unavailable: int = DEFAULT_EJECT_AFTER_UNAVAILABLE,
+        ejection_seconds: float = DEFAULT_EJECTION_SECONDS,
         **kwargs,
     ):
+        """
+        :param endpoint: The address of the server, or a list of the addresses of
+            servers of the same services to balance calls over.
+        :param channel_pool_size: The number of channels calls to each endpoint are
+            spread over, each with its own connection; see ChannelPool.
+        :param channel_picker: The ChannelPicker choosing the channel of each call
+            of a pool, or the name of one: "round_robin", "least_outstanding",
+            "power_of_two" or "ewma".
+        :param eject_after_unavailable: The consecutive UNAVAILABLE calls ejecting a
+            channel of a pool until it is probed again, 0 to never eject channels.
+        :param ejection_seconds: The time an ejected channel waits for a probe.
+        """
         self.endpoint = endpoint
+        self.endpoints = [endpoint] if isinstance(endpoint, str) else list(endpoint)
+        if not self.endpoints:
+            raise ValueError("no endpoint to connect to")
         self._desc_pool = descriptor_pool or _descriptor_pool.Default()
         self.compression = compression
         self.channel_options = channel_options
+        channel_credentials = None
         if ssl:
             _credentials = {}
             if credentials:
@@ -99,20 +208,59 @@ class BaseClient:
                     k: load_data(v) if isinstance(v, str) else v
                     for k, v in credentials.items()
                 }
+            channel_credentials = grpc.ssl_channel_credentials(**_credentials)
 
-            self._channel = grpc.secure_channel(
+        if channel_pool_size < 1:
+            raise ValueError(
+                f"channel_pool_size must be positive, got {channel_pool_size}"
+            )
+        if len(self.endpoints) == 1 and channel_pool_size == 1:
+            self._channel = self._create_channel(
+                self.endpoints[0],
+                channel_credentials,
+                self.channel_options,
+                interceptors,
+            )
+        else:
+            options = (
+                pool_channel_options(self.channel_options)
+                if channel_pool_size > 1
+                else self.channel_options
+            )
+            endpoints = [
+                endpoint
+                for endpoint in self.endpoints
+                for _ in range(channel_pool_size)
+            ]
+            self._channel = ChannelPool(
+                [
+                    self._create_channel(
+                        endpoint, channel_credentials, options, interceptors
+                    )
+                    for endpoint in endpoints
+                ],
+                channel_picker,
+                endpoints,
+                eject_after_unavailable,
+                ejection_seconds,
+            )
+
+    def _create_channel(self, endpoint, channel_credentials, options, interceptors):
+        if channel_credentials is not None:
+            channel = grpc.secure_channel(
                 endpoint,
-                grpc.ssl_channel_credentials(**_credentials),
-                options=self.channel_options,
+                channel_credentials,
+                options=options,
                 compression=self.compression,
             )
         else:
-            self._channel = grpc.insecure_channel(
-                endpoint, options=self.channel_options, compression=self.compression
+            channel = grpc.insecure_channel(
+                endpoint, options=options, compression=self.compression
             )
 
         if interceptors:
-            self._channel = grpc.intercept_channel(self._channel, *interceptors)
+            channel = grpc.intercept_channel(channel, *interceptors)
+        return channel
 
     @property
     def channel(self):
@@ -120,10 +268,12 @@ class BaseClient:
 
     @classmethod
     def get_by_endpoint(cls, endpoint, **kwargs):
-        global _cached_clients
-        if endpoint not in _cached_clients:
-            _cached_clients[endpoint] = cls(endpoint, **kwargs)
-        return _cached_clients[endpoint]
+        """
+        Get the cached client of an endpoint and options, creating it once.
+        """
+        return client_cache.get(
+            client_key(cls, endpoint, kwargs), lambda: cls(endpoint, **kwargs)
+        )
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
@@ -133,7 +283,7 @@ class BaseClient:
         return False
 
     def __del__(self):
-        if self._channel:
+        if getattr(self, "_channel", None):
             try:
                 del self._channel
             except Exception as e:  # pylint: disable=bare-except
@@ -145,59 +295,110 @@ class MessageParsersProtocol(Protocol):
 
     def parse_stream_requests(self, stream_requests_data: Iterable, input_type): ...
 
-    def parse_response(self, response): ...
+    def parse_response(self, response, fields: Optional[FieldPaths] = None): ...
 
-    def parse_stream_responses(self, responses: Iterable): ...
+    def parse_stream_responses(
+        self, responses: Iterable, fields: Optional[FieldPaths] = None
+    ): ...
 
 
 class MessageParsers(MessageParsersProtocol):
+    def __init__(
+        self,
+        compiled_request_parser: bool = False,
+        compiled_response_parser: bool = False,
+        lazy_response_parser: bool = False,
+    ):
+        """
+        :param compiled_request_parser: Convert request dicts with converters compiled
+            per message type instead of json_format.ParseDict, with the same results.
+        :param compiled_response_parser: Convert responses with converters compiled
+            per message type instead of json_format.MessageToDict, with the same results.
+        :param lazy_response_parser: Return responses as read-only MessageView dicts,
+            which convert each field only when it is first read.
+        """
+        self._compiled_request_parser = compiled_request_parser
+        self._compiled_response_parser = (
+            compiled_response_parser or lazy_response_parser
+        )
+        self._response_converters = MessageToDictConverters(
+            lazy=lazy_response_parser, preserving_proto_field_name=True
+        )
+
     def parse_request_data(self, request_data, input_type):
         _data = request_data or {}
-        request = ParseDict(_data, input_type()) if isinstance(_data, dict) else _data
-        return request
+        if not isinstance(_data, dict):
+            return _data
+        if self._compiled_request_parser:
+            return get_dict_to_message_converter(input_type)(_data)
+        return ParseDict(_data, input_type())
 
     def parse_stream_requests(self, stream_requests_data: Iterable, input_type):
         for request_data in stream_requests_data:
             yield self.parse_request_data(request_data or {}, input_type)
 
-    def parse_response(self, response):
+    def parse_response(self, response, fields: Optional[FieldPaths] = None):
+        if fields is not None or self._compiled_response_parser:
+            # field projections are only supported by the compiled converters
+            return self._response_converters.convert(response, fields)
         return MessageToDict(response, preserving_proto_field_name=True)
 
-    def parse_stream_responses(self, responses: Iterable):
+    def parse_stream_responses(
+        self, responses: Iterable, fields: Optional[FieldPaths] = None
+    ):
         for resp in responses:
-            yield self.parse_response(resp)
+            yield self.parse_response(resp, fields)
 
 
 class CustomArgumentParsers(MessageParsersProtocol):
-    _message_to_dict_kwargs: Optional[Dict[str, Any]]
-    _parse_dict_kwargs: Optional[Dict[str, Any]]
+    _message_to_dict_kwargs: Dict[str, Any]
+    _parse_dict_kwargs: Dict[str, Any]
 
     def __init__(
         self,
         message_to_dict_kwargs: Optional[Dict[str, Any]] = None,
         parse_dict_kwargs: Optional[Dict[str, Any]] = None,
+        compiled_request_parser: bool = False,
+        compiled_response_parser: bool = False,
+        lazy_response_parser: bool = False,
     ):
         self._message_to_dict_kwargs = message_to_dict_kwargs or {}
         self._parse_dict_kwargs = parse_dict_kwargs or {}
+        self._compiled_request_parser = compiled_request_parser
+        self._compiled_response_parser = (
+            compiled_response_parser or lazy_response_parser
+        )
+        self._response_converters = MessageToDictConverters(
+            lazy=lazy_response_parser, **self._message_to_dict_kwargs
+        )
 
     def parse_request_data(self, request_data, input_type):
         _data = request_data or {}
-        if isinstance(_data, dict):
-            request = ParseDict(_data, input_type(), **self._parse_dict_kwargs)
-        else:
+        if not isinstance(_data, dict):
             request = _data
+        elif self._compiled_request_parser:
+            request = get_dict_to_message_converter(input_type)(
+                _data, **self._parse_dict_kwargs
+            )
+        else:
+            request = ParseDict(_data, input_type(), **self._parse_dict_kwargs)
         return request
 
     def parse_stream_requests(self, stream_requests_data: Iterable, input_type):
         for request_data in stream_requests_data:
             yield self.parse_request_data(request_data or {}, input_type)
 
-    def parse_response(self, response):
+    def parse_response(self, response, fields: Optional[FieldPaths] = None):
+        if fields is not None or self._compiled_response_parser:
+            # field projections are only supported by the compiled converters
+            return self._response_converters.convert(response, fields)
         return MessageToDict(response, **self._message_to_dict_kwargs)
 
-    def parse_stream_responses(self, responses: Iterable):
+    def parse_stream_responses(
+        self, responses: Iterable, fields: Optional[FieldPaths] = None
+    ):
         for resp in responses:
-            yield self.parse_response(resp)
+            yield self.parse_response(resp, fields)
 
 
 class MethodType(Enum):
@@ -246,6 +447,271 @@ MethodTypeMatch: Dict[Tuple[bool, bool], MethodType] = {
 }
 
 
+def raw_request_bytes(request) -> bytes:
+    """
+    Get the serialized request sent by a raw bytes call from bytes, memoryview or
+    bytearray payloads; None sends an empty message.
+    """
+    if request is None:
+        return b""
+    if isinstance(request, bytes):
+        return request
+    return bytes(request)
+
+
+class MethodInvoker:
+    """
+    Calls a single method with its handler, parsers and input type resolved up front,
+    so a call only parses the request, invokes the handler and parses the response.
+
+    Invokers are created by BaseGrpcClient.get_invoker, which validates the method once.
+
+    Setting response_fields projects every response of the method onto the given
+    field paths, such as "items.id,items.price", so only those fields are converted;
+    a response_fields argument of a call takes precedence over it.
+
+    Raw bytes calls send already serialized requests and return the serialized
+    responses through a handler without serializers, skipping protobuf parsing and
+    dict conversion; they are the default of invokers of raw_bytes clients.
+
+    With a request template set, requests are deltas applied onto a copy of the
+    template, see RequestTemplate.
+    """
+
+    __slots__ = (
+        "service",
+        "method",
+        "method_meta",
+        "method_type",
+        "_handler",
+        "_input_type",
+        "_parse_request",
+        "_parse_response",
+        "response_fields",
+        "raw_bytes",
+        "_channel",
+        "_raw_handler",
+        "request_template",
+        "hedging",
+        "retry",
+        "coalescer",
+    )
+
+    def __init__(
+        self,
+        service: str,
+        method: str,
+        method_meta: MethodMetaData,
+        channel=None,
+        raw_bytes: bool = False,
+    ):
+        """
+        :param channel: The channel raw bytes handlers are created on.
+        :param raw_bytes: Whether method_meta.handler is a raw bytes handler, making
+            raw bytes calls the default.
+        """
+        self.service = service
+        self.method = method
+        self.method_meta = method_meta
+        self.method_type = method_meta.method_type
+        self._handler = method_meta.handler
+        self._input_type = method_meta.input_type
+        self._parse_request = method_meta.request_parser
+        self._parse_response = method_meta.response_parser
+        self.response_fields: Optional[FieldPaths] = None
+        self.raw_bytes = raw_bytes
+        self._channel = channel
+        self._raw_handler = method_meta.handler if raw_bytes else None
+        self.request_template: Optional[RequestTemplate] = None
+        self.hedging: Optional[HedgingPolicy] = None
+        self.retry: Optional[RetryPolicy] = None
+        self.coalescer: Optional[RequestCoalescer] = None
+
+    def set_request_template(self, template: Optional[RequestTemplate]):
+        """
+        Build the requests of every call from a template updated with the request
+        of the call as a delta, or from the request alone again with None.
+        """
+        self.request_template = template
+        if template is None:
+            self._parse_request = self.method_meta.request_parser
+        elif self.method_type.is_unary_request:
+            self._parse_request = template.parse_request_data
+        else:
+            self._parse_request = template.parse_stream_requests
+
+    def set_hedging_policy(self, policy: Optional[HedgingPolicy]):
+        """
+        Hedge the calls of the method with a HedgingPolicy, or stop hedging them
+        with None. Only unary unary methods are hedged, as the request of a call
+        is sent again.
+        """
+        if policy is not None and self.method_type != MethodType.UNARY_UNARY:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary unary methods can be hedged"
+            )
+        self.hedging = policy
+
+    def _get_raw_handler(self):
+        if self._raw_handler is None:
+            if self._channel is None:
+                raise ValueError(f"{self!r} has no channel for raw bytes calls")
+            self._raw_handler = getattr(self._channel, self.method_type.value)(
+                method=f"/{self.service}/{self.method}"
+            )
+        return self._raw_handler
+
+    def _raw_request(self, request):
+        if self.method_type.is_unary_request:
+            return raw_request_bytes(request)
+        return map(raw_request_bytes, request)
+
+    def set_retry_policy(self, policy: Optional[RetryPolicy]):
+        """
+        Retry the failed calls of the method with a RetryPolicy, or stop retrying
+        them with None. Only unary unary methods are retried, as the request of a
+        call is sent again.
+        """
+        if policy is not None and self.method_type != MethodType.UNARY_UNARY:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary unary methods can be retried"
+            )
+        self.retry = policy
+
+    def _send(self, handler, request, kwargs):
+        # a unary unary call with the retry and hedging policies of the method
+        if self.retry is None:
+            return self._attempt(handler, request, kwargs)
+        return self.retry.call(
+            lambda attempt_kwargs: self._attempt(handler, request, attempt_kwargs),
+            kwargs,
+        )
+
+    def _attempt(self, handler, request, kwargs):
+        if self.hedging is None:
+            return handler(request, **kwargs)
+        return self.hedging.call(handler, request, kwargs)
+
+    def set_request_coalescer(self, coalescer: Optional[RequestCoalescer]):
+        """
+        Coalesce concurrent identical calls of the method with a RequestCoalescer,
+        or make every call with None. Only unary unary methods are coalesced.
+        """
+        if coalescer is not None and self.method_type != MethodType.UNARY_UNARY:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary unary methods can be coalesced"
+            )
+        self.coalescer = coalescer
+
+    def _coalescing_key(self, request, raw: bool, kwargs) -> Hashable:
+        # raw bytes calls have responses of their own, they are never coalesced
+        # with message calls
+        request_bytes = (
+            request if raw else request.SerializeToString(deterministic=True)
+        )
+        return (self.service, self.method, raw, request_bytes, freeze_option(kwargs))
+
+    def _unary_call(self, handler, request, raw: bool, kwargs):
+        # a call with the coalescer and the policies of the method, which are only
+        # set on unary unary methods
+        coalescer = self.coalescer
+        if coalescer is not None:
+            return coalescer.call(
+                self._coalescing_key(request, raw, kwargs),
+                lambda: self._send(handler, request, kwargs),
+            )
+        if self.hedging is None and self.retry is None:
+            return handler(request, **kwargs)
+        return self._send(handler, request, kwargs)
+
+    def _future(self, handler, request, raw: bool, kwargs) -> grpc.Future:
+        # coalesced calls give every caller a CoalescedFuture of its own, which
+        # only cancels the call once every caller cancelled
+        coalescer = self.coalescer
+        if coalescer is None:
+            return handler.future(request, **kwargs)
+        return coalescer.future(
+            self._coalescing_key(request, raw, kwargs),
+            lambda: handler.future(request, **kwargs),
+        )
+
+    def _call_raw(self, request, **kwargs):
+        return self._unary_call(
+            self._get_raw_handler(), self._raw_request(request), True, kwargs
+        )
+
+    def _use_raw_bytes(self, raw_bytes: Optional[bool]) -> bool:
+        if raw_bytes is None:
+            return self.raw_bytes
+        if self.raw_bytes and not raw_bytes:
+            raise ValueError(f"{self!r} only supports raw bytes calls")
+        return raw_bytes
+
+    def __call__(
+        self,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        if self._use_raw_bytes(raw_bytes):
+            return self._call_raw(request, **kwargs)
+        _request = self._parse_request(request, self._input_type)
+        result = self._unary_call(self._handler, _request, False, kwargs)
+        if raw_output:
+            return result
+        fields = self.response_fields if response_fields is None else response_fields
+        if fields is None:
+            return self._parse_response(result)
+        return self._parse_response(result, fields)
+
+    def future(
+        self,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ) -> ResponseFuture:
+        """
+        Start a call of a unary response method without waiting for its response,
+        taking the arguments of a call.
+
+        :return: A ResponseFuture whose result is the converted response.
+        """
+        if not self.method_type.is_unary_response:
+            raise ValueError(
+                f"{self.method} is {self.method_type.value}, "
+                "only unary response methods have futures"
+            )
+        if self._use_raw_bytes(raw_bytes):
+            return ResponseFuture(
+                self._future(
+                    self._get_raw_handler(), self._raw_request(request), True, kwargs
+                )
+            )
+        future = self._future(
+            self._handler,
+            self._parse_request(request, self._input_type),
+            False,
+            kwargs,
+        )
+        if raw_output:
+            return ResponseFuture(future)
+        fields = self.response_fields if response_fields is None else response_fields
+        if fields is None:
+            return ResponseFuture(future, self._parse_response)
+        parse_response = self._parse_response
+        return ResponseFuture(future, lambda response: parse_response(response, fields))
+
+    def __repr__(self):
+        return f"<{type(self).__name__} /{self.service}/{self.method}>"
+
+
 class BaseGrpcClient(BaseClient):
     def __init__(
         self,
@@ -257,8 +723,19 @@ class BaseGrpcClient(BaseClient):
         compression=None,
         skip_check_method_available=False,
         message_parsers: Optional[MessageParsersProtocol] = None,
+        share_schema=False,
+        lazy_methods=False,
+        raw_bytes=False,
+        retry_policy: Optional[RetryPolicy] = None,
+        request_coalescer: Optional[RequestCoalescer] = None,
         **kwargs,
     ):
+        """
+        :param retry_policy: A RetryPolicy retrying the failed calls of every unary
+            unary method, see set_retry_policy for a policy per method.
+        :param request_coalescer: A RequestCoalescer sharing one call between
+            concurrent identical calls of every unary unary method.
+        """
         super().__init__(
             endpoint,
             symbol_db,
@@ -272,7 +749,15 @@ class BaseGrpcClient(BaseClient):
         self.has_server_registered = False
         self._skip_check_method_available = skip_check_method_available
         self._message_parsers = message_parsers if message_parsers else MessageParsers()
-        self._service_methods_meta: Dict[str, Dict[str, MethodMetaData]] = {}
+        self._service_methods_meta: Dict[str, Mapping[str, MethodMetaData]] = {}
+        self._method_invokers: Dict[Tuple[str, str], MethodInvoker] = {}
+        self._share_schema = share_schema
+        self._lazy_methods = lazy_methods
+        self._raw_bytes = raw_bytes
+        self.retry_policy = retry_policy
+        self.request_coalescer = request_coalescer
+        self._service_schemas: Dict[str, ServiceSchema] = {}
+        self._service_fingerprints: Dict[str, str] = {}
 
     def _get_service_names(self):
         raise NotImplementedError()
@@ -302,52 +787,117 @@ class BaseGrpcClient(BaseClient):
             )
         return True
 
-    def _register_methods(
-        self, service_descriptor: ServiceDescriptor
-    ) -> Dict[str, MethodMetaData]:
-        svc_desc_proto = ServiceDescriptorProto()
-        service_descriptor.CopyToProto(svc_desc_proto)
-        service_full_name = service_descriptor.full_name
-        metadata: Dict[str, MethodMetaData] = {}
-        for method_proto in svc_desc_proto.method:
-            method_name = method_proto.name
-            method_desc: MethodDescriptor = service_descriptor.methods_by_name[
-                method_name
-            ]
+    def _build_method_schema(self, method_desc: MethodDescriptor) -> MethodSchema:
+        method_proto = MethodDescriptorProto()
+        method_desc.CopyToProto(method_proto)
 
-            if get_message_class_supported:
-                input_type = GetMessageClass(method_desc.input_type)
-                output_type = GetMessageClass(method_desc.output_type)
-            else:
-                msg_factory = message_factory.MessageFactory(self._desc_pool)
-                input_type = msg_factory.GetPrototype(method_desc.input_type)
-                output_type = msg_factory.GetPrototype(method_desc.output_type)
+        if get_message_class_supported:
+            input_type = GetMessageClass(method_desc.input_type)
+            output_type = GetMessageClass(method_desc.output_type)
+        else:
+            msg_factory = message_factory.MessageFactory(self._desc_pool)
+            input_type = msg_factory.GetPrototype(method_desc.input_type)
+            output_type = msg_factory.GetPrototype(method_desc.output_type)
+
+        return MethodSchema(
+            input_type=input_type,
+            output_type=output_type,
+            descriptor=method_desc,
+            client_streaming=method_proto.client_streaming,
+            server_streaming=method_proto.server_streaming,
+        )
 
-            method_type = MethodTypeMatch[
-                (method_proto.client_streaming, method_proto.server_streaming)
-            ]
+    def _build_method_schemas(
+        self, service_descriptor: ServiceDescriptor
+    ) -> Mapping[str, MethodSchema]:
+        method_names = [method.name for method in service_descriptor.methods]
+        if self._lazy_methods:
+            return LazyMapping(
+                method_names,
+                lambda method_name: self._build_method_schema(
+                    service_descriptor.methods_by_name[method_name]
+                ),
+            )
+        return {
+            method_name: self._build_method_schema(
+                service_descriptor.methods_by_name[method_name]
+            )
+            for method_name in method_names
+        }
 
-            method_register_func = getattr(self.channel, method_type.value)
+    def _get_method_schemas(
+        self, service_descriptor: ServiceDescriptor
+    ) -> Mapping[str, MethodSchema]:
+        service_full_name = service_descriptor.full_name
+        schema = self._service_schemas.get(service_full_name)
+        if schema is None and self._share_schema:
+            schema = schema_registry.get_for_descriptor(service_descriptor)
+            if schema is None:
+                schema = schema_registry.register(
+                    ServiceSchema(
+                        fingerprint=self._service_fingerprints.get(service_full_name),
+                        descriptor=service_descriptor,
+                        methods=self._build_method_schemas(service_descriptor),
+                    )
+                )
+            self._service_schemas[service_full_name] = schema
+        if schema is not None:
+            return schema.methods
+        return self._build_method_schemas(service_descriptor)
+
+    def _build_method_meta(
+        self, service_full_name: str, method_name: str, method_schema: MethodSchema
+    ) -> MethodMetaData:
+        method_type = MethodTypeMatch[
+            (method_schema.client_streaming, method_schema.server_streaming)
+        ]
+
+        method_register_func = getattr(self.channel, method_type.value)
+        if self._raw_bytes:
+            # requests and responses pass through as serialized bytes
+            handler = method_register_func(
+                method=self._make_method_full_name(service_full_name, method_name)
+            )
+        else:
             handler = method_register_func(
                 method=self._make_method_full_name(service_full_name, method_name),
-                request_serializer=input_type.SerializeToString,
-                response_deserializer=output_type.FromString,
+                request_serializer=method_schema.input_type.SerializeToString,
+                response_deserializer=method_schema.output_type.FromString,
             )
-            metadata[method_name] = MethodMetaData(
-                method_type=method_type,
-                input_type=input_type,
-                output_type=output_type,
-                handler=handler,
-                descriptor=method_desc,
-                parsers=self._message_parsers,
+        return MethodMetaData(
+            method_type=method_type,
+            input_type=method_schema.input_type,
+            output_type=method_schema.output_type,
+            handler=handler,
+            descriptor=method_schema.descriptor,
+            parsers=self._message_parsers,
+        )
+
+    def _register_methods(
+        self, service_descriptor: ServiceDescriptor
+    ) -> Mapping[str, MethodMetaData]:
+        service_full_name = service_descriptor.full_name
+        method_schemas = self._get_method_schemas(service_descriptor)
+        if self._lazy_methods:
+            return LazyMapping(
+                method_schemas,
+                lambda method_name: self._build_method_meta(
+                    service_full_name, method_name, method_schemas[method_name]
+                ),
             )
-        return metadata
+        return {
+            method_name: self._build_method_meta(
+                service_full_name, method_name, method_schema
+            )
+            for method_name, method_schema in method_schemas.items()
+        }
 
     def register_service(self, service_name):
         logger.debug(f"start {service_name} registration")
         try:
             svc_desc = self.get_service_descriptor(service_name)
             self._service_methods_meta[service_name] = self._register_methods(svc_desc)
+            self._discard_invokers(service_name)
         except KeyError:
             logger.debug(
                 f"{service_name} not found in descriptor pool, methods will not be registered"
@@ -382,37 +932,344 @@ class BaseGrpcClient(BaseClient):
     def _make_method_full_name(service, method):
         return f"/{service}/{method}"
 
-    def _request(self, service, method, request, raw_output=False, **kwargs):
+    def _discard_invokers(self, service_name):
+        for key in [key for key in self._method_invokers if key[0] == service_name]:
+            del self._method_invokers[key]
+
+    def _get_cached_invoker(self, service, method) -> MethodInvoker:
         # does not check request is available
-        method_meta = self.get_method_meta(service, method)
+        invoker = self._method_invokers.get((service, method))
+        if invoker is None:
+            invoker = MethodInvoker(
+                service,
+                method,
+                self.get_method_meta(service, method),
+                channel=self.channel,
+                raw_bytes=self._raw_bytes,
+            )
+            if invoker.method_type == MethodType.UNARY_UNARY:
+                invoker.retry = self.retry_policy
+                invoker.coalescer = self.request_coalescer
+            self._method_invokers[(service, method)] = invoker
+        return invoker
 
-        _request = method_meta.request_parser(request, method_meta.input_type)
-        result = method_meta.handler(_request, **kwargs)
+    def get_invoker(
+        self, service, method, method_type: Optional[MethodType] = None
+    ) -> MethodInvoker:
+        """
+        Get a callable bound to a single method, taking the request (or request
+        iterator), raw_output, response_fields, raw_bytes and the handler keyword
+        arguments of request.
 
-        if raw_output:
-            return result
-        else:
-            return method_meta.response_parser(result)
+        The method is validated when its invoker is first created; later calls
+        reuse the cached invoker without any lookups or availability checks.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param method_type: Optional method type the method must have.
+        :return: The cached MethodInvoker of the method.
+        """
+        invoker = self._method_invokers.get((service, method))
+        if invoker is None:
+            self.check_method_available(service, method, method_type)
+            return self._get_cached_invoker(service, method)
+        if (
+            method_type
+            and method_type != invoker.method_type
+            and not self._skip_check_method_available
+        ):
+            raise ValueError(
+                f"{method} is {invoker.method_type.value} not {method_type.value}"
+            )
+        return invoker
+
+    def set_request_template(
+        self,
+        service: str,
+        method: str,
+        template,
+        parse_dict_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> Optional[RequestTemplate]:
+        """
+        Register a request template for a method: the template is parsed once, and
+        the request of every later call of the method is a delta applied onto a copy
+        of it, see RequestTemplate. Stream request methods apply each request of
+        the stream onto the template.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param template: The template request as a dict or message, or None to
+            remove the template of the method.
+        :param parse_dict_kwargs: Keyword arguments of ParseDict for dict deltas.
+        :return: The RequestTemplate of the method, or None.
+        """
+        invoker = self.get_invoker(service, method)
+        if template is None:
+            invoker.set_request_template(None)
+            return None
+        request_template = build_request_template(
+            template,
+            invoker.method_meta.input_type,
+            invoker.method_meta.parsers.parse_request_data,
+            parse_dict_kwargs,
+        )
+        invoker.set_request_template(request_template)
+        return request_template
+
+    def set_hedging_policy(
+        self, service: str, method: str, policy: Optional[HedgingPolicy]
+    ) -> Optional[HedgingPolicy]:
+        """
+        Hedge the calls of an idempotent unary unary method, sending a second copy
+        of a request whose response is late and keeping the first successful
+        response, see HedgingPolicy. Futures and map calls are not hedged.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param policy: The HedgingPolicy of the method, holding its hedge counters,
+            or None to stop hedging its calls.
+        :return: The policy.
+        """
+        invoker = self.get_invoker(service, method, MethodType.UNARY_UNARY)
+        invoker.set_hedging_policy(policy)
+        return policy
+
+    def set_retry_policy(
+        self, service: str, method: str, policy: Optional[RetryPolicy]
+    ) -> Optional[RetryPolicy]:
+        """
+        Retry the failed calls of an idempotent unary unary method with a policy
+        of its own, instead of the retry_policy of the client, see RetryPolicy.
+        Futures and map calls are not retried.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param policy: The RetryPolicy of the method, holding its retry counters,
+            or None to stop retrying its calls.
+        :return: The policy.
+        """
+        invoker = self.get_invoker(service, method, MethodType.UNARY_UNARY)
+        invoker.set_retry_policy(policy)
+        return policy
 
-    def request(self, service, method, request=None, raw_output=False, **kwargs):
-        self.check_method_available(service, method)
-        return self._request(service, method, request, raw_output, **kwargs)
+    def set_request_coalescer(
+        self, service: str, method: str, coalescer: Optional[RequestCoalescer]
+    ) -> Optional[RequestCoalescer]:
+        """
+        Coalesce concurrent identical calls of a unary unary method with a
+        coalescer of its own, instead of the request_coalescer of the client: calls
+        with the same request and keyword arguments as a call in flight share its
+        response, see RequestCoalescer.
+        Futures share calls with the other futures and calls.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param coalescer: The RequestCoalescer of the method, or None to make every
+            call of the method.
+        :return: The coalescer.
+        """
+        invoker = self.get_invoker(service, method, MethodType.UNARY_UNARY)
+        invoker.set_request_coalescer(coalescer)
+        return coalescer
 
-    def unary_unary(self, service, method, request=None, raw_output=False, **kwargs):
-        self.check_method_available(service, method, MethodType.UNARY_UNARY)
-        return self._request(service, method, request, raw_output, **kwargs)
+    def _request(
+        self,
+        service,
+        method,
+        request,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        # does not check request is available
+        return self._get_cached_invoker(service, method)(
+            request, raw_output, response_fields, raw_bytes, **kwargs
+        )
 
-    def unary_stream(self, service, method, request=None, raw_output=False, **kwargs):
-        self.check_method_available(service, method, MethodType.UNARY_STREAM)
-        return self._request(service, method, request, raw_output, **kwargs)
+    def request(
+        self,
+        service,
+        method,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        """
+        Call a method of a service.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param request: The request dict or message, or an iterator of them for
+            stream request methods.
+        :param raw_output: Return the response messages instead of dicts.
+        :param response_fields: Optional field paths, such as "items.id,items.price",
+            to convert from the responses; other fields are left out of the dicts.
+        :param raw_bytes: Send the request as already serialized bytes (or memoryview)
+            and return the serialized responses, skipping protobuf parsing and dict
+            conversion. Defaults to the raw_bytes option of the client.
+        """
+        return self.get_invoker(service, method)(
+            request, raw_output, response_fields, raw_bytes, **kwargs
+        )
 
-    def stream_unary(self, service, method, requests, raw_output=False, **kwargs):
-        self.check_method_available(service, method, MethodType.STREAM_UNARY)
-        return self._request(service, method, requests, raw_output, **kwargs)
+    def request_future(
+        self,
+        service,
+        method,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ) -> ResponseFuture:
+        """
+        Start a call of a unary response method without waiting for its response,
+        so many calls can be in flight from one thread.
 
-    def stream_stream(self, service, method, requests, raw_output=False, **kwargs):
-        self.check_method_available(service, method, MethodType.STREAM_STREAM)
-        return self._request(service, method, requests, raw_output, **kwargs)
+        Takes the arguments of request.
+
+        :return: A ResponseFuture; its result is the response converted like
+            request converts it, and it raises the grpc.RpcError of a failed call.
+        """
+        return self.get_invoker(service, method).future(
+            request, raw_output, response_fields, raw_bytes, **kwargs
+        )
+
+    def map(
+        self,
+        service,
+        method,
+        requests: Iterable,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        ordered=True,
+        return_exceptions=False,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        """
+        Call a unary response method with every request, pipelining the calls
+        with request_future instead of waiting for each response in turn.
+
+        Requests are read and calls started as earlier calls complete; closing the
+        iterator early cancels the calls in flight.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param requests: The requests, or request iterators for stream request
+            methods.
+        :param max_in_flight: The maximum number of calls in flight.
+        :param ordered: Yield the responses in the order of the requests, or else
+            (index, response) pairs as the calls complete.
+        :param return_exceptions: Yield the grpc.RpcError of failed calls instead of
+            raising it, which ends the iteration.
+        :return: An iterator of the responses, converted like request converts them.
+        """
+        invoker = self.get_invoker(service, method)
+        if not invoker.method_type.is_unary_response:
+            raise ValueError(
+                f"{method} is {invoker.method_type.value}, "
+                "only unary response methods can be mapped"
+            )
+
+        def submit(request):
+            return invoker.future(
+                request, raw_output, response_fields, raw_bytes, **kwargs
+            )
+
+        map_requests = map_ordered if ordered else map_completed
+        return map_requests(submit, requests, max_in_flight, return_exceptions)
+
+    def unary_unary(
+        self,
+        service,
+        method,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        return self.get_invoker(service, method, MethodType.UNARY_UNARY)(
+            request, raw_output, response_fields, raw_bytes, **kwargs
+        )
+
+    def unary_stream(
+        self,
+        service,
+        method,
+        request=None,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        return self.get_invoker(service, method, MethodType.UNARY_STREAM)(
+            request, raw_output, response_fields, raw_bytes, **kwargs
+        )
+
+    def stream_unary(
+        self,
+        service,
+        method,
+        requests,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        return self.get_invoker(service, method, MethodType.STREAM_UNARY)(
+            requests, raw_output, response_fields, raw_bytes, **kwargs
+        )
+
+    def stream_stream(
+        self,
+        service,
+        method,
+        requests,
+        raw_output=False,
+        response_fields=None,
+        raw_bytes=None,
+        **kwargs,
+    ):
+        return self.get_invoker(service, method, MethodType.STREAM_STREAM)(
+            requests, raw_output, response_fields, raw_bytes, **kwargs
+        )
+
+    def collect_columns(
+        self,
+        service,
+        method,
+        fields,
+        request=None,
+        batch_size=DEFAULT_BATCH_SIZE,
+        use_numpy=None,
+        **kwargs,
+    ):
+        """
+        Call a stream response method and collect fields of its responses into
+        typed columns instead of a dict per response, see ColumnCollector.
+
+        :param service: The name of the service.
+        :param method: The name of the method.
+        :param fields: Scalar field paths of the columns, such as "id,price".
+        :param request: The request dict or message, or an iterator of them for
+            stream request methods.
+        :param batch_size: The number of responses of each batch of columns.
+        :param use_numpy: Build numpy arrays, defaults to whether numpy is installed.
+        :return: An iterator of batches, dicts of columns by field path.
+        """
+        invoker = self.get_invoker(service, method)
+        if invoker.method_type.is_unary_response:
+            raise ValueError(f"{method} is {invoker.method_type.value}, not a stream")
+        collector = get_column_collector(
+            invoker.method_meta.output_type.DESCRIPTOR, fields, batch_size, use_numpy
+        )
+        return collector.collect(invoker(request, True, None, False, **kwargs))
 
     def get_service_descriptor(self, service):
         """
@@ -422,6 +1279,9 @@ class BaseGrpcClient(BaseClient):
         :return: The service descriptor.
         :throws KeyError: If the service is not found in the descriptor pool.
         """
+        schema = self._service_schemas.get(service)
+        if schema is not None:
+            return schema.descriptor
         return self._desc_pool.FindServiceByName(service)
 
     def describe_request(self, service, method):
@@ -468,6 +1328,7 @@ class ReflectionClient(BaseGrpcClient):
         lazy=False,
         ssl=False,
         compression=None,
+        descriptor_cache: Optional[DescriptorCache] = None,
         **kwargs,
     ):
         super().__init__(
@@ -480,18 +1341,71 @@ class ReflectionClient(BaseGrpcClient):
             **kwargs,
         )
         self.reflection_stub = reflection_pb2_grpc.ServerReflectionStub(self.channel)
+        self._reflection_sessions = threading.local()
+        self._descriptor_cache = descriptor_cache
+        self._loaded_from_descriptor_cache = (
+            self._load_descriptor_cache() if descriptor_cache else False
+        )
         if not self._lazy:
             self.register_all_service()
 
+    def _load_descriptor_cache(self):
+        file_descriptors = self._descriptor_cache.load(",".join(self.endpoints))
+        if file_descriptors is None:
+            return False
+        if not add_cached_file_descriptors(self._desc_pool, file_descriptors):
+            return False
+        self._service_names = tuple(
+            service_names_from_file_descriptors(file_descriptors)
+        )
+        logger.debug(f"loaded {self.endpoint} descriptors from cache")
+        return True
+
+    def _store_descriptor_cache(self):
+        file_descriptors = [
+            self.get_service_descriptor(service_name).file
+            for service_name in self.service_names
+            if self._is_service_registered(service_name)
+        ]
+        self._descriptor_cache.store(
+            ",".join(self.endpoints), collect_file_descriptors(file_descriptors)
+        )
+
     def _reflection_request(self, *requests):
         responses = self.reflection_stub.ServerReflectionInfo((r for r in requests))
         return responses
 
+    @contextmanager
+    def reflection_session(self):
+        """
+        Keep a single reflection stream open for every reflection request made by
+        this thread within the context. Nested sessions reuse the outer stream.
+        """
+        session = getattr(self._reflection_sessions, "session", None)
+        if session is not None:
+            yield session
+            return
+        session = ReflectionSession(self.reflection_stub)
+        self._reflection_sessions.session = session
+        try:
+            yield session
+        finally:
+            self._reflection_sessions.session = None
+            session.close()
+
+    def _reflection_pipeline(self, requests):
+        with self.reflection_session() as session:
+            return session.pipeline(requests)
+
     def _reflection_single_request(self, request):
-        results = list(self._reflection_request(request))
-        if len(results) > 1:
-            raise ValueError("response has more than one result")
-        return results[0]
+        return self._reflection_pipeline([request])[0]
+
+    @staticmethod
+    def _file_descriptors_from_response(response):
+        return [
+            descriptor_pb2.FileDescriptorProto.FromString(proto)
+            for proto in response.file_descriptor_response.file_descriptor_proto
+        ]
 
     def _get_service_names(self):
         request = reflection_pb2.ServerReflectionRequest(list_services="")
@@ -502,17 +1416,43 @@ class ReflectionClient(BaseGrpcClient):
     def get_file_descriptors_by_name(self, name):
         request = reflection_pb2.ServerReflectionRequest(file_by_filename=name)
         result = self._reflection_single_request(request)
-        return [
-            descriptor_pb2.FileDescriptorProto.FromString(proto)
-            for proto in result.file_descriptor_response.file_descriptor_proto
-        ]
+        return self._file_descriptors_from_response(result)
 
     def get_file_descriptors_by_symbol(self, symbol):
         request = reflection_pb2.ServerReflectionRequest(file_containing_symbol=symbol)
         result = self._reflection_single_request(request)
+        return self._file_descriptors_from_response(result)
+
+    def get_file_descriptors_by_names(self, names):
+        """
+        Pipeline file_by_filename requests for several files over one stream.
+
+        :param names: The file names to look up.
+        :return: A list of FileDescriptorProto lists, one per name in the given order.
+        """
+        requests = [
+            reflection_pb2.ServerReflectionRequest(file_by_filename=name)
+            for name in names
+        ]
         return [
-            descriptor_pb2.FileDescriptorProto.FromString(proto)
-            for proto in result.file_descriptor_response.file_descriptor_proto
+            self._file_descriptors_from_response(result)
+            for result in self._reflection_pipeline(requests)
+        ]
+
+    def get_file_descriptors_by_symbols(self, symbols):
+        """
+        Pipeline file_containing_symbol requests for several symbols over one stream.
+
+        :param symbols: The symbols to look up.
+        :return: A list of FileDescriptorProto lists, one per symbol in the given order.
+        """
+        requests = [
+            reflection_pb2.ServerReflectionRequest(file_containing_symbol=symbol)
+            for symbol in symbols
+        ]
+        return [
+            self._file_descriptors_from_response(result)
+            for result in self._reflection_pipeline(requests)
         ]
 
     def _is_descriptor_registered(self, filename):
@@ -527,42 +1467,56 @@ class ReflectionClient(BaseGrpcClient):
         self, file_descriptors: List[descriptor_pb2.FileDescriptorProto]
     ):
         """
-        Iterate over descriptors for registration, including returned descriptors as possible dependencies.
-        This is necessary as while in practice descriptors appear to be returned in an order that works for dependency
-        registration, this is not guaranteed in the reflection specification.
+        Register descriptors, including returned descriptors as possible dependencies.
+        The descriptors are indexed by name and added to the pool in dependency order,
+        as while in practice descriptors appear to be returned in an order that works for
+        dependency registration, this is not guaranteed in the reflection specification.
+        Dependencies that are neither passed in nor registered are requested in one batch.
         :param file_descriptors: List of FileDescriptorProto to register
         """
+        file_descriptors_by_name: Dict[str, descriptor_pb2.FileDescriptorProto] = {}
         for file_descriptor in file_descriptors:
-            self._register_file_descriptor(file_descriptor, file_descriptors)
-
-    def _register_file_descriptor(self, file_descriptor, file_descriptors):
-        if not self._is_descriptor_registered(file_descriptor.name):
-            logger.debug(f"start {file_descriptor.name} register")
-            dependencies = list(file_descriptor.dependency)
-            logger.debug(
-                f"found {len(dependencies)} dependencies for {file_descriptor.name}"
-            )
-            for dep_file_name in dependencies:
-                if not self._is_descriptor_registered(dep_file_name):
-                    # First look for dependency in the passed descriptors
-                    dep_desc = next(
-                        (x for x in file_descriptors if x.name == dep_file_name), None
-                    )
-                    # Otherwise get it from the client
-                    if not dep_desc:
-                        dep_descs = self.get_file_descriptors_by_name(dep_file_name)
-                        dep_desc = dep_descs[0]
-                        if len(dep_descs) > 1:
-                            file_descriptors += dep_descs[1:]
-                    # Remove the one we are looking for and use the rest as dependencies
-                    self._register_file_descriptor(dep_desc, file_descriptors)
-            try:
-                self._desc_pool.Add(file_descriptor)
-            except TypeError:
-                logger.debug(
-                    f"{file_descriptor.name} already present in pool. Skipping."
-                )
-            logger.debug(f"{file_descriptor.name} registration complete")
+            file_descriptors_by_name.setdefault(file_descriptor.name, file_descriptor)
+
+        requested: Set[str] = set()
+        missing = self._missing_dependencies(file_descriptors_by_name)
+        while missing:
+            unresolved = requested.intersection(missing)
+            if unresolved:
+                raise ValueError(f"can not resolve dependencies {sorted(unresolved)}")
+            logger.debug(f"requesting missing dependencies {missing}")
+            requested.update(missing)
+            for dep_descs in self.get_file_descriptors_by_names(missing):
+                for dep_desc in dep_descs:
+                    file_descriptors_by_name.setdefault(dep_desc.name, dep_desc)
+            missing = self._missing_dependencies(file_descriptors_by_name)
+
+        for file_descriptor in sort_file_descriptors(file_descriptors_by_name):
+            self._add_file_descriptor(file_descriptor)
+
+    def _missing_dependencies(
+        self, file_descriptors_by_name: Dict[str, descriptor_pb2.FileDescriptorProto]
+    ) -> List[str]:
+        missing: Dict[str, None] = {}
+        for file_descriptor in file_descriptors_by_name.values():
+            if self._is_descriptor_registered(file_descriptor.name):
+                continue
+            for dep_file_name in file_descriptor.dependency:
+                if dep_file_name not in file_descriptors_by_name and (
+                    not self._is_descriptor_registered(dep_file_name)
+                ):
+                    missing[dep_file_name] = None
+        return list(missing)
+
+    def _add_file_descriptor(self, file_descriptor):
+        if self._is_descriptor_registered(file_descriptor.name):
+            return
+        logger.debug(f"start {file_descriptor.name} register")
+        try:
+            self._desc_pool.Add(file_descriptor)
+        except TypeError:
+            logger.debug(f"{file_descriptor.name} already present in pool. Skipping.")
+        logger.debug(f"{file_descriptor.name} registration complete")
 
     def _is_service_registered(self, service_name):
         try:
@@ -572,14 +1526,55 @@ class ReflectionClient(BaseGrpcClient):
         except KeyError:
             return False
 
+    def _register_service_files(self, service_names):
+        """
+        Reflect the files of several services in one pipelined batch and register them.
+        When sharing schemas, services whose reflected files match an already known
+        schema reuse it instead of registering the files.
+        """
+        requests = [
+            reflection_pb2.ServerReflectionRequest(file_containing_symbol=service_name)
+            for service_name in service_names
+        ]
+        responses = self._reflection_pipeline(requests)
+        for service_name, response in zip(service_names, responses):
+            if self._share_schema:
+                fingerprint = fingerprint_service(
+                    service_name,
+                    response.file_descriptor_response.file_descriptor_proto,
+                )
+                schema = schema_registry.get(fingerprint)
+                if schema is not None:
+                    logger.debug(f"{service_name} reuses a shared schema")
+                    self._service_schemas[service_name] = schema
+                    continue
+                self._service_fingerprints[service_name] = fingerprint
+            self.register_file_descriptors(
+                self._file_descriptors_from_response(response)
+            )
+
     def register_service(self, service_name):
         if not self._is_service_registered(service_name):
             logger.debug(f"start {service_name} registration")
-            file_descriptors = self.get_file_descriptors_by_symbol(service_name)
-            self.register_file_descriptors(file_descriptors)
+            with self.reflection_session():
+                self._register_service_files([service_name])
             logger.debug(f"{service_name} registration complete")
         super(ReflectionClient, self).register_service(service_name)
 
+    def register_all_service(self):
+        with self.reflection_session():
+            self._register_service_files(
+                [
+                    service_name
+                    for service_name in self.service_names
+                    if not self._is_service_registered(service_name)
+                ]
+            )
+            super(ReflectionClient, self).register_all_service()
+        if self._descriptor_cache and not self._loaded_from_descriptor_cache:
+            self._store_descriptor_cache()
+            self._loaded_from_descriptor_cache = True
+
 
 class StubClient(BaseGrpcClient):
     def __init__(
@@ -623,11 +1618,30 @@ class ServiceClient:
         self.name = service_name
         self._methods_meta = self.client.get_methods_meta(self.name)
         self._method_names = tuple(self._methods_meta.keys())
-        self._register_methods()
 
-    def _register_methods(self):
-        for method in self._method_names:
-            setattr(self, method, partial(self.client.request, self.name, method))
+    def __getattr__(self, name):
+        # methods resolve to the cached invokers of the client on every access,
+        # rather than being bound once, as registering the service again
+        # replaces them
+        if name.startswith("_") or name not in self._method_names:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            )
+        return self.client.get_invoker(self.name, name)
+
+    def set_request_template(
+        self,
+        method: str,
+        template,
+        parse_dict_kwargs: Optional[Dict[str, Any]] = None,
+    ) -> Optional[RequestTemplate]:
+        """
+        Register a request template for a method of the service, making the
+        requests of its calls deltas, see BaseGrpcClient.set_request_template.
+        """
+        return self.client.set_request_template(
+            self.name, method, template, parse_dict_kwargs
+        )
 
     @property
     def method_names(self):
@@ -640,25 +1654,26 @@ class ServiceClient:
 
 Client = ReflectionClient
 
-_cached_clients: Dict[str, Union[StubClient, ReflectionClient]] = {}
+
+def _close_cached_client(client):
+    client.channel.close()
+
+
+# clients of get_by_endpoint, keyed by their class, endpoint and options
+client_cache = ClientCache(_close_cached_client)
 
 
 def get_by_endpoint(endpoint: str, service_descriptors=None, **kwargs) -> Client:
-    global _cached_clients
-    if endpoint not in _cached_clients:
-        if service_descriptors:
-            _cached_clients[endpoint] = StubClient(
-                endpoint, service_descriptors=service_descriptors, **kwargs
-            )
-        else:
-            _cached_clients[endpoint] = ReflectionClient(endpoint, **kwargs)
-    return _cached_clients[endpoint]  # type: ignore[return-value]
+    if service_descriptors:
+        return StubClient.get_by_endpoint(  # type: ignore[return-value]
+            endpoint, service_descriptors=service_descriptors, **kwargs
+        )
+    return ReflectionClient.get_by_endpoint(endpoint, **kwargs)
 
 
 def reset_cached_client(endpoint=None):
-    global _cached_clients
-    if endpoint:
-        if endpoint in _cached_clients:
-            del _cached_clients[endpoint]
-    else:
-        _cached_clients = {}
+    """
+    Forget the cached clients of an endpoint, or every cached client, without
+    closing their channels.
+    """
+    client_cache.remove(endpoint)
@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+
+
+def freeze_option(value) -> Hashable:
+    """
+    A hashable form of a client option: lists, tuples, sets and dicts are frozen
+    recursively, and other unhashable values stand for their identity.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_option(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(
+            sorted(
+                ((key, freeze_option(item)) for key, item in value.items()),
+                key=repr,
+            )
+        )
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze_option(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return ("id", id(value))
+    return value
+
+
+def client_key(client_class, endpoint, kwargs: Dict[str, Any]) -> Hashable:
+    """
+    The cache key of a client: its class, endpoint and every connection option.
+    """
+    return (
+        client_class,
+        freeze_option(endpoint),
+        freeze_option(kwargs),
+    )
+
+
+class _Entry:
+    __slots__ = ("client", "last_used")
+
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+
+
+class ClientCache:
+    """
+    A thread safe cache of clients keyed by their class, endpoint and options, so
+    clients created with different options are never shared.
+
+    A client is created once even when several threads ask for it at the same
+    time: the others wait for it. Clients are kept until removed by default.
+    With a max_size, the least recently used clients beyond it are evicted, and
+    with idle_seconds, the clients unused for that long; the channels of evicted
+    clients are closed with close_client even when callers still hold them, so
+    the limits must leave room for every client in use.
+
+    :param close_client: Closes the channel of an evicted client.
+    :param max_size: The number of clients kept, None for no limit.
+    :param idle_seconds: The time after which unused clients are evicted, None to
+        keep them.
+    """
+
+    def __init__(
+        self,
+        close_client: Callable[[Any], None],
+        max_size: Optional[int] = None,
+        idle_seconds: Optional[float] = None,
+    ):
+        self.close_client = close_client
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._creating: Dict[Hashable, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, create: Callable[[], Any]):
+        """
+        Get the client of a key, creating it with create if it is not cached.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self.hits += 1
+                    entry.last_used = time.monotonic()
+                    self._entries.move_to_end(key)
+                    return entry.client
+                creating = self._creating.get(key)
+                if creating is None:
+                    self.misses += 1
+                    self._creating[key] = threading.Event()
+                    break
+            # another thread creates the client, use it once it is cached
+            creating.wait()
+        try:
+            client = create()
+        except BaseException:
+            with self._lock:
+                self._creating.pop(key).set()
+            raise
+        with self._lock:
+            self._entries[key] = _Entry(client)
+            self._creating.pop(key).set()
+            evicted = self._evict()
+        self._close(evicted)
+        return client
+
+    def _evict(self) -> list:
+        evicted = []
+        if self.idle_seconds is not None:
+            idle_since = time.monotonic() - self.idle_seconds
+            while self._entries:
+                entry = next(iter(self._entries.values()))
+                if entry.last_used > idle_since:
+                    break
+                evicted.append(self._entries.popitem(last=False)[1].client)
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                evicted.append(self._entries.popitem(last=False)[1].client)
+        self.evictions += len(evicted)
+        return evicted
+
+    def _close(self, clients: list):
+        for client in clients:
+            self._close_client(client)
+
+    def _close_client(self, client):
+        try:
+            self.close_client(client)
+        except Exception as e:  # pylint: disable=bare-except
+            logger.warning("can not close channel", exc_info=e)
+
+    def evict_idle(self):
+        """
+        Evict the clients unused for idle_seconds, and the least recently used
+        clients beyond max_size.
+        """
+        with self._lock:
+            evicted = self._evict()
+        self._close(evicted)
+
+    def remove(self, endpoint=None):
+        """
+        Forget the clients of an endpoint, or every client. Their channels are not
+        closed, as callers may still hold the clients; callers close the clients
+        they got when done with them.
+        """
+        with self._lock:
+            if endpoint is None:
+                self._entries.clear()
+                return
+            endpoint = freeze_option(endpoint)
+            for key in [key for key in self._entries if key[1] == endpoint]:
+                del self._entries[key]
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                self.hits, self.misses, self.evictions, len(self._entries)
+            )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
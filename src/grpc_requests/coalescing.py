@@ -0,0 +1,260 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import grpc
+
+
+class CoalescingStats(NamedTuple):
+    calls: int
+    coalesced: int
+    in_flight: int
+
+
+class CoalescedFuture(grpc.Future):
+    """
+    The future of a caller of a coalesced call. Every caller has a future of its
+    own: cancelling it only stops that caller from waiting, and the call is
+    cancelled once every caller holding a future of it cancelled theirs.
+    """
+
+    def __init__(
+        self, coalescer: "RequestCoalescer", key: Hashable, shared: "_SharedCall"
+    ):
+        self._coalescer = coalescer
+        self._key = key
+        self._shared = shared
+        self._future: concurrent.futures.Future = concurrent.futures.Future()
+
+    def cancel(self) -> bool:
+        if not self._future.cancel():
+            return False
+        self._coalescer._release(self._key, self._shared)
+        return True
+
+    def cancelled(self) -> bool:
+        return self._future.cancelled()
+
+    def running(self) -> bool:
+        return not self._future.done()
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def result(self, timeout: Optional[float] = None):
+        try:
+            return self._future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            raise grpc.FutureTimeoutError() from None
+        except concurrent.futures.CancelledError:
+            raise grpc.FutureCancelledError() from None
+
+    def exception(self, timeout: Optional[float] = None):
+        try:
+            return self._future.exception(timeout)
+        except concurrent.futures.TimeoutError:
+            raise grpc.FutureTimeoutError() from None
+        except concurrent.futures.CancelledError:
+            raise grpc.FutureCancelledError() from None
+
+    def traceback(self, timeout: Optional[float] = None):
+        error = self.exception(timeout)
+        return None if error is None else error.__traceback__
+
+    def add_done_callback(self, fn: Callable[["CoalescedFuture"], None]):
+        self._future.add_done_callback(lambda _: fn(self))
+
+    def _set_outcome(self, response, error: Optional[BaseException]):
+        try:
+            if error is None:
+                self._future.set_result(response)
+            else:
+                self._future.set_exception(error)
+        except concurrent.futures.InvalidStateError:
+            # the caller cancelled its future
+            pass
+
+    def __repr__(self):
+        state = "done" if self.done() else "pending"
+        return f"<{type(self).__name__} {state}>"
+
+
+class _SharedCall:
+    # a call of a sync client and the futures of its callers
+    __slots__ = ("futures", "cancel")
+
+    def __init__(self, cancel: Optional[Callable[[], object]] = None):
+        self.futures: List[CoalescedFuture] = []
+        self.cancel = cancel
+
+
+class _SharedTask:
+    # a call of an async client and the number of its callers waiting for it
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future"):
+        self.task = task
+        self.waiters = 0
+
+
+class RequestCoalescer:
+    """
+    Coalesces concurrent identical calls of unary unary methods: a call made while
+    a call with the same key is in flight makes no call of its own, it waits for
+    the call in flight and gets its response, or its error. The invokers of a
+    client key calls by method, deterministically serialized request and call
+    keyword arguments, so only calls differing in nothing share a call.
+
+    The callers of a coalesced call share its response message, so raw_output
+    responses must not be modified. A coalescer may be shared by several methods,
+    but belongs to sync clients or to the event loop of an async client.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _SharedCall] = {}
+        self._tasks: Dict[Hashable, _SharedTask] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def stats(self) -> CoalescingStats:
+        with self._lock:
+            return CoalescingStats(
+                self.calls, self.coalesced, len(self._calls) + len(self._tasks)
+            )
+
+    def _join(self, key: Hashable) -> Tuple[_SharedCall, Optional[CoalescedFuture]]:
+        # the call in flight with the key and a future of it, or a new call for
+        # the caller to make and no future
+        with self._lock:
+            shared = self._calls.get(key)
+            if shared is None:
+                self.calls += 1
+                shared = self._calls[key] = _SharedCall()
+                return shared, None
+            self.coalesced += 1
+            future = CoalescedFuture(self, key, shared)
+            shared.futures.append(future)
+            return shared, future
+
+    def _finish(
+        self,
+        key: Hashable,
+        shared: _SharedCall,
+        response,
+        error: Optional[BaseException],
+    ):
+        with self._lock:
+            if self._calls.get(key) is shared:
+                del self._calls[key]
+        for future in shared.futures:
+            future._set_outcome(response, error)
+
+    def _release(self, key: Hashable, shared: _SharedCall):
+        # a caller cancelled its future, the call is cancelled when no caller is
+        # left waiting for it
+        with self._lock:
+            if self._calls.get(key) is not shared or shared.cancel is None:
+                return
+            if not all(future.cancelled() for future in shared.futures):
+                return
+            del self._calls[key]
+        shared.cancel()
+
+    def call(self, key: Hashable, call: Callable[[], object]):
+        """
+        Make a call, or wait for the call in flight with the same key.
+
+        :param key: The key of the call.
+        :param call: Makes the call and returns its response.
+        """
+        shared, future = self._join(key)
+        if future is not None:
+            return future.result()
+        try:
+            response = call()
+        except BaseException as e:
+            self._finish(key, shared, None, e)
+            raise
+        self._finish(key, shared, response, None)
+        return response
+
+    def future(
+        self, key: Hashable, start: Callable[[], grpc.Future]
+    ) -> CoalescedFuture:
+        """
+        Start a call without waiting for it, or share the call in flight with the
+        same key.
+
+        :param key: The key of the call.
+        :param start: Starts the call and returns its grpc.Future.
+        :return: The CoalescedFuture of the caller.
+        """
+        shared, future = self._join(key)
+        if future is not None:
+            return future
+        future = CoalescedFuture(self, key, shared)
+        shared.futures.append(future)
+        try:
+            call = start()
+        except BaseException as e:
+            self._finish(key, shared, None, e)
+            raise
+        shared.cancel = call.cancel
+        call.add_done_callback(lambda call: self._call_done(key, shared, call))
+        return future
+
+    def _call_done(self, key: Hashable, shared: _SharedCall, call: grpc.Future):
+        if call.cancelled():
+            self._finish(key, shared, None, grpc.FutureCancelledError())
+        elif call.exception() is not None:
+            self._finish(key, shared, None, call.exception())
+        else:
+            self._finish(key, shared, call.result(), None)
+
+    async def call_async(self, key: Hashable, call: Callable[[], Awaitable]):
+        """
+        Make a call of a grpc.aio channel, or wait for the call in flight with the
+        same key. The call is cancelled once every caller waiting for it is.
+
+        :param key: The key of the call.
+        :param call: Returns the awaitable of the call.
+        """
+        shared = self._tasks.get(key)
+        if shared is None:
+            shared = self._start_task(key, call)
+        else:
+            with self._lock:
+                self.coalesced += 1
+        shared.waiters += 1
+        try:
+            return await asyncio.shield(shared.task)
+        finally:
+            shared.waiters -= 1
+            if not shared.waiters and not shared.task.done():
+                # every caller was cancelled, later calls make a call of their own
+                self._discard_task(key, shared)
+                shared.task.cancel()
+
+    def _start_task(self, key: Hashable, call: Callable[[], Awaitable]) -> _SharedTask:
+        shared = _SharedTask(asyncio.ensure_future(call()))
+        with self._lock:
+            self.calls += 1
+            self._tasks[key] = shared
+        shared.task.add_done_callback(lambda _: self._discard_task(key, shared))
+        return shared
+
+    def _discard_task(self, key: Hashable, shared: _SharedTask):
+        with self._lock:
+            if self._tasks.get(key) is shared:
+                del self._tasks[key]
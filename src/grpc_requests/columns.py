@@ -0,0 +1,199 @@
+from array import array
+from functools import lru_cache, partial
+from operator import attrgetter
+from typing import (
+    Any,
+    AsyncIterable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+
+from .utils import is_repeated_field
+
+try:
+    import numpy  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+# array.array type codes and numpy dtypes of the scalar field types, enums are
+# collected as their numbers
+_ARRAY_TYPECODES = {
+    FieldDescriptor.CPPTYPE_INT32: "i",
+    FieldDescriptor.CPPTYPE_INT64: "q",
+    FieldDescriptor.CPPTYPE_UINT32: "I",
+    FieldDescriptor.CPPTYPE_UINT64: "Q",
+    FieldDescriptor.CPPTYPE_DOUBLE: "d",
+    FieldDescriptor.CPPTYPE_FLOAT: "f",
+    FieldDescriptor.CPPTYPE_BOOL: "b",
+    FieldDescriptor.CPPTYPE_ENUM: "i",
+}
+_NUMPY_DTYPES = {
+    FieldDescriptor.CPPTYPE_INT32: "int32",
+    FieldDescriptor.CPPTYPE_INT64: "int64",
+    FieldDescriptor.CPPTYPE_UINT32: "uint32",
+    FieldDescriptor.CPPTYPE_UINT64: "uint64",
+    FieldDescriptor.CPPTYPE_DOUBLE: "float64",
+    FieldDescriptor.CPPTYPE_FLOAT: "float32",
+    FieldDescriptor.CPPTYPE_BOOL: "bool",
+    FieldDescriptor.CPPTYPE_ENUM: "int32",
+    FieldDescriptor.CPPTYPE_STRING: "object",
+}
+
+DEFAULT_BATCH_SIZE = 65536
+
+
+def resolve_field_path(
+    descriptor: Descriptor, path: str
+) -> Tuple[str, FieldDescriptor]:
+    """
+    Resolve a dot separated path of proto or json field names to the attribute
+    path of a singular scalar field, through singular message fields.
+
+    :param descriptor: The Descriptor the path starts from.
+    :param path: The field path, such as "reading.value".
+    :return: The attribute path and the FieldDescriptor of the scalar field.
+    """
+    attributes = []
+    field: Optional[FieldDescriptor] = None
+    for name in path.split("."):
+        if field is not None:
+            if field.message_type is None:
+                raise ValueError(f"{path} does not lead to a field of a message")
+            descriptor = field.message_type
+        field = descriptor.fields_by_name.get(name) or next(
+            (item for item in descriptor.fields if item.json_name == name), None
+        )
+        if field is None:
+            raise ValueError(f"{descriptor.full_name} has no field {name}")
+        if is_repeated_field(field):
+            raise ValueError(f"{path} is a repeated field, columns need single values")
+        attributes.append(field.name)
+    assert field is not None, "split returns at least one name"
+    if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        raise ValueError(f"{path} is a message field, columns need scalar fields")
+    return ".".join(attributes), field
+
+
+class ColumnCollector:
+    """
+    Accumulates chosen scalar fields of streamed messages into typed columns, and
+    yields them as a batch of columns per batch_size messages, so long streams are
+    never held as one dict per message.
+
+    Columns are numpy arrays when numpy is installed, with dtypes following the
+    field types: string fields are object arrays. Without numpy, numeric and bool
+    fields are array.array columns and string and bytes fields are lists.
+
+    :param descriptor: The Descriptor of the streamed messages.
+    :param fields: Field paths of the columns, as an iterable or a comma separated
+        string, of proto or json names with dots to select fields of singular
+        message fields, such as "reading.value".
+    :param batch_size: The number of messages of each batch.
+    :param use_numpy: Build numpy arrays, defaults to whether numpy is installed.
+    """
+
+    def __init__(
+        self,
+        descriptor: Descriptor,
+        fields: Union[str, Iterable[str]],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        use_numpy: Optional[bool] = None,
+    ):
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ValueError("use_numpy requires numpy to be installed")
+        self.descriptor = descriptor
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        self.fields = tuple(path.strip() for path in fields)
+        if not self.fields:
+            raise ValueError("no fields to collect")
+        self.batch_size = batch_size
+        self.use_numpy = use_numpy
+        resolved = [resolve_field_path(descriptor, path) for path in self.fields]
+        # a single attrgetter reads all the fields of a message in one call
+        self._get_row = attrgetter(*(attribute for attribute, _ in resolved))
+        self._make_columns: List[Callable[[Any], Any]] = [
+            self._compile_column(field) for _, field in resolved
+        ]
+
+    def _compile_column(self, field: FieldDescriptor) -> Callable[[Any], Any]:
+        if self.use_numpy:
+            return partial(numpy.array, dtype=_NUMPY_DTYPES[field.cpp_type])
+        typecode = _ARRAY_TYPECODES.get(field.cpp_type)
+        if typecode is None:
+            return list
+        return partial(array, typecode)
+
+    def _batch(self, rows: list) -> Dict[str, Any]:
+        # attrgetter of a single field returns values rather than rows
+        values = (rows,) if len(self.fields) == 1 else zip(*rows)
+        return {
+            path: make_column(column)
+            for path, make_column, column in zip(
+                self.fields, self._make_columns, values
+            )
+        }
+
+    def collect(self, messages: Iterable) -> Iterable[Dict[str, Any]]:
+        """
+        Collect the columns of messages.
+
+        :param messages: An iterable of messages of the collector's type.
+        :return: An iterator of batches, dicts of columns by field path.
+        """
+        get_row = self._get_row
+        batch_size = self.batch_size
+        rows: list = []
+        for message in messages:
+            rows.append(get_row(message))
+            if len(rows) == batch_size:
+                yield self._batch(rows)
+                rows = []
+        if rows:
+            yield self._batch(rows)
+
+    async def collect_async(self, messages: AsyncIterable) -> AsyncIterable:
+        """
+        Collect the columns of messages from an async iterable, see collect.
+        """
+        get_row = self._get_row
+        batch_size = self.batch_size
+        rows: list = []
+        async for message in messages:
+            rows.append(get_row(message))
+            if len(rows) == batch_size:
+                yield self._batch(rows)
+                rows = []
+        if rows:
+            yield self._batch(rows)
+
+
+@lru_cache(maxsize=256)
+def _get_column_collector(descriptor, fields, batch_size, use_numpy):
+    return ColumnCollector(descriptor, fields, batch_size, use_numpy)
+
+
+def get_column_collector(
+    descriptor: Descriptor,
+    fields: Union[str, Iterable[str]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    use_numpy: Optional[bool] = None,
+) -> ColumnCollector:
+    """
+    Get the cached ColumnCollector of a descriptor and its fields, see
+    ColumnCollector.
+    """
+    if not isinstance(fields, str):
+        fields = tuple(fields)
+    return _get_column_collector(descriptor, fields, batch_size, use_numpy)
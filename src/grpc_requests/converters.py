@@ -0,0 +1,1390 @@
+import base64
+import math
+import re
+import struct
+import threading
+from array import array
+from functools import lru_cache, partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+from google.protobuf import wrappers_pb2
+from google.protobuf.descriptor import Descriptor, EnumDescriptor, FieldDescriptor
+from google.protobuf.internal import type_checkers
+from google.protobuf.json_format import MessageToDict, ParseDict
+from google.protobuf.message import Message
+
+from .utils import is_repeated_field
+
+# Same pattern json_format uses to reject unpaired surrogates in strings
+_UNPAIRED_SURROGATE_PATTERN = re.compile(
+    "[\ud800-\udbff](?![\udc00-\udfff])|(?<![\ud800-\udbff])[\udc00-\udfff]"
+)
+_FLOAT_MAX = 3.4028234663852886e38
+
+_INT_ONLY = frozenset([int])
+_BOOL_ONLY = frozenset([bool])
+_NUMBERS = frozenset([int, float])
+_STR_ONLY = frozenset([str])
+
+_INT_TYPES = frozenset(
+    [
+        FieldDescriptor.CPPTYPE_INT32,
+        FieldDescriptor.CPPTYPE_INT64,
+        FieldDescriptor.CPPTYPE_UINT32,
+        FieldDescriptor.CPPTYPE_UINT64,
+    ]
+)
+
+# Well known types have special JSON mappings, json_format handles them
+_WELL_KNOWN_TYPES = frozenset(
+    [
+        "google.protobuf.Any",
+        "google.protobuf.Duration",
+        "google.protobuf.FieldMask",
+        "google.protobuf.ListValue",
+        "google.protobuf.Struct",
+        "google.protobuf.Timestamp",
+        "google.protobuf.Value",
+        "google.protobuf.BoolValue",
+        "google.protobuf.BytesValue",
+        "google.protobuf.DoubleValue",
+        "google.protobuf.FloatValue",
+        "google.protobuf.Int32Value",
+        "google.protobuf.Int64Value",
+        "google.protobuf.StringValue",
+        "google.protobuf.UInt32Value",
+        "google.protobuf.UInt64Value",
+    ]
+)
+
+
+class _Fallback(Exception):
+    """
+    Raised by compiled converters for input they do not handle themselves.
+    """
+
+
+class _ParseOptions(NamedTuple):
+    ignore_unknown_fields: bool
+    descriptor_pool: Any
+    max_recursion_depth: int
+
+
+def _is_well_known_type(message_descriptor: Descriptor) -> bool:
+    return message_descriptor.full_name in _WELL_KNOWN_TYPES
+
+
+def _convert_int(value):
+    value_type = type(value)
+    if value_type is int:
+        return value
+    if value_type is str and " " not in value:
+        return int(value)
+    if value_type is float and value.is_integer():
+        return int(value)
+    raise _Fallback()
+
+
+def _convert_double(value):
+    value_type = type(value)
+    if value_type is float:
+        if not math.isfinite(value):
+            raise _Fallback()
+        return value
+    if value_type is int:
+        return float(value)
+    raise _Fallback()
+
+
+def _convert_float(value):
+    value_type = type(value)
+    if value_type is float:
+        if not -_FLOAT_MAX <= value <= _FLOAT_MAX:
+            raise _Fallback()
+        return value
+    if value_type is int:
+        return float(value)
+    raise _Fallback()
+
+
+def _convert_bool(value):
+    if type(value) is bool:
+        return value
+    raise _Fallback()
+
+
+def _convert_string(value):
+    if type(value) is str and (
+        value.isascii() or not _UNPAIRED_SURROGATE_PATTERN.search(value)
+    ):
+        return value
+    raise _Fallback()
+
+
+def _convert_bytes(value):
+    if type(value) is str:
+        encoded = value.encode("utf-8")
+    elif type(value) is bytes:
+        encoded = value
+    else:
+        raise _Fallback()
+    return base64.urlsafe_b64decode(encoded + b"=" * (4 - len(encoded) % 4))
+
+
+def _message_type(field: FieldDescriptor) -> Descriptor:
+    descriptor = field.message_type
+    if descriptor is None:
+        raise ValueError(f"{field.full_name} is not a message field")
+    return descriptor
+
+
+def _enum_type(field: FieldDescriptor) -> EnumDescriptor:
+    descriptor = field.enum_type
+    if descriptor is None:
+        raise ValueError(f"{field.full_name} is not an enum field")
+    return descriptor
+
+
+def _compile_enum(field: FieldDescriptor) -> Callable[[Any], int]:
+    numbers_by_name = {value.name: value.number for value in _enum_type(field).values}
+    numbers = frozenset(numbers_by_name.values())
+
+    def convert_enum(value):
+        if type(value) is str:
+            number = numbers_by_name.get(value)
+            if number is not None:
+                return number
+        elif type(value) is int and value in numbers:
+            return value
+        raise _Fallback()
+
+    return convert_enum
+
+
+def _compile_scalar(field: FieldDescriptor) -> Callable[[Any], Any]:
+    cpp_type = field.cpp_type
+    if cpp_type in _INT_TYPES:
+        return _convert_int
+    if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        return _convert_double
+    if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+        return _convert_float
+    if cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        return _convert_bool
+    if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        return _compile_enum(field)
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        return _convert_bytes
+    return _convert_string
+
+
+def _compile_map_key(field: FieldDescriptor) -> Callable[[Any], Any]:
+    cpp_type = field.cpp_type
+    if cpp_type == FieldDescriptor.CPPTYPE_STRING:
+        return _convert_string
+    if cpp_type in _INT_TYPES:
+        return _convert_int
+
+    def convert_bool_key(value):
+        if value == "true":
+            return True
+        if value == "false":
+            return False
+        raise _Fallback()
+
+    return convert_bool_key
+
+
+def _field_message_class(message_class, field: FieldDescriptor):
+    # Taken from an instance, so it is the class the parent expects with every
+    # protobuf implementation and version
+    value = getattr(message_class(), field.name)
+    descriptor = _message_type(field)
+    if descriptor.GetOptions().map_entry:
+        key_type = descriptor.fields_by_name["key"].cpp_type
+        if key_type == FieldDescriptor.CPPTYPE_STRING:
+            return type(value[""])
+        return type(value[False if key_type == FieldDescriptor.CPPTYPE_BOOL else 0])
+    if is_repeated_field(field):
+        return type(value.add())
+    return type(value)
+
+
+def _build_well_known(message_class, value, depth, options: _ParseOptions):
+    # Parsed on its own, with the depth budget left at this level
+    return ParseDict(
+        value,
+        message_class(),
+        ignore_unknown_fields=options.ignore_unknown_fields,
+        descriptor_pool=options.descriptor_pool,
+        max_recursion_depth=options.max_recursion_depth - depth,
+    )
+
+
+class _MessageBuilder:
+    """
+    Builds messages of one class from dicts. Scalar, repeated scalar and scalar map
+    fields are converted into constructor arguments, message fields are filled into
+    the constructed message, each through a converter precompiled for the field.
+    """
+
+    __slots__ = ("message_class", "arguments", "fills", "oneofs")
+
+    def __init__(self, message_class):
+        self.message_class = message_class
+        self.arguments: Dict[str, Tuple[str, Callable]] = {}
+        self.fills: Dict[str, Tuple[str, Callable]] = {}
+        self.oneofs: Tuple[Tuple[str, ...], ...] = ()
+
+    def compile(self):
+        descriptor = self.message_class.DESCRIPTOR
+        fields = descriptor.fields
+        compiled = {
+            field.name: _compile_field(self.message_class, field) for field in fields
+        }
+        # json_format looks json names up before proto names
+        keys = {field.json_name: field for field in fields}
+        for field in fields:
+            keys.setdefault(field.name, field)
+        self.oneofs = tuple(
+            tuple(field.name for field in oneof.fields)
+            for oneof in descriptor.oneofs
+            if len(oneof.fields) > 1
+        )
+        self.fills = {
+            key: (field.name, compiled[field.name][0])
+            for key, field in keys.items()
+            if compiled[field.name][1]
+        }
+        self.arguments = {
+            key: (field.name, compiled[field.name][0])
+            for key, field in keys.items()
+            if not compiled[field.name][1]
+        }
+
+    def build(self, data, depth, options: _ParseOptions):
+        if depth > options.max_recursion_depth or not isinstance(data, dict):
+            raise _Fallback()
+        arguments = self.arguments
+        kwargs = {}
+        nested = None
+        for key, value in data.items():
+            argument = arguments.get(key)
+            if argument is None or value is None:
+                if nested is None:
+                    nested = []
+                nested.append((key, value))
+            else:
+                kwargs[argument[0]] = argument[1](value)
+        fills = self._resolve_fills(nested) if nested else ()
+        # a field given under both its json and proto name
+        if len(kwargs) + len(fills) != len(data):
+            raise _Fallback()
+        if self.oneofs:
+            self._check_oneofs(kwargs, fills)
+        message = self.message_class(**kwargs)
+        for _, fill, value in fills:
+            fill(message, value, depth, options)
+        return message
+
+    def _resolve_fills(self, nested):
+        fills = []
+        names = set()
+        for key, value in nested:
+            fill = self.fills.get(key)
+            if fill is None or value is None or fill[0] in names:
+                raise _Fallback()
+            names.add(fill[0])
+            fills.append((fill[0], fill[1], value))
+        return fills
+
+    def _check_oneofs(self, kwargs, fills):
+        names = set(kwargs)
+        names.update(name for name, _, _ in fills)
+        for members in self.oneofs:
+            if sum(name in names for name in members) > 1:
+                raise _Fallback()
+
+
+_builders: Dict[Any, _MessageBuilder] = {}
+_builders_lock = threading.RLock()
+
+
+def _get_builder(message_class) -> _MessageBuilder:
+    builder = _builders.get(message_class)
+    if builder is None:
+        with _builders_lock:
+            builder = _builders.get(message_class)
+            if builder is None:
+                builder = _MessageBuilder(message_class)
+                # registered before compiling, so recursive types resolve to it
+                _builders[message_class] = builder
+                builder.compile()
+    return builder
+
+
+def _compile_message_build(message_class) -> Callable:
+    if _is_well_known_type(message_class.DESCRIPTOR):
+        return partial(_build_well_known, message_class)
+    builder = _get_builder(message_class)
+
+    def build_message(value, depth, options):
+        return builder.build(value, depth + 1, options)
+
+    return build_message
+
+
+def _scalar_list_check(field: FieldDescriptor) -> Optional[Callable[[list], bool]]:
+    """
+    Compile a check for lists of scalars that can be passed on without converting
+    each item, or None if the items of the field always need converting.
+    """
+    cpp_type = field.cpp_type
+    if cpp_type in _INT_TYPES:
+        return lambda value: set(map(type, value)) <= _INT_ONLY
+    if cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+        return lambda value: set(map(type, value)) <= _BOOL_ONLY
+    if cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        # a sum of finite values that does not overflow has no NaN or infinity
+        return lambda value: (
+            set(map(type, value)) <= _NUMBERS and math.isfinite(math.fsum(value))
+        )
+    if cpp_type == FieldDescriptor.CPPTYPE_FLOAT:
+        return lambda value: (
+            set(map(type, value)) <= _NUMBERS
+            and math.isfinite(math.fsum(value))
+            and max(map(abs, value), default=0) <= _FLOAT_MAX
+        )
+    if cpp_type == FieldDescriptor.CPPTYPE_STRING and field.type != (
+        FieldDescriptor.TYPE_BYTES
+    ):
+        return lambda value: (
+            set(map(type, value)) <= _STR_ONLY and "".join(value).isascii()
+        )
+    return None
+
+
+def _compile_repeated_scalar(field: FieldDescriptor) -> Callable[[Any], list]:
+    convert_item = _compile_scalar(field)
+    check = _scalar_list_check(field)
+
+    def convert_repeated_scalar(value):
+        if not isinstance(value, list):
+            raise _Fallback()
+        if check is not None:
+            try:
+                if check(value):
+                    return value
+            except (OverflowError, TypeError):
+                pass
+        return [convert_item(item) for item in value]
+
+    return convert_repeated_scalar
+
+
+def _compile_map_field(message_class, field: FieldDescriptor) -> Tuple[Callable, bool]:
+    name = field.name
+    convert_key = _compile_map_key(_message_type(field).fields_by_name["key"])
+    value_field = _message_type(field).fields_by_name["value"]
+
+    if value_field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        build_value = _compile_message_build(_field_message_class(message_class, field))
+
+        def fill_message_map(message, value, depth, options):
+            if not isinstance(value, dict):
+                raise _Fallback()
+            entries = getattr(message, name)
+            for key, item in value.items():
+                entries[convert_key(key)].CopyFrom(build_value(item, depth, options))
+
+        return fill_message_map, True
+
+    convert_value = _compile_scalar(value_field)
+
+    def convert_scalar_map(value):
+        if not isinstance(value, dict):
+            raise _Fallback()
+        return {convert_key(key): convert_value(item) for key, item in value.items()}
+
+    return convert_scalar_map, False
+
+
+def _compile_message_field(
+    message_class, field: FieldDescriptor
+) -> Tuple[Callable, bool]:
+    name = field.name
+    build_message = _compile_message_build(_field_message_class(message_class, field))
+
+    if is_repeated_field(field):
+
+        def fill_repeated_message(message, value, depth, options):
+            if not isinstance(value, list):
+                raise _Fallback()
+            items = []
+            for item in value:
+                if item is None:
+                    raise _Fallback()
+                items.append(build_message(item, depth, options))
+            getattr(message, name).extend(items)
+
+        return fill_repeated_message, True
+
+    def fill_message(message, value, depth, options):
+        sub_message = getattr(message, name)
+        sub_message.SetInParent()
+        sub_message.MergeFrom(build_message(value, depth, options))
+
+    return fill_message, True
+
+
+def _compile_field(message_class, field: FieldDescriptor) -> Tuple[Callable, bool]:
+    """
+    Compile the converter of a field.
+
+    :return: The converter and whether it fills the field of a constructed message
+        (message, value, depth, options) instead of converting a constructor
+        argument (value).
+    """
+    if field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE:
+        if _message_type(field).GetOptions().map_entry:
+            return _compile_map_field(message_class, field)
+        return _compile_message_field(message_class, field)
+    if is_repeated_field(field):
+        return _compile_repeated_scalar(field), False
+    return _compile_scalar(field), False
+
+
+class DictToMessageConverter:
+    """
+    Converts dicts into messages of one type with the same results and errors as
+    json_format.ParseDict, through converters precompiled for each field of the type.
+
+    Input the compiled converters do not cover, such as well known types at the top
+    level, extensions, null values, quoted special floats or unknown fields, is
+    handed to ParseDict, which also produces the errors for invalid input.
+
+    :param message_class: The message class to convert dicts into.
+    """
+
+    def __init__(self, message_class):
+        self.message_class = message_class
+        self._builder = (
+            None
+            if _is_well_known_type(message_class.DESCRIPTOR)
+            else _get_builder(message_class)
+        )
+
+    def __call__(
+        self,
+        js_dict,
+        ignore_unknown_fields=False,
+        descriptor_pool=None,
+        max_recursion_depth=100,
+    ) -> Message:
+        if self._builder is not None:
+            options = _ParseOptions(
+                ignore_unknown_fields, descriptor_pool, max_recursion_depth
+            )
+            try:
+                return self._builder.build(js_dict, 1, options)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        return ParseDict(
+            js_dict,
+            self.message_class(),
+            ignore_unknown_fields=ignore_unknown_fields,
+            descriptor_pool=descriptor_pool,
+            max_recursion_depth=max_recursion_depth,
+        )
+
+
+_dict_to_message_converters: Dict[Any, DictToMessageConverter] = {}
+
+
+def get_dict_to_message_converter(message_class) -> DictToMessageConverter:
+    """
+    Get the converter of a message class, compiling it on first use.
+    """
+    converter: Optional[DictToMessageConverter] = _dict_to_message_converters.get(
+        message_class
+    )
+    if converter is None:
+        converter = _dict_to_message_converters.setdefault(
+            message_class, DictToMessageConverter(message_class)
+        )
+    return converter
+
+
+_INT64_TYPES = frozenset(
+    [FieldDescriptor.CPPTYPE_INT64, FieldDescriptor.CPPTYPE_UINT64]
+)
+_float_struct = struct.Struct("<f")
+# enough precisions for any float32 to round trip
+_FLOAT_FORMATS = tuple(f"%.{precision}g" for precision in range(18))
+
+
+class _PrintOptions(NamedTuple):
+    including_default_value_fields: bool
+    preserving_proto_field_name: bool
+    use_integers_for_enums: bool
+    descriptor_pool: Any
+    float_precision: Optional[int]
+
+
+def _shortest_float(value: float) -> float:
+    # type_checkers.ToShortestFloat with struct instead of ctypes to truncate
+    pack, unpack = _float_struct.pack, _float_struct.unpack
+    try:
+        precision = 6
+        rounded = float(_FLOAT_FORMATS[precision] % value)
+        while unpack(pack(rounded))[0] != value:
+            precision += 1
+            rounded = float(_FLOAT_FORMATS[precision] % value)
+        return rounded
+    except (OverflowError, IndexError):
+        return type_checkers.ToShortestFloat(value)
+
+
+def _shortest_floats(values: List[float]) -> List[float]:
+    """
+    _shortest_float over finite values, raising every precision of the values that
+    do not round trip yet together and truncating them in one array conversion.
+    """
+    results = [float("%.6g" % value) for value in values]
+    pending = [
+        i for i, truncated in enumerate(array("f", results)) if truncated != values[i]
+    ]
+    precision = 6
+    while pending:
+        precision += 1
+        float_format = _FLOAT_FORMATS[precision]
+        for i in pending:
+            results[i] = float(float_format % values[i])
+        pending = [
+            i
+            for i, truncated in zip(pending, array("f", [results[i] for i in pending]))
+            if truncated != values[i]
+        ]
+    return results
+
+
+def _print_special_float(value: float):
+    if math.isinf(value):
+        return "-Infinity" if value < 0.0 else "Infinity"
+    return "NaN"
+
+
+def _compile_print_enum(field: FieldDescriptor, options: _PrintOptions):
+    if options.use_integers_for_enums:
+        return None
+    if _enum_type(field).full_name == "google.protobuf.NullValue":
+        return lambda value: None
+    names_by_number = {value.number: value.name for value in _enum_type(field).values}
+    is_closed = getattr(_enum_type(field), "is_closed", False)
+
+    def print_enum(value):
+        name = names_by_number.get(value)
+        if name is not None:
+            return name
+        if is_closed:
+            raise _Fallback()
+        return value
+
+    return print_enum
+
+
+def _compile_print_float(field: FieldDescriptor, options: _PrintOptions):
+    if field.cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        return lambda value: (
+            value if math.isfinite(value) else _print_special_float(value)
+        )
+    if options.float_precision:
+        float_format = f".{options.float_precision}g"
+        return lambda value: (
+            float(format(value, float_format))
+            if math.isfinite(value)
+            else _print_special_float(value)
+        )
+    return lambda value: (
+        _shortest_float(value) if math.isfinite(value) else _print_special_float(value)
+    )
+
+
+def _compile_print_scalar(field: FieldDescriptor, options: _PrintOptions):
+    """
+    :return: The converter of a scalar value, or None when values are printed as is.
+    """
+    cpp_type = field.cpp_type
+    if cpp_type == FieldDescriptor.CPPTYPE_ENUM:
+        return _compile_print_enum(field, options)
+    if cpp_type in (FieldDescriptor.CPPTYPE_DOUBLE, FieldDescriptor.CPPTYPE_FLOAT):
+        return _compile_print_float(field, options)
+    if cpp_type in _INT64_TYPES:
+        return str
+    if field.type == FieldDescriptor.TYPE_BYTES:
+        return lambda value: base64.b64encode(value).decode("utf-8")
+    return None
+
+
+def _compile_print_value(
+    field: FieldDescriptor,
+    options: _PrintOptions,
+    projection: Optional["FieldProjection"] = None,
+):
+    if field.cpp_type != FieldDescriptor.CPPTYPE_MESSAGE:
+        return _compile_print_scalar(field, options)
+    if _is_well_known_type(_message_type(field)):
+        return partial(_print_well_known, options=options)
+    printer = _get_printer(_message_type(field), options, projection)
+    return printer.print
+
+
+def _print_well_known(message, options: _PrintOptions):
+    return MessageToDict(message, **options._asdict())
+
+
+def _print_finite_floats(value, print_item, print_finite: Callable[[list], list]):
+    values = list(value)
+    try:
+        # a sum of finite values that does not overflow has no NaN or infinity
+        if math.isfinite(math.fsum(values)):
+            return print_finite(values)
+    except OverflowError:
+        pass
+    return [print_item(item) for item in values]
+
+
+def _compile_print_repeated(
+    field: FieldDescriptor,
+    options: _PrintOptions,
+    projection: Optional["FieldProjection"] = None,
+):
+    print_item = _compile_print_value(field, options, projection)
+    if print_item is None:
+        return list
+    if field.cpp_type == FieldDescriptor.CPPTYPE_DOUBLE:
+        return partial(_print_finite_floats, print_item=print_item, print_finite=list)
+    if field.cpp_type == FieldDescriptor.CPPTYPE_FLOAT and not options.float_precision:
+        return partial(
+            _print_finite_floats, print_item=print_item, print_finite=_shortest_floats
+        )
+    return lambda value: [print_item(item) for item in value]
+
+
+def _compile_print_map(field: FieldDescriptor, options: _PrintOptions):
+    key_field = _message_type(field).fields_by_name["key"]
+    print_value = _compile_print_value(
+        _message_type(field).fields_by_name["value"], options
+    )
+    if key_field.cpp_type == FieldDescriptor.CPPTYPE_BOOL:
+
+        def print_key(key):
+            return "true" if key else "false"
+
+    else:
+        print_key = str
+    if print_value is None:
+        return lambda value: {print_key(key): item for key, item in value.items()}
+    return lambda value: {
+        print_key(key): print_value(item) for key, item in value.items()
+    }
+
+
+def _is_map_field(field: FieldDescriptor) -> bool:
+    return (
+        field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+        and _message_type(field).GetOptions().map_entry
+    )
+
+
+FieldProjection = Tuple[Tuple[str, Optional["FieldProjection"]], ...]
+FieldPaths = Union[str, Iterable[str], FieldProjection]
+
+
+def _freeze_projection(tree: Dict[str, Optional[dict]]) -> FieldProjection:
+    return tuple(
+        (name, None if child is None else _freeze_projection(child))
+        for name, child in sorted(tree.items())
+    )
+
+
+@lru_cache(maxsize=256)
+def _parse_field_paths_string(fields: str) -> FieldProjection:
+    return _parse_field_paths(fields.split(","))
+
+
+def _parse_field_paths(paths: Iterable[str]) -> FieldProjection:
+    tree: Dict[str, Optional[dict]] = {}
+    for path in paths:
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        *parents, leaf = path.split(".")
+        for name in parents:
+            child = node.setdefault(name, {})
+            if child is None:
+                # the whole field is already selected
+                break
+            node = child
+        else:
+            node[leaf] = None
+    if not tree:
+        raise ValueError(f"no field paths in {paths!r}")
+    return _freeze_projection(tree)
+
+
+def parse_field_paths(fields: FieldPaths) -> FieldProjection:
+    """
+    Parse field paths into the projection tree used by the response converters.
+
+    Paths are dot separated field names, either proto or json names, given as a
+    comma separated string such as "items.id,items.price" or as an iterable of
+    paths. A path ending at a message field selects the whole message, and
+    selecting a field also selects everything below it.
+
+    :param fields: The field paths to select.
+    :return: The projection as a tuple of (name, child projection or None) pairs.
+    """
+    if isinstance(fields, str):
+        return _parse_field_paths_string(fields)
+    if (
+        isinstance(fields, tuple)
+        and fields
+        and all(isinstance(item, tuple) and len(item) == 2 for item in fields)
+    ):
+        # already parsed
+        return fields
+    return _parse_field_paths(cast(Iterable[str], fields))
+
+
+def _project_dict(value, projection: Tuple[Tuple[str, Any], ...]):
+    # applies a projection of output names to a dict printed by MessageToDict
+    if isinstance(value, list):
+        return [_project_dict(item, projection) for item in value]
+    projected = {}
+    for name, child in projection:
+        if name in value:
+            projected[name] = (
+                value[name] if child is None else _project_dict(value[name], child)
+            )
+    return projected
+
+
+# ListFields of the upb implementation lists implicit presence floats set to -0.0,
+# the python implementation does not
+_NEGATIVE_ZERO_LISTED = bool(wrappers_pb2.DoubleValue(value=-0.0).ListFields())
+_HAS_FIELD = object()
+
+
+def _is_negative_zero(value: float) -> bool:
+    return math.copysign(1.0, value) < 0
+
+
+def _has_presence(field: FieldDescriptor) -> bool:
+    has_presence = getattr(field, "has_presence", None)
+    if has_presence is not None:
+        return has_presence
+    # protobuf releases before FieldDescriptor.has_presence
+    return not is_repeated_field(field) and (
+        field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+        or field.containing_oneof is not None
+        or field.file.syntax == "proto2"  # type: ignore[attr-defined]
+    )
+
+
+def _compile_presence(field: FieldDescriptor):
+    """
+    Compile how to tell whether ListFields would list a field: _HAS_FIELD to ask
+    HasField, otherwise a field is listed when its value is truthy, or when the
+    returned check (if any) accepts its falsy value.
+    """
+    if _has_presence(field):
+        return _HAS_FIELD
+    if _NEGATIVE_ZERO_LISTED and field.cpp_type in (
+        FieldDescriptor.CPPTYPE_DOUBLE,
+        FieldDescriptor.CPPTYPE_FLOAT,
+    ):
+        return _is_negative_zero
+    return None
+
+
+class _MessagePrinter:
+    """
+    Converts messages of one type into dicts, with a converter precompiled for each
+    field and the field names and defaults resolved for the print options.
+
+    With a projection, only the selected fields are converted, other fields are
+    skipped without being read.
+    """
+
+    __slots__ = (
+        "descriptor",
+        "options",
+        "projection",
+        "fields",
+        "defaults",
+        "output_projection",
+        "selected",
+        "children",
+    )
+
+    def __init__(
+        self,
+        descriptor: Descriptor,
+        options: _PrintOptions,
+        projection: Optional[FieldProjection] = None,
+    ):
+        self.descriptor = descriptor
+        self.options = options
+        self.projection = projection
+        self.fields: Dict[int, Tuple[str, Optional[Callable]]] = {}
+        self.defaults: Tuple[Tuple[str, Callable[[], Any]], ...] = ()
+        # the projection by output names, for projecting MessageToDict results
+        self.output_projection: Tuple[Tuple[str, Any], ...] = ()
+        # with a projection, the selected fields read directly from the messages
+        self.selected: Optional[
+            Tuple[Tuple[str, str, Any, Optional[Callable]], ...]
+        ] = None
+        # the projections of the message fields selected by field number
+        self.children: Dict[int, Optional[FieldProjection]] = {}
+
+    def _field_name(self, field: FieldDescriptor) -> str:
+        if self.options.preserving_proto_field_name:
+            return field.name
+        return field.json_name
+
+    def _selected_fields(self):
+        if self.projection is None:
+            return [(field, None) for field in self.descriptor.fields]
+        by_name = {}
+        for field in self.descriptor.fields:
+            by_name[field.json_name] = field
+            by_name[field.name] = field
+        selected = {}
+        for name, child in self.projection:
+            field = by_name.get(name)
+            if field is None:
+                raise ValueError(f"{self.descriptor.full_name} has no field {name}")
+            if child is not None and (
+                field.cpp_type != FieldDescriptor.CPPTYPE_MESSAGE
+                or _is_map_field(field)
+                or _is_well_known_type(_message_type(field))
+            ):
+                raise ValueError(
+                    f"can not select fields inside {self.descriptor.full_name}.{name}"
+                )
+            selected[field.number] = (field, child)
+        return [selected[number] for number in sorted(selected)]
+
+    def compile(self):
+        fields = {}
+        output_projection = []
+        selected_fields = self._selected_fields()
+        for field, child in selected_fields:
+            if _is_map_field(field):
+                convert = _compile_print_map(field, self.options)
+            elif is_repeated_field(field):
+                convert = _compile_print_repeated(field, self.options, child)
+            else:
+                convert = _compile_print_value(field, self.options, child)
+            fields[field.number] = (self._field_name(field), convert)
+            self.children[field.number] = child
+            output_projection.append(
+                (
+                    self._field_name(field),
+                    None
+                    if child is None
+                    else _get_printer(
+                        _message_type(field), self.options, child
+                    ).output_projection,
+                )
+            )
+        if self.options.including_default_value_fields:
+            self.defaults = tuple(
+                (self._field_name(field), self._compile_default(field))
+                for field, _ in selected_fields
+                if field.containing_oneof is None
+                and (
+                    is_repeated_field(field)
+                    or field.cpp_type != FieldDescriptor.CPPTYPE_MESSAGE
+                )
+            )
+        self.output_projection = tuple(output_projection)
+        if self.projection is not None:
+            selected = []
+            for field, _ in selected_fields:
+                name, convert = fields[field.number]
+                selected.append((field.name, name, _compile_presence(field), convert))
+            self.selected = tuple(selected)
+        self.fields = fields
+
+    def _compile_default(self, field: FieldDescriptor) -> Callable[[], Any]:
+        if _is_map_field(field):
+            return dict
+        if is_repeated_field(field):
+            return list
+        convert = _compile_print_scalar(field, self.options)
+        default = (
+            field.default_value if convert is None else convert(field.default_value)
+        )
+        return lambda: default
+
+    def print(self, message) -> Dict[str, Any]:
+        if self.selected is not None:
+            js = self._print_selected(message, self.selected)
+        else:
+            fields = self.fields
+            js = {}
+            for field, value in message.ListFields():
+                printed_field = fields.get(field.number)
+                if printed_field is None:
+                    # extensions
+                    raise _Fallback()
+                name, convert = printed_field
+                js[name] = value if convert is None else convert(value)
+        for name, default in self.defaults:
+            if name not in js:
+                js[name] = default()
+        return js
+
+    def _print_selected(self, message, selected) -> Dict[str, Any]:
+        # same fields ListFields would list, without listing the fields not selected
+        js = {}
+        for attribute, name, present, convert in selected:
+            if present is _HAS_FIELD:
+                if not message.HasField(attribute):
+                    continue
+                value = getattr(message, attribute)
+            else:
+                value = getattr(message, attribute)
+                if not value and (present is None or not present(value)):
+                    continue
+            js[name] = value if convert is None else convert(value)
+        return js
+
+
+def _list_selected_fields(message, selected):
+    # the generator form of _MessagePrinter._print_selected
+    for attribute, name, present, convert in selected:
+        if present is _HAS_FIELD:
+            if not message.HasField(attribute):
+                continue
+            value = getattr(message, attribute)
+        else:
+            value = getattr(message, attribute)
+            if not value and (present is None or not present(value)):
+                continue
+        yield name, convert, value
+
+
+_PrinterKey = Tuple[Descriptor, _PrintOptions, Optional[FieldProjection]]
+_printers: Dict[_PrinterKey, _MessagePrinter] = {}
+_printers_lock = threading.RLock()
+
+
+def _get_printer(
+    descriptor: Descriptor,
+    options: _PrintOptions,
+    projection: Optional[FieldProjection] = None,
+) -> _MessagePrinter:
+    key = (descriptor, options, projection)
+    printer = _printers.get(key)
+    if printer is None:
+        with _printers_lock:
+            printer = _printers.get(key)
+            if printer is None:
+                printer = _MessagePrinter(descriptor, options, projection)
+                # registered before compiling, so recursive types resolve to it
+                _printers[key] = printer
+                try:
+                    printer.compile()
+                except Exception:
+                    del _printers[key]
+                    raise
+    return printer
+
+
+class _MessageViewType:
+    """
+    The fields of one message type for MessageView, reusing the converters of the
+    message printer except for message fields, which become nested views.
+    """
+
+    __slots__ = ("printer", "fields", "selected")
+
+    def __init__(self, printer: _MessagePrinter):
+        self.printer = printer
+        self.fields: Dict[int, Tuple[str, Optional[Callable]]] = {}
+        self.selected: Optional[
+            Tuple[Tuple[str, str, Any, Optional[Callable]], ...]
+        ] = None
+
+    def compile(self):
+        printer = self.printer
+        descriptor = printer.descriptor
+        fields_by_name = descriptor.fields_by_name
+        fields = {}
+        for number, (name, convert) in printer.fields.items():
+            field = descriptor.fields_by_number[number]
+            if (
+                field.cpp_type == FieldDescriptor.CPPTYPE_MESSAGE
+                and not _is_map_field(field)
+                and not _is_well_known_type(_message_type(field))
+            ):
+                view_type = _get_view_type(
+                    _message_type(field), printer.options, printer.children[number]
+                )
+                if is_repeated_field(field):
+                    convert = partial(_view_list, view_type=view_type)
+                else:
+                    convert = partial(MessageView, view_type=view_type)
+            fields[number] = (name, convert)
+        if printer.selected is not None:
+            self.selected = tuple(
+                (attribute, name, present, fields[fields_by_name[attribute].number][1])
+                for attribute, name, present, _ in printer.selected
+            )
+        self.fields = fields
+
+    def list_fields(self, message) -> Tuple[Dict[str, Any], Dict[str, tuple]]:
+        """
+        List the fields of a message as the values converted without any work and
+        the (converter, value) pairs of the fields left to convert.
+        """
+        if self.selected is None:
+            values, pending = self._list_set_fields(message)
+        else:
+            values, pending = self._list_selected(message)
+        for name, default in self.printer.defaults:
+            if name not in values:
+                values[name] = default()
+        return values, pending
+
+    def _list_set_fields(self, message):
+        fields = self.fields
+        values = {}
+        pending = {}
+        for field, value in message.ListFields():
+            view_field = fields.get(field.number)
+            if view_field is None:
+                # extensions
+                raise _Fallback()
+            name, convert = view_field
+            if convert is None:
+                values[name] = value
+            else:
+                values[name] = None
+                pending[name] = (convert, value)
+        return values, pending
+
+    def _list_selected(self, message):
+        values = {}
+        pending = {}
+        for name, convert, value in _list_selected_fields(message, self.selected):
+            if convert is None:
+                values[name] = value
+            else:
+                values[name] = None
+                pending[name] = (convert, value)
+        return values, pending
+
+    def to_dict(self, message) -> Dict[str, Any]:
+        # the conversion of MessageToDict, for fields the views do not convert
+        printer = self.printer
+        js = MessageToDict(message, **printer.options._asdict())
+        if printer.projection is not None:
+            return _project_dict(js, printer.output_projection)
+        return js
+
+
+_view_types: Dict[_PrinterKey, _MessageViewType] = {}
+
+
+def _get_view_type(
+    descriptor: Descriptor,
+    options: _PrintOptions,
+    projection: Optional[FieldProjection] = None,
+) -> _MessageViewType:
+    key = (descriptor, options, projection)
+    view_type = _view_types.get(key)
+    if view_type is None:
+        with _printers_lock:
+            view_type = _view_types.get(key)
+            if view_type is None:
+                view_type = _MessageViewType(
+                    _get_printer(descriptor, options, projection)
+                )
+                # registered before compiling, so recursive types resolve to it
+                _view_types[key] = view_type
+                view_type.compile()
+    return view_type
+
+
+def _view_list(value, view_type: _MessageViewType) -> List["MessageView"]:
+    return [MessageView(item, view_type) for item in value]
+
+
+class MessageView(dict):
+    """
+    A read-only dict of a message, holding the same keys and values as the dict
+    json_format.MessageToDict returns, but converting each field only when it is
+    first read, and nested messages into views of their own.
+
+    Being a dict, views can be passed to json.dumps and compared to dicts. Views
+    are created by MessageViewConverter.
+    """
+
+    __slots__ = ("_message", "_view_type", "_pending")
+
+    def __init__(self, message, view_type: _MessageViewType):
+        values, pending = view_type.list_fields(message)
+        # fields left to convert hold None until first read
+        super().__init__(values)
+        self._message = message
+        self._view_type = view_type
+        self._pending = pending
+
+    def _convert(self, key, item):
+        convert, value = item
+        try:
+            converted = convert(value)
+        except Exception:  # pylint: disable=broad-except
+            converted = self._view_type.to_dict(self._message)[key]
+        dict.__setitem__(self, key, converted)
+        # removed after the value is set, so concurrent readers never see None
+        self._pending.pop(key, None)
+        return converted
+
+    def __getitem__(self, key):
+        item = self._pending.get(key)
+        if item is None:
+            return dict.__getitem__(self, key)
+        return self._convert(key, item)
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def _convert_all(self):
+        for key, item in list(self._pending.items()):
+            self._convert(key, item)
+
+    def __iter__(self):
+        # overridden so dict() and ** unpacking read the values through __getitem__
+        return dict.__iter__(self)
+
+    def values(self):
+        self._convert_all()
+        return dict.values(self)
+
+    def items(self):
+        self._convert_all()
+        return dict.items(self)
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __reduce__(self):
+        return dict, (self.copy(),)
+
+    def __eq__(self, other):
+        self._convert_all()
+        if isinstance(other, MessageView):
+            other._convert_all()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self):
+        self._convert_all()
+        return dict.__repr__(self)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only")
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    __ior__ = _read_only
+
+
+class MessageToDictConverter:
+    """
+    Converts messages of one type into dicts with the same results as
+    json_format.MessageToDict called with the same options, through converters
+    precompiled for each field of the type.
+
+    Well known types are converted by MessageToDict, as are messages the compiled
+    converters do not cover, such as messages with extensions or closed enums
+    holding unknown values, so errors are the ones MessageToDict raises.
+
+    :param message_class: The message class to convert messages of.
+    :param fields: Optional field paths to convert, see parse_field_paths. Only the
+        selected fields are included in the dicts, and the fields not selected are
+        not converted at all.
+    """
+
+    def __init__(
+        self,
+        message_class,
+        including_default_value_fields=False,
+        preserving_proto_field_name=False,
+        use_integers_for_enums=False,
+        descriptor_pool=None,
+        float_precision=None,
+        fields: Optional[FieldPaths] = None,
+    ):
+        self.message_class = message_class
+        self._options = _PrintOptions(
+            including_default_value_fields,
+            preserving_proto_field_name,
+            use_integers_for_enums,
+            descriptor_pool,
+            float_precision,
+        )
+        self.projection = None if fields is None else parse_field_paths(fields)
+        descriptor = message_class.DESCRIPTOR
+        self._printer: Optional[_MessagePrinter]
+        if _is_well_known_type(descriptor):
+            if self.projection is not None:
+                raise ValueError(f"can not select fields of {descriptor.full_name}")
+            self._printer = None
+        else:
+            self._printer = _get_printer(descriptor, self._options, self.projection)
+
+    def __call__(self, message) -> Dict[str, Any]:
+        if self._printer is not None:
+            try:
+                return self._printer.print(message)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        js = MessageToDict(message, **self._options._asdict())
+        if self._printer is not None and self.projection is not None:
+            return _project_dict(js, self._printer.output_projection)
+        return js
+
+
+# converters by message class, projection and MessageToDict options
+_ConverterKey = Tuple[Any, Optional[FieldProjection], Tuple[Tuple[str, Any], ...]]
+
+_message_to_dict_converters: Dict[_ConverterKey, MessageToDictConverter] = {}
+
+
+def get_message_to_dict_converter(
+    message_class, fields: Optional[FieldPaths] = None, **kwargs
+) -> MessageToDictConverter:
+    """
+    Get the converter of a message class for the given MessageToDict options and
+    optional field paths, compiling it on first use.
+    """
+    projection = None if fields is None else parse_field_paths(fields)
+    key = (message_class, projection, tuple(sorted(kwargs.items())))
+    converter = _message_to_dict_converters.get(key)
+    if converter is None:
+        converter = _message_to_dict_converters.setdefault(
+            key, MessageToDictConverter(message_class, fields=projection, **kwargs)
+        )
+    return converter
+
+
+class MessageViewConverter(MessageToDictConverter):
+    """
+    Converts messages of one type into read-only MessageView dicts, which convert
+    each field on first read with the same results as json_format.MessageToDict
+    called with the same options.
+
+    Messages the views do not cover, such as messages with extensions, are
+    converted into plain dicts by MessageToDict.
+
+    :param message_class: The message class to convert messages of.
+    :param fields: Optional field paths to convert, see parse_field_paths.
+    """
+
+    def __init__(self, message_class, **kwargs):
+        super().__init__(message_class, **kwargs)
+        self._view_type = (
+            None
+            if self._printer is None
+            else _get_view_type(
+                message_class.DESCRIPTOR, self._options, self.projection
+            )
+        )
+
+    def __call__(self, message) -> Dict[str, Any]:
+        if self._view_type is not None:
+            try:
+                return MessageView(message, self._view_type)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        return super().__call__(message)
+
+
+_message_view_converters: Dict[_ConverterKey, MessageViewConverter] = {}
+
+
+def get_message_view_converter(
+    message_class, fields: Optional[FieldPaths] = None, **kwargs
+) -> MessageViewConverter:
+    """
+    Get the view converter of a message class for the given MessageToDict options
+    and optional field paths, compiling it on first use.
+    """
+    projection = None if fields is None else parse_field_paths(fields)
+    key = (message_class, projection, tuple(sorted(kwargs.items())))
+    converter = _message_view_converters.get(key)
+    if converter is None:
+        converter = _message_view_converters.setdefault(
+            key, MessageViewConverter(message_class, fields=projection, **kwargs)
+        )
+    return converter
+
+
+class MessageToDictConverters:
+    """
+    Converters of the response message types a parser has seen, by message type
+    and field projection, for the MessageToDict options of the parser.
+
+    :param lazy: Convert messages into MessageView dicts converting fields on
+        first read.
+    """
+
+    def __init__(self, lazy: bool = False, **message_to_dict_kwargs):
+        self._get_converter = (
+            get_message_view_converter if lazy else get_message_to_dict_converter
+        )
+        self._message_to_dict_kwargs = message_to_dict_kwargs
+        self._converters: Dict[Tuple[Any, Any], MessageToDictConverter] = {}
+
+    def convert(self, message, fields: Optional[FieldPaths] = None) -> Dict[str, Any]:
+        """
+        Convert a message into a dict.
+
+        :param message: The message to convert.
+        :param fields: Optional field paths to convert, see parse_field_paths.
+        """
+        if fields is not None and not isinstance(fields, (str, tuple)):
+            fields = parse_field_paths(fields)
+        key = (type(message), fields)
+        converter = self._converters.get(key)
+        if converter is None:
+            converter = self._get_converter(
+                type(message), fields=fields, **self._message_to_dict_kwargs
+            )
+            self._converters[key] = converter
+        return converter(message)
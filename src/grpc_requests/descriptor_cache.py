@@ -0,0 +1,172 @@
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Iterable, List, Optional, Union
+
+from google.protobuf import descriptor_pb2
+from google.protobuf.descriptor import FileDescriptor
+from google.protobuf.message import DecodeError
+
+logger = logging.getLogger(__name__)
+
+
+class DescriptorCache:
+    """
+    On-disk cache of the file descriptors reflected from an endpoint.
+
+    Each endpoint is stored as a serialized FileDescriptorSet, with files ordered
+    so that every dependency precedes the files importing it. A warm client start
+    therefore only needs a single file read to populate its descriptor pool.
+
+    :param directory: Directory the cache files are written to. Created on first write.
+    :param max_age: Optional age in seconds after which a cache file is considered stale.
+    """
+
+    def __init__(
+        self, directory: Union[str, os.PathLike], max_age: Optional[float] = None
+    ):
+        self.directory = Path(directory).expanduser()
+        self.max_age = max_age
+
+    def path_for(self, endpoint: str) -> Path:
+        return self.directory / (re.sub(r"[^A-Za-z0-9_.-]", "_", endpoint) + ".pb")
+
+    def load(self, endpoint: str) -> Optional[List[descriptor_pb2.FileDescriptorProto]]:
+        """
+        Load the cached file descriptors for an endpoint.
+
+        :param endpoint: The endpoint the descriptors were reflected from.
+        :return: The cached FileDescriptorProtos, or None on a miss or stale entry.
+        """
+        path = self.path_for(endpoint)
+        try:
+            with open(path, "rb") as f:
+                modified = os.fstat(f.fileno()).st_mtime
+                if self.max_age is not None and time.time() - modified > self.max_age:
+                    logger.debug(f"descriptor cache for {endpoint} is stale")
+                    return None
+                data = f.read()
+        except FileNotFoundError:
+            logger.debug(f"no descriptor cache for {endpoint}")
+            return None
+        except OSError as e:
+            logger.warning(f"can not read descriptor cache {path}", exc_info=e)
+            return None
+
+        try:
+            file_descriptor_set = descriptor_pb2.FileDescriptorSet.FromString(data)
+        except DecodeError as e:
+            logger.warning(f"can not decode descriptor cache {path}", exc_info=e)
+            return None
+        return list(file_descriptor_set.file)
+
+    def store(
+        self,
+        endpoint: str,
+        file_descriptors: Iterable[descriptor_pb2.FileDescriptorProto],
+    ):
+        """
+        Atomically write the file descriptors for an endpoint to the cache.
+
+        :param endpoint: The endpoint the descriptors were reflected from.
+        :param file_descriptors: FileDescriptorProtos, dependencies first.
+        """
+        file_descriptor_set = descriptor_pb2.FileDescriptorSet(file=file_descriptors)
+        path = self.path_for(endpoint)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(file_descriptor_set.SerializeToString())
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"can not write descriptor cache {path}", exc_info=e)
+            return
+        logger.debug(f"stored descriptor cache for {endpoint} in {path}")
+
+    def invalidate(self, endpoint: str):
+        with suppress(FileNotFoundError):
+            self.path_for(endpoint).unlink()
+
+
+def collect_file_descriptors(
+    file_descriptors: Iterable[FileDescriptor],
+) -> List[descriptor_pb2.FileDescriptorProto]:
+    """
+    Collect the given file descriptors and their transitive dependencies as protos.
+
+    :param file_descriptors: FileDescriptors to collect.
+    :return: FileDescriptorProtos without duplicates, every dependency before its dependents.
+    """
+    collected: List[descriptor_pb2.FileDescriptorProto] = []
+    seen = set()
+    for root in file_descriptors:
+        if root.name in seen:
+            continue
+        seen.add(root.name)
+        stack = [(root, iter(root.dependencies))]
+        while stack:
+            file_descriptor, dependencies = stack[-1]
+            dependency = next(dependencies, None)
+            if dependency is None:
+                stack.pop()
+                proto = descriptor_pb2.FileDescriptorProto()
+                file_descriptor.CopyToProto(proto)
+                collected.append(proto)
+            elif dependency.name not in seen:
+                seen.add(dependency.name)
+                stack.append((dependency, iter(dependency.dependencies)))
+    return collected
+
+
+def service_names_from_file_descriptors(
+    file_descriptors: Iterable[descriptor_pb2.FileDescriptorProto],
+) -> List[str]:
+    """
+    List the fully qualified names of the services declared in the given files.
+    """
+    return [
+        f"{file_descriptor.package}.{service.name}"
+        if file_descriptor.package
+        else service.name
+        for file_descriptor in file_descriptors
+        for service in file_descriptor.service
+    ]
+
+
+def add_cached_file_descriptors(
+    desc_pool, file_descriptors: List[descriptor_pb2.FileDescriptorProto]
+) -> bool:
+    """
+    Add cached file descriptors, ordered dependencies first, to a descriptor pool.
+
+    :param desc_pool: The descriptor pool to populate.
+    :param file_descriptors: FileDescriptorProtos as returned by DescriptorCache.load.
+    :return: False if a dependency is neither cached nor already in the pool.
+    """
+    available = set()
+    for file_descriptor in file_descriptors:
+        for dependency in file_descriptor.dependency:
+            if dependency in available:
+                continue
+            try:
+                desc_pool.FindFileByName(dependency)
+            except KeyError:
+                logger.debug(
+                    f"cached {file_descriptor.name} is missing dependency {dependency}"
+                )
+                return False
+        try:
+            desc_pool.Add(file_descriptor)
+        except TypeError:
+            logger.debug(f"{file_descriptor.name} already present in pool. Skipping.")
+        available.add(file_descriptor.name)
+    return True
@@ -0,0 +1,273 @@
+import asyncio
+import queue
+from collections import deque
+from functools import partial
+from typing import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import grpc
+
+DEFAULT_MAX_IN_FLIGHT = 64
+
+_PENDING = object()
+
+
+class ResponseFuture:
+    """
+    The future of a call made without waiting for its response: wraps the
+    grpc.Future of the call and converts its response once, when the result is
+    first read, on the thread reading it.
+
+    :param future: The grpc.Future of the call, which is also its grpc.Call, or
+        the CoalescedFuture of a caller of a coalesced call.
+    :param convert: Converts the response message, None to return it as is.
+    """
+
+    __slots__ = ("call", "_convert", "_response")
+
+    def __init__(self, future: grpc.Future, convert: Optional[Callable] = None):
+        self.call = future
+        self._convert = convert
+        self._response = _PENDING
+
+    def result(self, timeout: Optional[float] = None):
+        """
+        Wait for the response of the call and return it converted.
+
+        :raises grpc.RpcError: When the call failed.
+        :raises grpc.FutureTimeoutError: When the call did not end in time.
+        :raises grpc.FutureCancelledError: When the call was cancelled.
+        """
+        if self._response is _PENDING:
+            response = self.call.result(timeout)
+            self._response = (
+                response if self._convert is None else self._convert(response)
+            )
+        return self._response
+
+    def exception(self, timeout: Optional[float] = None):
+        # grpc.Future.exception takes a timeout, the grpc stubs leave it out
+        return self.call.exception(timeout)  # type: ignore[call-arg]
+
+    def done(self) -> bool:
+        return self.call.done()
+
+    def running(self) -> bool:
+        return self.call.running()
+
+    def cancel(self) -> bool:
+        return self.call.cancel()
+
+    def cancelled(self) -> bool:
+        return self.call.cancelled()
+
+    def add_done_callback(self, fn: Callable[["ResponseFuture"], None]):
+        """
+        Call fn with this future once the call ends, at once if it did already.
+        """
+        self.call.add_done_callback(lambda _: fn(self))
+
+    def __repr__(self):
+        state = "done" if self.done() else "pending"
+        return f"<{type(self).__name__} {state}>"
+
+
+def _outcome(future: ResponseFuture, return_exceptions: bool):
+    if not return_exceptions:
+        return future.result()
+    try:
+        return future.result()
+    except (grpc.RpcError, grpc.FutureCancelledError) as e:
+        return e
+
+
+def map_ordered(
+    submit: Callable[..., ResponseFuture],
+    requests: Iterable,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    return_exceptions: bool = False,
+) -> Iterator:
+    """
+    Submit a call for every request, with at most max_in_flight calls in flight,
+    and yield their results in the order of the requests. The calls still in
+    flight are cancelled when the iterator is closed early.
+
+    :param submit: Starts the call of a request, returning its ResponseFuture.
+    :param requests: The requests, read as calls are submitted.
+    :param max_in_flight: The maximum number of calls in flight.
+    :param return_exceptions: Yield the grpc.RpcError of failed calls instead of
+        raising it.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    in_flight: deque = deque()
+    try:
+        for request in requests:
+            if len(in_flight) >= max_in_flight:
+                yield _outcome(in_flight.popleft(), return_exceptions)
+            in_flight.append(submit(request))
+        while in_flight:
+            yield _outcome(in_flight.popleft(), return_exceptions)
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def map_completed(
+    submit: Callable[..., ResponseFuture],
+    requests: Iterable,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    return_exceptions: bool = False,
+) -> Iterator[Tuple[int, object]]:
+    """
+    Submit a call for every request, with at most max_in_flight calls in flight,
+    and yield (index, result) pairs as the calls complete, index being the
+    position of the request. The calls still in flight are cancelled when the
+    iterator is closed early.
+
+    :param submit: Starts the call of a request, returning its ResponseFuture.
+    :param requests: The requests, read as calls are submitted.
+    :param max_in_flight: The maximum number of calls in flight.
+    :param return_exceptions: Yield the grpc.RpcError of failed calls instead of
+        raising it.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    completed: "queue.SimpleQueue[Tuple[int, ResponseFuture]]" = queue.SimpleQueue()
+    in_flight: Set[ResponseFuture] = set()
+
+    def next_completed():
+        index, future = completed.get()
+        in_flight.discard(future)
+        return index, _outcome(future, return_exceptions)
+
+    def put_completed(index: int, future: ResponseFuture) -> None:
+        completed.put((index, future))
+
+    try:
+        for index, request in enumerate(requests):
+            if len(in_flight) >= max_in_flight:
+                yield next_completed()
+            future = submit(request)
+            in_flight.add(future)
+            future.add_done_callback(partial(put_completed, index))
+        while in_flight:
+            yield next_completed()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+async def _enumerate_requests(requests: Union[Iterable, AsyncIterator]):
+    if hasattr(requests, "__aiter__"):
+        index = 0
+        async for request in requests:
+            yield index, request
+            index += 1
+    else:
+        for index, request in enumerate(requests):
+            yield index, request
+
+
+async def _task_outcome(task: "asyncio.Future", return_exceptions: bool):
+    if not return_exceptions:
+        return await task
+    try:
+        return await task
+    except Exception as e:
+        return e
+
+
+def _discard_tasks(tasks: Iterable["asyncio.Future"]):
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # marks the exception of a failed call as retrieved
+            task.exception()
+
+
+async def map_ordered_async(
+    call: Callable[..., Awaitable],
+    requests: Union[Iterable, AsyncIterator],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    return_exceptions: bool = False,
+) -> AsyncGenerator[object, None]:
+    """
+    Call call with every request, with at most max_in_flight calls in flight, and
+    yield their results in the order of the requests. The calls still in flight
+    are cancelled when the iterator is closed early.
+
+    :param call: The coroutine function calling with a request.
+    :param requests: The requests, an iterable or async iterable read as calls
+        are started.
+    :param max_in_flight: The maximum number of calls in flight.
+    :param return_exceptions: Yield the exceptions of failed calls instead of
+        raising them.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    in_flight: deque = deque()
+    try:
+        async for _, request in _enumerate_requests(requests):
+            if len(in_flight) >= max_in_flight:
+                yield await _task_outcome(in_flight.popleft(), return_exceptions)
+            in_flight.append(asyncio.ensure_future(call(request)))
+        while in_flight:
+            yield await _task_outcome(in_flight.popleft(), return_exceptions)
+    finally:
+        _discard_tasks(in_flight)
+
+
+async def map_completed_async(
+    call: Callable[..., Awaitable],
+    requests: Union[Iterable, AsyncIterator],
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    return_exceptions: bool = False,
+) -> AsyncGenerator[Tuple[int, object], None]:
+    """
+    Call call with every request, with at most max_in_flight calls in flight, and
+    yield (index, result) pairs as the calls complete, index being the position
+    of the request. The calls still in flight are cancelled when the iterator is
+    closed early.
+
+    :param call: The coroutine function calling with a request.
+    :param requests: The requests, an iterable or async iterable read as calls
+        are started.
+    :param max_in_flight: The maximum number of calls in flight.
+    :param return_exceptions: Yield the exceptions of failed calls instead of
+        raising them.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1")
+    in_flight: Dict["asyncio.Future", int] = {}
+
+    async def completed():
+        done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+        return done
+
+    try:
+        async for index, request in _enumerate_requests(requests):
+            if len(in_flight) >= max_in_flight:
+                for task in await completed():
+                    yield (
+                        in_flight.pop(task),
+                        await _task_outcome(task, return_exceptions),
+                    )
+            in_flight[asyncio.ensure_future(call(request))] = index
+        while in_flight:
+            for task in await completed():
+                yield in_flight.pop(task), await _task_outcome(task, return_exceptions)
+    finally:
+        _discard_tasks(in_flight)
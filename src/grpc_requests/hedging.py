@@ -0,0 +1,200 @@
+import asyncio
+import bisect
+import math
+import queue
+import threading
+import time
+from collections import deque
+from typing import List, NamedTuple, Optional
+
+import grpc
+
+DEFAULT_PERCENTILE = 95.0
+DEFAULT_WINDOW = 1000
+DEFAULT_MIN_SAMPLES = 20
+
+
+class HedgingStats(NamedTuple):
+    calls: int
+    hedges_sent: int
+    hedges_won: int
+    delay: Optional[float]
+
+
+class HedgingPolicy:
+    """
+    Hedges the calls of an idempotent unary method: when a call has no response
+    after a delay, a second copy of the request is sent, the first successful
+    response of the two is returned and the other call is cancelled. With a
+    channel pool, the copy is sent through the channel the pool picks next, so
+    it usually goes to another connection or endpoint.
+
+    The delay is the given percentile of the latencies of the latest successful
+    calls, so only the slowest calls are hedged; until min_samples calls
+    succeeded, initial_delay is used, or calls are not hedged when it is None.
+    A fixed delay may be given instead.
+
+    A call failing before the delay is not hedged, and when both calls fail the
+    error of the last one is raised. A timeout of the call keyword arguments is
+    the deadline of both calls together.
+
+    :param percentile: The latency percentile the delay is derived from.
+    :param delay: A fixed delay in seconds, instead of a latency percentile.
+    :param initial_delay: The delay until min_samples latencies are known.
+    :param min_delay: The shortest delay, which keeps fast methods from being
+        hedged because of small latency variations.
+    :param window: The number of latest latencies the percentile is taken from.
+    :param min_samples: The number of latencies needed to derive the delay.
+    """
+
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        delay: Optional[float] = None,
+        initial_delay: Optional[float] = None,
+        min_delay: float = 0.0,
+        window: int = DEFAULT_WINDOW,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+    ):
+        if not 0 < percentile <= 100:
+            raise ValueError("percentile must be in (0, 100]")
+        if window < 1 or min_samples < 1:
+            raise ValueError("window and min_samples must be at least 1")
+        self.percentile = percentile
+        self.fixed_delay = delay
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.latencies: "deque[float]" = deque(maxlen=window)
+        # the latencies of the window kept sorted, for the percentile
+        self._sorted_latencies: List[float] = []
+        self.calls = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self._delay = initial_delay
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self) -> Optional[float]:
+        """
+        The time after which calls are hedged, None while calls are not hedged.
+        """
+        return self.fixed_delay if self.fixed_delay is not None else self._delay
+
+    def record(self, latency: float):
+        """
+        Record the latency of a successful call, updating the delay.
+        """
+        with self._lock:
+            ordered = self._sorted_latencies
+            if len(self.latencies) == self.latencies.maxlen:
+                # the oldest latency leaves the window
+                del ordered[bisect.bisect_left(ordered, self.latencies[0])]
+            self.latencies.append(latency)
+            bisect.insort(ordered, latency)
+            if self.fixed_delay is not None or len(ordered) < self.min_samples:
+                return
+            rank = math.ceil(self.percentile / 100 * len(ordered)) - 1
+            self._delay = max(ordered[rank], self.min_delay)
+
+    def _count(self, calls=0, hedges_sent=0, hedges_won=0):
+        with self._lock:
+            self.calls += calls
+            self.hedges_sent += hedges_sent
+            self.hedges_won += hedges_won
+
+    def stats(self) -> HedgingStats:
+        with self._lock:
+            return HedgingStats(
+                self.calls, self.hedges_sent, self.hedges_won, self.delay
+            )
+
+    def call(self, handler, request, kwargs: dict):
+        """
+        Call a unary response multi-callable of a grpc channel, hedging the call.
+        """
+        self._count(calls=1)
+        delay = self.delay
+        start = time.monotonic()
+        if delay is None:
+            response = handler(request, **kwargs)
+            self.record(time.monotonic() - start)
+            return response
+        first = handler.future(request, **kwargs)
+        try:
+            response = first.result(timeout=delay)
+        except grpc.FutureTimeoutError:
+            pass
+        else:
+            self.record(time.monotonic() - start)
+            return response
+        self._count(hedges_sent=1)
+        hedge_start = time.monotonic()
+        try:
+            hedge = handler.future(request, **_remaining_kwargs(kwargs, start))
+        except BaseException:
+            first.cancel()
+            raise
+        completed: "queue.SimpleQueue[grpc.Future]" = queue.SimpleQueue()
+        first.add_done_callback(completed.put)
+        hedge.add_done_callback(completed.put)
+        try:
+            call = completed.get()
+            if call.exception() is not None:
+                # the other call may still succeed
+                call = completed.get()
+            if call.exception() is None:
+                if call is hedge:
+                    self._count(hedges_won=1)
+                    start = hedge_start
+                self.record(time.monotonic() - start)
+            return call.result()
+        finally:
+            first.cancel()
+            hedge.cancel()
+
+    async def call_async(self, handler, request, kwargs: dict):
+        """
+        Call a unary response multi-callable of a grpc.aio channel, hedging the
+        call.
+        """
+        self._count(calls=1)
+        delay = self.delay
+        start = time.monotonic()
+        if delay is None:
+            response = await handler(request, **kwargs)
+            self.record(time.monotonic() - start)
+            return response
+        first = asyncio.ensure_future(handler(request, **kwargs))
+        calls = {first: start}
+        try:
+            done, _ = await asyncio.wait(calls, timeout=delay)
+            if not done:
+                self._count(hedges_sent=1)
+                hedge = asyncio.ensure_future(
+                    handler(request, **_remaining_kwargs(kwargs, start))
+                )
+                calls[hedge] = time.monotonic()
+            pending = set(calls)
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for call in done:
+                    if call.exception() is None:
+                        self._count(hedges_won=int(call is not first))
+                        self.record(time.monotonic() - calls[call])
+                        return call.result()
+                if not pending:
+                    return await call
+        finally:
+            for call in calls:
+                call.cancel()
+
+
+def _remaining_kwargs(kwargs: dict, start: float) -> dict:
+    # the hedge ends by the deadline of the first call
+    timeout = kwargs.get("timeout")
+    if timeout is None:
+        return kwargs
+    return {**kwargs, "timeout": max(timeout - (time.monotonic() - start), 0.0)}
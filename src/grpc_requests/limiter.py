@@ -0,0 +1,285 @@
+import asyncio
+import math
+from collections import deque
+from contextlib import suppress
+from typing import Deque, Dict, Iterable, NamedTuple, Optional
+
+import grpc
+
+DEFAULT_INITIAL_LIMIT = 20
+DEFAULT_MAX_LIMIT = 1000
+# the limit is multiplied by the backoff ratio when a call shows congestion
+DEFAULT_BACKOFF_RATIO = 0.9
+# calls slower than tolerance times the no-load latency, plus the slack, show
+# congestion; the slack keeps jitter of fast methods from lowering the limit
+DEFAULT_LATENCY_TOLERANCE = 2.0
+DEFAULT_LATENCY_SLACK = 0.005
+# the number of calls after which the no-load latency is measured again
+DEFAULT_LATENCY_WINDOW = 1000
+
+# the status codes of calls rejected or dropped by an overloaded server
+CONGESTION_STATUS_CODES = frozenset(
+    {
+        grpc.StatusCode.UNAVAILABLE,
+        grpc.StatusCode.RESOURCE_EXHAUSTED,
+        grpc.StatusCode.DEADLINE_EXCEEDED,
+    }
+)
+
+
+class LimiterStats(NamedTuple):
+    limit: int
+    in_flight: int
+    queue_depth: int
+    rejected: int
+
+
+class LimitExceededError(grpc.RpcError):
+    """
+    Raised instead of calling when the concurrency limit is reached and the call
+    can not be queued, or was queued for longer than the queue timeout. Like the
+    errors of calls rejected by servers, its code is RESOURCE_EXHAUSTED.
+    """
+
+    def __init__(self, details: str):
+        super().__init__(details)
+        self._details = details
+
+    def code(self) -> grpc.StatusCode:
+        return grpc.StatusCode.RESOURCE_EXHAUSTED
+
+    def details(self) -> str:
+        return self._details
+
+
+class AdaptiveLimiter:
+    """
+    Limits the calls in flight of an async client, adapting the limit to the
+    latency and errors of the calls with additive increase and multiplicative
+    decrease: a successful call while at least half of the limit is in use raises
+    the limit by one, and a call failing with one of CONGESTION_STATUS_CODES or
+    slower than latency_tolerance times the lowest latency of the latest calls,
+    plus latency_slack, multiplies it by backoff_ratio.
+
+    Calls beyond the limit wait in a queue of at most max_queue calls, in the
+    order they came, and fail with LimitExceededError when the queue is full or
+    they waited longer than queue_timeout; a max_queue of 0 fails them at once.
+
+    A limiter adapts to the latency of one endpoint: a client of several endpoints
+    limits the calls to each endpoint with a copy of its own, see EndpointLimiters.
+    The limiter belongs to the event loop of the client, it is not thread safe.
+
+    :param initial_limit: The limit before any call ended.
+    :param min_limit: The lowest limit.
+    :param max_limit: The highest limit.
+    :param backoff_ratio: The factor of the limit when a call shows congestion.
+    :param latency_tolerance: The latency, as a multiple of the lowest latency of
+        the latest calls, from which calls show congestion, None to adapt the limit
+        to errors alone.
+    :param latency_slack: The seconds added to the latency showing congestion.
+    :param latency_window: The number of calls after which the lowest latency is
+        measured again, following changes of the no-load latency.
+    :param max_queue: The number of calls waiting for the limit, None for no limit.
+    :param queue_timeout: The seconds a call may wait for the limit, None to wait
+        until it is called.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = DEFAULT_INITIAL_LIMIT,
+        min_limit: int = 1,
+        max_limit: int = DEFAULT_MAX_LIMIT,
+        backoff_ratio: float = DEFAULT_BACKOFF_RATIO,
+        latency_tolerance: Optional[float] = DEFAULT_LATENCY_TOLERANCE,
+        latency_slack: float = DEFAULT_LATENCY_SLACK,
+        latency_window: int = DEFAULT_LATENCY_WINDOW,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+    ):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "limits must be 1 <= min_limit <= initial_limit <= max_limit"
+            )
+        if not 0 < backoff_ratio < 1:
+            raise ValueError("backoff_ratio must be in (0, 1)")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack = latency_slack
+        self.latency_window = latency_window
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self._initial_limit = initial_limit
+        self._limit = float(initial_limit)
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._no_load_latency = math.inf
+        self._window_latency = math.inf
+        self._window_calls = 0
+
+    @property
+    def limit(self) -> int:
+        """
+        The number of calls allowed in flight.
+        """
+        return int(self._limit)
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        The number of calls waiting for the limit.
+        """
+        return len(self._waiters)
+
+    def stats(self) -> LimiterStats:
+        return LimiterStats(self.limit, self.in_flight, self.queue_depth, self.rejected)
+
+    def copy(self) -> "AdaptiveLimiter":
+        """
+        A new limiter with the settings of this one, such as a limiter per method.
+        """
+        return type(self)(
+            self._initial_limit,
+            self.min_limit,
+            self.max_limit,
+            self.backoff_ratio,
+            self.latency_tolerance,
+            self.latency_slack,
+            self.latency_window,
+            self.max_queue,
+            self.queue_timeout,
+        )
+
+    async def acquire(self):
+        """
+        Wait until a call may be made within the limit, and count it in flight.
+
+        :raises LimitExceededError: When the call can not wait for the limit.
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        if self.max_queue is not None and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LimitExceededError(f"concurrency limit of {self.limit} calls reached")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard_waiter(waiter)
+            self.rejected += 1
+            raise LimitExceededError(
+                f"waited {self.queue_timeout}s for the concurrency limit of "
+                f"{self.limit} calls"
+            ) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the call was let through as it was cancelled
+                self.release()
+            else:
+                self._discard_waiter(waiter)
+            raise
+
+    def _discard_waiter(self, waiter: asyncio.Future):
+        with suppress(ValueError):
+            self._waiters.remove(waiter)
+
+    def release(
+        self, latency: Optional[float] = None, code: Optional[grpc.StatusCode] = None
+    ):
+        """
+        Count a call as ended, adapting the limit to its outcome, and let waiting
+        calls through.
+
+        :param latency: The duration of the call in seconds.
+        :param code: The status code of the call, None when it was not made.
+        """
+        self.in_flight -= 1
+        if code is not None:
+            self._adapt(latency, code)
+        while self._waiters and self.in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _adapt(self, latency: Optional[float], code: grpc.StatusCode):
+        if code in CONGESTION_STATUS_CODES:
+            self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        elif code != grpc.StatusCode.OK:
+            return
+        elif self._is_slow(latency):
+            self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+        elif (self.in_flight + 1) * 2 >= self._limit:
+            # the limit is raised only while it is used, so it can not grow
+            # without ever being tested
+            self._limit = min(self.max_limit, self._limit + 1)
+
+    def _is_slow(self, latency: Optional[float]) -> bool:
+        if latency is None or self.latency_tolerance is None:
+            return False
+        self._window_latency = min(self._window_latency, latency)
+        self._window_calls += 1
+        if self._window_calls >= self.latency_window:
+            self._no_load_latency = self._window_latency
+            self._window_latency = math.inf
+            self._window_calls = 0
+        elif latency < self._no_load_latency:
+            self._no_load_latency = latency
+        return (
+            latency
+            > self._no_load_latency * self.latency_tolerance + self.latency_slack
+        )
+
+    def __repr__(self):
+        return (
+            f"<{type(self).__name__} limit={self.limit} in_flight={self.in_flight} "
+            f"queued={self.queue_depth}>"
+        )
+
+
+class EndpointLimiters:
+    """
+    The limiters of the endpoints of a client of several endpoints, copies of one
+    AdaptiveLimiter: the calls to each endpoint are made within the limit of its
+    own limiter, which adapts to the latency and errors of its calls alone, so a
+    slow endpoint only lowers its own limit. The endpoint of a call is the one
+    the channel pool of the client picks, before the call waits for its limit.
+
+    :param limiter: The limiter the limiters of the endpoints copy.
+    :param endpoints: The endpoints of the client.
+    """
+
+    def __init__(self, limiter: AdaptiveLimiter, endpoints: Iterable[str]):
+        self.limiter = limiter
+        self.limiters: Dict[str, AdaptiveLimiter] = {
+            endpoint: limiter.copy() for endpoint in endpoints
+        }
+
+    def __getitem__(self, endpoint: str) -> AdaptiveLimiter:
+        return self.limiters[endpoint]
+
+    def stats(self) -> Dict[str, LimiterStats]:
+        """
+        The limit, calls in flight, queue depth and rejected calls of every
+        endpoint.
+        """
+        return {
+            endpoint: limiter.stats() for endpoint, limiter in self.limiters.items()
+        }
+
+    def copy(self) -> "EndpointLimiters":
+        """
+        New limiters of the same endpoints and settings, such as limiters per
+        method.
+        """
+        return type(self)(self.limiter, self.limiters)
+
+    def __repr__(self):
+        limits = ", ".join(
+            f"{endpoint}={limiter.limit}" for endpoint, limiter in self.limiters.items()
+        )
+        return f"<{type(self).__name__} {limits}>"
@@ -0,0 +1,200 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Iterable, NamedTuple, Optional
+
+import grpc
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_INITIAL_BACKOFF = 0.1
+DEFAULT_MAX_BACKOFF = 5.0
+DEFAULT_BACKOFF_MULTIPLIER = 2.0
+# each call earns a tenth of a retry, and up to ten retries may be saved up
+DEFAULT_BUDGET_RATIO = 0.1
+DEFAULT_BUDGET_MAX_TOKENS = 10.0
+
+
+class RetryStats(NamedTuple):
+    calls: int
+    retries: int
+    throttled: int
+    tokens: Optional[float]
+
+
+class RetryBudget:
+    """
+    A token bucket capping retries to a fraction of the calls: every call adds
+    ratio tokens to the bucket, up to max_tokens, and every retry takes a token,
+    so there are never more than ratio retries per call once the max_tokens saved
+    up are spent. A retry without a token is not made.
+
+    A budget may be shared by the retry policies of several methods or clients,
+    capping their retries together.
+
+    :param ratio: The retries earned by each call.
+    :param max_tokens: The most tokens kept, which is also the tokens at first.
+    """
+
+    def __init__(
+        self,
+        ratio: float = DEFAULT_BUDGET_RATIO,
+        max_tokens: float = DEFAULT_BUDGET_MAX_TOKENS,
+    ):
+        if ratio < 0 or max_tokens < 0:
+            raise ValueError("ratio and max_tokens must not be negative")
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """
+        Count a call, adding ratio tokens.
+        """
+        with self._lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        """
+        Take a token for a retry.
+
+        :return: Whether there was a token, and so whether the retry may be made.
+        """
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryPolicy:
+    """
+    Retries calls of idempotent unary methods failing with one of the retryable
+    status codes, waiting an exponential backoff with full jitter between
+    attempts: a random time up to initial_backoff * backoff_multiplier ** n
+    seconds before the n-th retry, at most max_backoff.
+
+    Retries take tokens from the retry budget, so a failing server does not get
+    more calls from retries than the budget allows; a retry without a token is not
+    made and the last error is raised.
+
+    A timeout of the call keyword arguments is the deadline of all its attempts:
+    each attempt gets the time left, and no retry is made when the backoff would
+    end after the deadline.
+
+    :param max_attempts: The most attempts of a call, the first one included.
+    :param retryable_status_codes: The status codes of the errors retried.
+    :param initial_backoff: The longest backoff before the first retry.
+    :param max_backoff: The longest backoff.
+    :param backoff_multiplier: The growth of the longest backoff at each retry.
+    :param budget: The RetryBudget of the retries, which may be shared, None for
+        a budget of its own with the default ratio and max_tokens.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        retryable_status_codes: Iterable[grpc.StatusCode] = (
+            grpc.StatusCode.UNAVAILABLE,
+        ),
+        initial_backoff: float = DEFAULT_INITIAL_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        backoff_multiplier: float = DEFAULT_BACKOFF_MULTIPLIER,
+        budget: Optional[RetryBudget] = None,
+    ):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.retryable_status_codes = frozenset(retryable_status_codes)
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.backoff_multiplier = backoff_multiplier
+        self.budget = RetryBudget() if budget is None else budget
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def _count(self, calls=0, retries=0, throttled=0):
+        with self._lock:
+            self.calls += calls
+            self.retries += retries
+            self.throttled += throttled
+
+    def stats(self) -> RetryStats:
+        with self._lock:
+            return RetryStats(
+                self.calls, self.retries, self.throttled, self.budget.tokens
+            )
+
+    def backoff(self, retry: int) -> float:
+        """
+        The jittered backoff before a retry, the first retry being 1.
+        """
+        ceiling = self.initial_backoff * self.backoff_multiplier ** (retry - 1)
+        return random.uniform(0, min(self.max_backoff, ceiling))
+
+    def _retry_backoff(
+        self, error: grpc.RpcError, attempt: int, deadline: Optional[float]
+    ) -> Optional[float]:
+        # the backoff before retrying a failed attempt, None to raise its error
+        retryable = error.code() in self.retryable_status_codes
+        if not retryable or attempt >= self.max_attempts:
+            return None
+        backoff = self.backoff(attempt)
+        if deadline is not None and time.monotonic() + backoff >= deadline:
+            return None
+        if not self.budget.withdraw():
+            self._count(throttled=1)
+            return None
+        self._count(retries=1)
+        return backoff
+
+    def _start(self, kwargs: dict) -> Optional[float]:
+        self._count(calls=1)
+        self.budget.deposit()
+        timeout = kwargs.get("timeout")
+        return None if timeout is None else time.monotonic() + timeout
+
+    def call(self, attempt: Callable[[dict], object], kwargs: dict):
+        """
+        Make a call, retrying it.
+
+        :param attempt: Makes an attempt of the call with keyword arguments of
+            the handler.
+        :param kwargs: The keyword arguments of the handler.
+        """
+        deadline = self._start(kwargs)
+        attempts = 1
+        while True:
+            try:
+                return attempt(_attempt_kwargs(kwargs, deadline))
+            except grpc.RpcError as e:
+                backoff = self._retry_backoff(e, attempts, deadline)
+                if backoff is None:
+                    raise
+            time.sleep(backoff)
+            attempts += 1
+
+    async def call_async(self, attempt: Callable[[dict], Awaitable], kwargs: dict):
+        """
+        Make a call of a grpc.aio channel, retrying it, see call.
+        """
+        deadline = self._start(kwargs)
+        attempts = 1
+        while True:
+            try:
+                return await attempt(_attempt_kwargs(kwargs, deadline))
+            except grpc.RpcError as e:
+                backoff = self._retry_backoff(e, attempts, deadline)
+                if backoff is None:
+                    raise
+            await asyncio.sleep(backoff)
+            attempts += 1
+
+
+def _attempt_kwargs(kwargs: dict, deadline: Optional[float]) -> dict:
+    if deadline is None:
+        return kwargs
+    return {**kwargs, "timeout": max(deadline - time.monotonic(), 0.0)}
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional
+
+from google.protobuf.descriptor import MethodDescriptor, ServiceDescriptor
+
+
+class MethodSchema(NamedTuple):
+    """
+    The channel independent part of a method's metadata.
+    """
+
+    input_type: Any
+    output_type: Any
+    descriptor: MethodDescriptor
+    client_streaming: bool
+    server_streaming: bool
+
+
+class ServiceSchema(NamedTuple):
+    fingerprint: Optional[str]
+    descriptor: ServiceDescriptor
+    methods: Mapping[str, MethodSchema]
+
+
+def fingerprint_service(service_name: str, serialized_files: Iterable[bytes]) -> str:
+    """
+    Fingerprint a service by its name and the serialized file descriptors a server
+    returned when reflecting it. Replicas of the same build return identical bytes.
+
+    :param service_name: Fully qualified name of the service.
+    :param serialized_files: Serialized FileDescriptorProtos of the service.
+    :return: A hex digest identifying the service schema.
+    """
+    digest = hashlib.sha256(service_name.encode())
+    for serialized_file in sorted(serialized_files):
+        digest.update(len(serialized_file).to_bytes(8, "big"))
+        digest.update(serialized_file)
+    return digest.hexdigest()
+
+
+class SchemaRegistry:
+    """
+    Thread safe registry of service schemas, shared by the clients created with
+    share_schema=True. Schemas are looked up either by fingerprint or by the
+    ServiceDescriptor they were built from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_fingerprint: Dict[str, ServiceSchema] = {}
+        self._by_descriptor: Dict[ServiceDescriptor, ServiceSchema] = {}
+
+    def get(self, fingerprint: str) -> Optional[ServiceSchema]:
+        return self._by_fingerprint.get(fingerprint)
+
+    def get_for_descriptor(
+        self, descriptor: ServiceDescriptor
+    ) -> Optional[ServiceSchema]:
+        return self._by_descriptor.get(descriptor)
+
+    def register(self, schema: ServiceSchema) -> ServiceSchema:
+        """
+        Register a schema unless an equivalent one is already known.
+
+        :return: The registered schema, which callers should use in place of their own.
+        """
+        with self._lock:
+            existing = self._by_descriptor.get(schema.descriptor)
+            if existing is None and schema.fingerprint is not None:
+                existing = self._by_fingerprint.get(schema.fingerprint)
+            if existing is not None:
+                return existing
+            if schema.fingerprint is not None:
+                self._by_fingerprint[schema.fingerprint] = schema
+            self._by_descriptor[schema.descriptor] = schema
+            return schema
+
+    def clear(self):
+        with self._lock:
+            self._by_fingerprint.clear()
+            self._by_descriptor.clear()
+
+    def __len__(self):
+        return len(self._by_descriptor)
+
+
+schema_registry = SchemaRegistry()
@@ -0,0 +1,82 @@
+from typing import Any, Dict, Iterable, Optional
+
+from google.protobuf.json_format import ParseDict
+from google.protobuf.message import Message
+
+
+class RequestTemplate:
+    """
+    A request message built once, which every call copies and updates with a delta
+    instead of building the whole request again.
+
+    Dict deltas are applied with json_format.ParseDict onto the copy: the fields
+    they hold replace the template's, nested messages are merged, and repeated and
+    map fields are replaced. Message deltas are merged with MergeFrom, and a None
+    delta sends the template as it is.
+
+    :param message: The template request message.
+    :param parse_dict_kwargs: Keyword arguments of ParseDict for dict deltas.
+    """
+
+    __slots__ = ("message", "_message_class", "_parse_dict_kwargs")
+
+    def __init__(
+        self, message: Message, parse_dict_kwargs: Optional[Dict[str, Any]] = None
+    ):
+        self.message = message
+        self._message_class = type(message)
+        self._parse_dict_kwargs = parse_dict_kwargs or {}
+
+    def build(self, delta=None) -> Message:
+        """
+        Build a request from the template and a delta.
+
+        :param delta: A dict or message of the fields to change, or None.
+        :return: A new request message.
+        """
+        request = self._message_class()
+        request.CopyFrom(self.message)
+        if delta is None:
+            return request
+        if isinstance(delta, Message):
+            request.MergeFrom(delta)
+        else:
+            ParseDict(delta, request, **self._parse_dict_kwargs)
+        return request
+
+    def parse_request_data(self, request_data, input_type):
+        return self.build(request_data)
+
+    def parse_stream_requests(self, stream_requests_data: Iterable, input_type):
+        for request_data in stream_requests_data:
+            yield self.build(request_data)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self._message_class.DESCRIPTOR.full_name}>"
+
+
+def build_request_template(
+    template,
+    input_type,
+    parse_request_data,
+    parse_dict_kwargs: Optional[Dict[str, Any]] = None,
+) -> RequestTemplate:
+    """
+    Build the request template of a method from a dict or a message.
+
+    :param template: The template request, a dict or an input_type message.
+    :param input_type: The request message class of the method.
+    :param parse_request_data: The request parser dict templates are parsed with.
+    :param parse_dict_kwargs: Keyword arguments of ParseDict for dict deltas.
+    """
+    if isinstance(template, Message):
+        if template.DESCRIPTOR.full_name != input_type.DESCRIPTOR.full_name:
+            raise ValueError(
+                f"template is {template.DESCRIPTOR.full_name} "
+                f"not {input_type.DESCRIPTOR.full_name}"
+            )
+        message = input_type()
+        message.CopyFrom(template)
+    else:
+        message = parse_request_data(template, input_type)
+    return RequestTemplate(message, parse_dict_kwargs)
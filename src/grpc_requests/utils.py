@@ -1,9 +1,15 @@
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, TypeVar
+
 from google.protobuf.descriptor import (
     Descriptor,
     EnumDescriptor,
+    FieldDescriptor,
     OneofDescriptor,
 )
+from google.protobuf.descriptor_pb2 import FileDescriptorProto
+
+V = TypeVar("V")
 
 
 # String descriptions of protobuf field types
@@ -88,3 +94,79 @@ def describe_oneof_descriptor(
     for field in oneof_descriptor.fields:
         description += f"\n{padding}{field.name}: {FIELD_TYPES[field.type-1]}"
     return description
+
+
+def is_repeated_field(field: FieldDescriptor) -> bool:
+    """
+    Whether a field is repeated, with every protobuf release: recent releases
+    replace FieldDescriptor.label with is_repeated.
+    """
+    is_repeated = getattr(field, "is_repeated", None)
+    if is_repeated is not None:
+        return is_repeated
+    return field.label == FieldDescriptor.LABEL_REPEATED  # type: ignore[attr-defined]
+
+
+def sort_file_descriptors(
+    file_descriptors_by_name: Dict[str, FileDescriptorProto],
+) -> List[FileDescriptorProto]:
+    """
+    Order file descriptors so that each one follows all of its dependencies.
+    :param file_descriptors_by_name: FileDescriptorProtos indexed by file name
+    :return: List[FileDescriptorProto] - dependencies first, otherwise in the given order.
+        Dependencies missing from the index are ignored.
+    """
+    ordered: List[FileDescriptorProto] = []
+    visited = set()
+    for name, root in file_descriptors_by_name.items():
+        if name in visited:
+            continue
+        visited.add(name)
+        stack = [(root, iter(root.dependency))]
+        while stack:
+            file_descriptor, dependencies = stack[-1]
+            dependency = next(dependencies, None)
+            if dependency is None:
+                stack.pop()
+                ordered.append(file_descriptor)
+            elif dependency not in visited and dependency in file_descriptors_by_name:
+                visited.add(dependency)
+                dependency_descriptor = file_descriptors_by_name[dependency]
+                stack.append(
+                    (dependency_descriptor, iter(dependency_descriptor.dependency))
+                )
+    return ordered
+
+
+class LazyMapping(Mapping[str, V]):
+    """
+    Read-only mapping over a fixed set of keys whose values are built on first access.
+    :param keys: The keys of the mapping, in iteration order
+    :param factory: Callable building the value for a key
+    """
+
+    def __init__(self, keys: Iterable[str], factory: Callable[[str], V]):
+        self._keys = tuple(keys)
+        self._key_set = frozenset(self._keys)
+        self._factory = factory
+        self._values: Dict[str, V] = {}
+
+    def __getitem__(self, key: str) -> V:
+        try:
+            return self._values[key]
+        except KeyError:
+            if key not in self._key_set:
+                raise
+        return self._values.setdefault(key, self._factory(key))
+
+    def __contains__(self, key) -> bool:
+        return key in self._key_set
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self._keys)})"
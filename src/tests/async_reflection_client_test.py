@@ -1,3 +1,7 @@
+import asyncio
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import logging
 
 import grpc.aio
@@ -6,13 +10,26 @@ from grpc_reflection.v1alpha import reflection_pb2
 
 from google.protobuf import descriptor_pb2, descriptor_pool
 from google.protobuf.json_format import ParseError
-from grpc_requests.aio import AsyncClient, CustomArgumentParsers, MethodType
+from grpc_requests.aio import (
+    AsyncClient,
+    CustomArgumentParsers,
+    MessageParsers,
+    MethodType,
+    StubAsyncClient,
+    get_by_endpoint,
+    reset_cached_async_client,
+)
+from grpc_requests.channels import AsyncChannelPool
+from grpc_requests.converters import MessageView
+from grpc_requests.descriptor_cache import DescriptorCache
 from tests.common import AsyncMetadataClientInterceptor
 from tests.test_servers.dependencies import (
     dependencies_pb2,
     dependency1_pb2,
     dependency2_pb2,
 )
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply, HelloRequest
+from tests.test_servers.helloworld.helloworld_server import Greeter, HelloWorldServer
 
 from grpc_requests.aio import MethodMetaData
 
@@ -414,3 +431,558 @@ async def test_can_get_methods_meta_when_using_non_lazy_client():
     assert server_reflection_info.input_type == reflection_pb2.ServerReflectionRequest
     assert server_reflection_info.output_type == reflection_pb2.ServerReflectionResponse
     assert server_reflection_info.method_type == MethodType.STREAM_STREAM
+
+
+@pytest.mark.asyncio
+async def test_descriptor_cache_skips_reflection(tmp_path):
+    cache = DescriptorCache(tmp_path)
+    await AsyncClient.create(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    cache.store("localhost:notaport", cache.load("localhost:50053"))
+    # Connect to not a real server to make sure everything comes from the cache
+    client = await AsyncClient.create(
+        "localhost:notaport",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    assert "dependencies.Greeter" in await client.service_names()
+    meta = await client.get_method_meta("dependencies.Greeter", "HasDependencies")
+    assert meta.input_type.DESCRIPTOR.full_name == "dependencies.Dependency1"
+
+
+@pytest.mark.asyncio
+async def test_get_file_descriptors_by_symbols():
+    client = AsyncClient(
+        "localhost:50053", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    results = await client.get_file_descriptors_by_symbols(
+        ["dependencies.Greeter", "dependencies.Dependency2"]
+    )
+    assert results[0][0].name == "dependencies.proto"
+    assert results[1][0].name == "dependency2.proto"
+
+
+@pytest.mark.asyncio
+async def test_registration_uses_single_reflection_stream():
+    client = AsyncClient(
+        "localhost:50053", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    streams = []
+    server_reflection_info = client.reflection_stub.ServerReflectionInfo
+
+    def counting_server_reflection_info(*args, **kwargs):
+        streams.append(args)
+        return server_reflection_info(*args, **kwargs)
+
+    client.reflection_stub.ServerReflectionInfo = counting_server_reflection_info
+    await client.register_all_service()
+    assert len(streams) == 1
+    assert "dependencies.Greeter" in client._service_methods_meta
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lazy_registration_is_deduplicated():
+    client = AsyncClient(
+        "localhost:50053", descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    lookups = []
+    reflection_pipeline = client._reflection_pipeline
+
+    async def counting_reflection_pipeline(requests):
+        lookups.extend(
+            request.file_containing_symbol
+            for request in requests
+            if request.HasField("file_containing_symbol")
+        )
+        return await reflection_pipeline(requests)
+
+    client._reflection_pipeline = counting_reflection_pipeline
+    metas = await asyncio.gather(
+        *(client.get_method_meta("dependencies.Greeter", "SayHello") for _ in range(5))
+    )
+    assert lookups == ["dependencies.Greeter"]
+    assert all(meta is metas[0] for meta in metas)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_registration_keeps_service_order():
+    client = await AsyncClient.create(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        registration_concurrency=2,
+    )
+    assert tuple(client._service_methods_meta) == tuple(await client.service_names())
+
+
+@pytest.mark.asyncio
+async def test_shared_schema_is_reused_between_clients():
+    first = await AsyncClient.create(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        share_schema=True,
+    )
+    second = AsyncClient(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        share_schema=True,
+    )
+    registered = []
+
+    async def recording_register_file_descriptors(file_descriptors):
+        registered.append(file_descriptors)
+
+    second.register_file_descriptors = recording_register_file_descriptors
+    await second.register_all_service()
+    assert registered == []
+
+    first_meta = await first.get_method_meta("dependencies.Greeter", "SayHello")
+    second_meta = await second.get_method_meta("dependencies.Greeter", "SayHello")
+    assert second_meta.input_type is first_meta.input_type
+    assert second_meta.handler is not first_meta.handler
+    response = await second.request(
+        "dependencies.Greeter", "SayHello", {"name": "sinsky"}
+    )
+    assert response == {"message": "Hello, sinsky!"}
+
+
+@pytest.mark.asyncio
+async def test_lazy_methods_only_builds_invoked_method():
+    client = AsyncClient(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        lazy_methods=True,
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    response = await greeter_service.SayHello({"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    methods_meta = await client.get_methods_meta("helloworld.Greeter")
+    assert list(methods_meta._values) == ["SayHello"]
+
+
+@pytest.mark.asyncio
+async def test_get_invoker():
+    client = AsyncClient("localhost:50051")
+    invoker = await client.get_invoker("helloworld.Greeter", "SayHello")
+    assert await invoker({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+    assert invoker.method_type == MethodType.UNARY_UNARY
+    assert await client.get_invoker("helloworld.Greeter", "SayHello") is invoker
+    with pytest.raises(ValueError):
+        await client.get_invoker(
+            "helloworld.Greeter", "SayHello", MethodType.STREAM_STREAM
+        )
+
+
+@pytest.mark.asyncio
+async def test_service_client_methods_are_invokers():
+    client = AsyncClient("localhost:50051")
+    greeter_service = await client.service("helloworld.Greeter")
+    responses = await greeter_service.SayHelloGroup({"name": "sinsky jack"})
+    assert [response async for response in responses] == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+    ]
+    assert greeter_service.SayHelloGroup is await client.get_invoker(
+        "helloworld.Greeter", "SayHelloGroup"
+    )
+    with pytest.raises(AttributeError):
+        greeter_service.SayGoodbye  # noqa: B018
+
+
+@pytest.mark.asyncio
+async def test_service_client_reregistered_service():
+    client = AsyncClient("localhost:50051")
+    greeter_service = await client.service("helloworld.Greeter")
+    say_hello = greeter_service.SayHello
+    await client.register_service("helloworld.Greeter")
+    assert greeter_service.SayHello is not say_hello
+    assert greeter_service.SayHello is await client.get_invoker(
+        "helloworld.Greeter", "SayHello"
+    )
+    response = await greeter_service.SayHello({"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    invoker = client.get_registered_invoker("helloworld.Greeter", "SayHello")
+    assert invoker is greeter_service.SayHello
+    with pytest.raises(ValueError):
+        client.get_registered_invoker("helloworld.Greeter", "SayGoodbye")
+
+
+@pytest.mark.asyncio
+async def test_compiled_request_parser():
+    client = AsyncClient(
+        "localhost:50051", message_parsers=MessageParsers(compiled_request_parser=True)
+    )
+    response = await client.request(
+        "helloworld.Greeter", "SayHello", {"name": "sinsky"}
+    )
+    assert response == {"message": "Hello, sinsky!"}
+    with pytest.raises(ParseError):
+        await client.request("helloworld.Greeter", "SayHello", {"foo": "bar"})
+
+
+@pytest.mark.asyncio
+async def test_compiled_response_parser():
+    client = AsyncClient(
+        "localhost:50051", message_parsers=MessageParsers(compiled_response_parser=True)
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    response = await greeter_service.SayHello({"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    responses = await greeter_service.SayHelloGroup({"name": "sinsky jack"})
+    assert [response async for response in responses] == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_response_fields():
+    client = AsyncClient(
+        "localhost:50052",
+        message_parsers=CustomArgumentParsers(
+            message_to_dict_kwargs={"including_default_value_fields": True}
+        ),
+    )
+    request = {"readings": [1.0, 2.0]}
+    response = await client.request(
+        "client_tester.ClientTester",
+        "TestUnaryUnary",
+        request,
+        response_fields="feedback",
+    )
+    assert response == {"feedback": "Acceptable"}
+    responses = await client.unary_stream(
+        "client_tester.ClientTester",
+        "TestUnaryStream",
+        request,
+        response_fields=["feedback"],
+    )
+    assert [response async for response in responses] == [
+        {"feedback": "Acceptable"}
+    ] * 2
+
+
+@pytest.mark.asyncio
+async def test_method_response_fields():
+    client = AsyncClient("localhost:50051")
+    greeter_service = await client.service("helloworld.Greeter")
+    greeter_service.SayHello.response_fields = "message"
+    response = await greeter_service.SayHello({"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    with pytest.raises(ValueError):
+        await greeter_service.SayHello({"name": "sinsky"}, response_fields="missing")
+
+
+@pytest.mark.asyncio
+async def test_lazy_response_parser():
+    client = AsyncClient(
+        "localhost:50051", message_parsers=MessageParsers(lazy_response_parser=True)
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    response = await greeter_service.SayHello({"name": "sinsky"})
+    assert isinstance(response, MessageView)
+    assert response == {"message": "Hello, sinsky!"}
+    responses = await greeter_service.SayHelloGroup({"name": "sinsky jack"})
+    assert [response async for response in responses] == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_raw_bytes_client():
+    client = AsyncClient("localhost:50051", raw_bytes=True)
+    request = HelloRequest(name="sinsky").SerializeToString()
+    response = await client.request("helloworld.Greeter", "SayHello", request)
+    assert HelloReply.FromString(response) == HelloReply(message="Hello, sinsky!")
+    responses = await client.request(
+        "helloworld.Greeter", "SayHelloGroup", memoryview(request)
+    )
+    assert [HelloReply.FromString(response) async for response in responses] == [
+        HelloReply(message="Hello, sinsky!")
+    ]
+    with pytest.raises(ValueError):
+        await client.request("helloworld.Greeter", "SayHello", request, raw_bytes=False)
+
+
+@pytest.mark.asyncio
+async def test_raw_bytes_request():
+    client = AsyncClient("localhost:50051")
+    greeter_service = await client.service("helloworld.Greeter")
+    names = [HelloRequest(name=name).SerializeToString() for name in ("sinsky", "jack")]
+    response = await greeter_service.HelloEveryone(names, raw_bytes=True)
+    assert HelloReply.FromString(response).message == "Hello, sinsky jack!"
+    assert await greeter_service.SayHello({"name": "sinsky"}) == {
+        "message": "Hello, sinsky!"
+    }
+
+
+@pytest.mark.asyncio
+async def test_request_template():
+    client = AsyncClient("localhost:50051")
+    greeter_service = await client.service("helloworld.Greeter")
+    await greeter_service.set_request_template("SayHello", {"name": "sinsky"})
+    assert await greeter_service.SayHello() == {"message": "Hello, sinsky!"}
+    assert await client.request("helloworld.Greeter", "SayHello", {"name": "jack"}) == {
+        "message": "Hello, jack!"
+    }
+    await client.set_request_template(
+        "helloworld.Greeter", "HelloEveryone", HelloRequest(name="harry")
+    )
+    assert await greeter_service.HelloEveryone([{}, {"name": "jack"}]) == {
+        "message": "Hello, harry jack!"
+    }
+
+
+@pytest.mark.asyncio
+async def test_collect_columns():
+    client = AsyncClient("localhost:50052")
+    batches = await client.collect_columns(
+        "client_tester.ClientTester",
+        "TestUnaryStream",
+        "average,feedback",
+        {"readings": [1.0, 2.0, 3.0]},
+        batch_size=2,
+        use_numpy=False,
+    )
+    assert [batch async for batch in batches] == [
+        {"average": array("d", [0.0, 0.0]), "feedback": ["Acceptable"] * 2},
+        {"average": array("d", [0.0]), "feedback": ["Acceptable"]},
+    ]
+    with pytest.raises(ValueError):
+        await client.collect_columns(
+            "client_tester.ClientTester", "TestUnaryUnary", "average"
+        )
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=2)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_parse_executor():
+    executor = CountingExecutor()
+    client = AsyncClient(
+        "localhost:50051", parse_executor=executor, parse_offload_threshold=0
+    )
+    greeter_service = await client.service("helloworld.Greeter")
+    assert await greeter_service.SayHello({"name": "sinsky"}) == {
+        "message": "Hello, sinsky!"
+    }
+    # the request dict and the response
+    assert executor.submitted == 2
+    responses = await greeter_service.SayHelloGroup({"name": "sinsky jack harry"})
+    assert [response async for response in responses] == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+        {"message": "Hello, harry!"},
+    ]
+    assert executor.submitted == 6
+    response = await greeter_service.SayHello(
+        {"name": "sinsky"}, response_fields="message"
+    )
+    assert response == {"message": "Hello, sinsky!"}
+    assert executor.submitted == 8
+    executor.shutdown()
+
+
+class StallingGreeter(Greeter):
+    """
+    Streams a large reply for SayHelloGroup, and the next one once resumed.
+    """
+
+    def __init__(self):
+        self.resume = threading.Event()
+
+    def SayHelloGroup(self, request, context):
+        yield HelloReply(message="x" * 2048)
+        self.resume.wait(5)
+        yield HelloReply(message="Hello, again!")
+
+
+@pytest.fixture(scope="module")
+def stalling_greeter():
+    greeter = StallingGreeter()
+    server = HelloWorldServer("50059", servicer=greeter)
+    server.server.start()
+    yield greeter
+    greeter.resume.set()
+    server.server.stop(None)
+
+
+@pytest.mark.asyncio
+async def test_parse_executor_stream_not_held_back(stalling_greeter):
+    executor = ThreadPoolExecutor(1)
+    client = AsyncClient(
+        "localhost:50059", parse_executor=executor, parse_offload_threshold=1024
+    )
+    responses = await client.request(
+        "helloworld.Greeter", "SayHelloGroup", {"name": "sinsky"}
+    )
+    responses = responses.__aiter__()
+    # the large response is yielded while the server holds the next one back
+    first = await asyncio.wait_for(responses.__anext__(), 2)
+    assert first == {"message": "x" * 2048}
+    assert not stalling_greeter.resume.is_set()
+    stalling_greeter.resume.set()
+    assert [response async for response in responses] == [{"message": "Hello, again!"}]
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_parse_executor_threshold():
+    executor = CountingExecutor()
+    client = AsyncClient("localhost:50051", parse_executor=executor)
+    greeter_service = await client.service("helloworld.Greeter")
+    assert await greeter_service.SayHello({"name": "sinsky"}) == {
+        "message": "Hello, sinsky!"
+    }
+    assert await greeter_service.HelloEveryone([{"name": "sinsky"}]) == {
+        "message": "Hello, sinsky!"
+    }
+    assert executor.submitted == 0
+    executor.shutdown()
+    with pytest.raises(ValueError):
+        AsyncClient("localhost:50051", parse_executor=ProcessPoolExecutor())
+
+
+@pytest.mark.asyncio
+async def test_channel_pool():
+    client = AsyncClient("localhost:50051", channel_pool_size=2)
+    assert isinstance(client.channel, AsyncChannelPool)
+    greeter_service = await client.service("helloworld.Greeter")
+    responses = await asyncio.gather(
+        *(greeter_service.SayHello({"name": f"name{i}"}) for i in range(4))
+    )
+    assert responses == [{"message": f"Hello, name{i}!"} for i in range(4)]
+    responses = await client.request(
+        "helloworld.Greeter", "SayHelloGroup", {"name": "a b"}
+    )
+    assert [response async for response in responses] == [
+        {"message": "Hello, a!"},
+        {"message": "Hello, b!"},
+    ]
+    assert client.channel.outstanding == [0, 0]
+    await client.channel.close()
+
+
+@pytest.mark.asyncio
+async def test_multiple_endpoints():
+    # the second endpoint has no server, its calls fail with UNAVAILABLE
+    client = StubAsyncClient(
+        ["localhost:50051", "localhost:1"],
+        [HelloRequest.DESCRIPTOR.file.services_by_name["Greeter"]],
+        eject_after_unavailable=1,
+    )
+
+    async def say_hello():
+        try:
+            return await client.request(
+                "helloworld.Greeter", "SayHello", {"name": "sinsky"}
+            )
+        except grpc.RpcError as e:
+            return e.code()
+
+    assert [await say_hello() for _ in range(4)] == [
+        {"message": "Hello, sinsky!"},
+        grpc.StatusCode.UNAVAILABLE,
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, sinsky!"},
+    ]
+    assert client.channel.ejected == [1]
+    assert client.channel.outstanding == [0, 0]
+    # the tasks recording call statuses are held until they end
+    await asyncio.sleep(0.01)
+    assert not client.channel._status_tasks
+
+
+@pytest.mark.asyncio
+async def test_get_by_endpoint_options():
+    client = get_by_endpoint("localhost:50051")
+    assert AsyncClient.get_by_endpoint("localhost:50051") is client
+    stub_client = get_by_endpoint(
+        "localhost:50051",
+        service_descriptors=[HelloRequest.DESCRIPTOR.file.services_by_name["Greeter"]],
+    )
+    assert isinstance(stub_client, StubAsyncClient)
+    assert await stub_client.request(
+        "helloworld.Greeter", "SayHello", {"name": "sinsky"}
+    ) == {"message": "Hello, sinsky!"}
+    reset_cached_async_client()
+    assert get_by_endpoint("localhost:50051") is not client
+
+
+@pytest.mark.asyncio
+async def test_gather():
+    client = AsyncClient("localhost:50051")
+    responses = await client.gather(
+        "helloworld.Greeter",
+        "SayHello",
+        ({"name": f"name{i}"} for i in range(20)),
+        max_in_flight=4,
+        timeout=10,
+    )
+    assert responses == [{"message": f"Hello, name{i}!"} for i in range(20)]
+
+    async def stream_requests():
+        for names in (["a", "b"], ["c"]):
+            yield iter([{"name": name} for name in names])
+
+    responses = await client.gather(
+        "helloworld.Greeter", "HelloEveryone", stream_requests()
+    )
+    assert responses == [{"message": "Hello, a b!"}, {"message": "Hello, c!"}]
+    with pytest.raises(ValueError):
+        await client.gather("helloworld.Greeter", "SayHelloGroup", [{"name": "a"}])
+
+
+@pytest.mark.asyncio
+async def test_as_completed():
+    client = AsyncClient("localhost:50051")
+    pairs = [
+        pair
+        async for pair in client.as_completed(
+            "helloworld.Greeter",
+            "SayHello",
+            [{"name": f"name{i}"} for i in range(20)],
+            max_in_flight=4,
+            raw_output=True,
+        )
+    ]
+    assert sorted((index, response.message) for index, response in pairs) == [
+        (i, f"Hello, name{i}!") for i in range(20)
+    ]
+    responses = client.map_unordered(
+        "helloworld.Greeter", "SayHello", [{"name": "a"}, {"name": "b"}]
+    )
+    assert sorted([response["message"] async for response in responses]) == [
+        "Hello, a!",
+        "Hello, b!",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_gather_errors():
+    client = StubAsyncClient(
+        "localhost:1", [HelloRequest.DESCRIPTOR.file.services_by_name["Greeter"]]
+    )
+    errors = await client.gather(
+        "helloworld.Greeter",
+        "SayHello",
+        [{"name": "sinsky"}] * 3,
+        return_exceptions=True,
+    )
+    assert [error.code() for error in errors] == [grpc.StatusCode.UNAVAILABLE] * 3
+    with pytest.raises(grpc.RpcError):
+        async for _ in client.as_completed(
+            "helloworld.Greeter", "SayHello", [{"name": "sinsky"}] * 3
+        ):
+            pass
@@ -0,0 +1,158 @@
+import io
+import json
+import time
+
+import pytest
+from grpc_requests.aio import AsyncClient
+from grpc_requests.bulk import run_bulk, run_bulk_async
+from grpc_requests.cli import cli
+from grpc_requests.client import Client
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply
+from tests.test_servers.helloworld.helloworld_server import Greeter, HelloWorldServer
+
+"""
+Test cases for bulk requests from JSONL
+"""
+
+NAMES = [f"name{i}" for i in range(40)]
+REQUESTS = [json.dumps({"name": name}) + "\n" for name in NAMES]
+RESPONSES = [
+    {"index": i, "response": {"message": f"Hello, {name}!"}}
+    for i, name in enumerate(NAMES)
+]
+
+
+class SlowGreeter(Greeter):
+    """
+    Answers SayHello after a while.
+    """
+
+    def SayHello(self, request, context):
+        time.sleep(0.3)
+        return HelloReply(message=f"Hello, {request.name}!")
+
+
+@pytest.fixture(scope="module")
+def slow_server():
+    server = HelloWorldServer("50058", servicer=SlowGreeter())
+    server.server.start()
+    yield "localhost:50058"
+    server.server.stop(None)
+
+
+def read_records(path):
+    with open(path, encoding="utf8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_run_bulk(tmp_path, ordered):
+    input_path = tmp_path / "requests.jsonl"
+    input_path.write_text("".join(REQUESTS) + "\n", encoding="utf8")
+    output_path = tmp_path / "responses.jsonl"
+    result = run_bulk(
+        Client("localhost:50051"),
+        "helloworld.Greeter",
+        "SayHello",
+        input_path,
+        output_path,
+        concurrency=4,
+        ordered=ordered,
+    )
+    assert (result.total, result.succeeded, result.failed) == (40, 40, 0)
+    records = read_records(output_path)
+    if not ordered:
+        records.sort(key=lambda record: record["index"])
+    assert records == RESPONSES
+
+
+def test_run_bulk_futures(slow_server):
+    # the calls are in flight together with a single worker thread
+    output = io.StringIO()
+    result = run_bulk(
+        Client(slow_server),
+        "helloworld.Greeter",
+        "SayHello",
+        REQUESTS[:10],
+        output,
+        concurrency=10,
+        workers=1,
+    )
+    assert (result.total, result.succeeded, result.failed) == (10, 10, 0)
+    assert result.elapsed < 1.5
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records == RESPONSES[:10]
+
+
+def test_run_bulk_errors():
+    output = io.StringIO()
+    result = run_bulk(
+        Client("localhost:50051"),
+        "helloworld.Greeter",
+        "SayHelloGroup",
+        ['{"name": "sinsky jack"}', "not json", '{"missing": 1}'],
+        output,
+    )
+    assert (result.total, result.succeeded, result.failed) == (3, 1, 2)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records[0] == {
+        "index": 0,
+        "response": [{"message": "Hello, sinsky!"}, {"message": "Hello, jack!"}],
+    }
+    assert records[1]["error"]["code"] == "JSONDecodeError"
+    assert records[2]["error"]["code"] == "ParseError"
+    with pytest.raises(ValueError):
+        run_bulk(
+            Client("localhost:50051"), "helloworld.Greeter", "SayHello", [], output, 0
+        )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("ordered", [True, False])
+async def test_run_bulk_async(ordered):
+    output = io.StringIO()
+    result = await run_bulk_async(
+        AsyncClient("localhost:50051"),
+        "helloworld.Greeter",
+        "SayHello",
+        REQUESTS + ["not json"],
+        output,
+        concurrency=4,
+        ordered=ordered,
+        chunk_size=16,
+    )
+    assert (result.total, result.succeeded, result.failed) == (41, 40, 1)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    if not ordered:
+        records.sort(key=lambda record: record["index"])
+    assert records[:40] == RESPONSES
+    assert records[40]["error"]["code"] == "JSONDecodeError"
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_cli_bulk(tmp_path, use_async):
+    input_path = tmp_path / "requests.jsonl"
+    input_path.write_text("".join(REQUESTS), encoding="utf8")
+    output_path = tmp_path / "responses.jsonl"
+    argv = [
+        "bulk",
+        "localhost:50051",
+        "helloworld.Greeter",
+        "SayHello",
+        "-i",
+        str(input_path),
+        "-o",
+        str(output_path),
+        "--metadata",
+        "key=value",
+        "--timeout",
+        "10",
+        "--workers",
+        "2",
+    ]
+    if use_async:
+        argv.append("--async")
+    assert cli(argv) == 0
+    assert read_records(output_path) == RESPONSES
+    with pytest.raises(SystemExit):
+        cli(argv + ["--metadata", "no_separator"])
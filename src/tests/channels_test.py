@@ -0,0 +1,146 @@
+import grpc
+import pytest
+from grpc_requests.channels import (
+    ChannelPool,
+    EwmaPicker,
+    LeastOutstandingPicker,
+    PowerOfTwoChoicesPicker,
+    RoundRobinPicker,
+    get_picker,
+    pool_channel_options,
+)
+
+"""
+Test cases for channel pools
+"""
+
+
+class FakeCall:
+    def __init__(self):
+        self.callbacks = []
+        self.status_code = None
+
+    def add_done_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def code(self):
+        return self.status_code
+
+    def end(self, code=grpc.StatusCode.OK):
+        self.status_code = code
+        for callback in self.callbacks:
+            callback(self)
+
+
+class FakeChannel:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def unary_unary(self, method, **kwargs):
+        return lambda request, **kwargs: (self.name, method, request)
+
+    def unary_stream(self, method, **kwargs):
+        return lambda request, **kwargs: FakeCall()
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(picker, size=3, **kwargs):
+    return ChannelPool([FakeChannel(i) for i in range(size)], picker, **kwargs)
+
+
+def test_round_robin():
+    pool = make_pool("round_robin")
+    handler = pool.unary_unary("/Service/Method", request_serializer=None)
+    assert [handler(i)[0] for i in range(6)] == [0, 1, 2, 0, 1, 2]
+    assert handler("request") == (0, "/Service/Method", "request")
+    assert pool.outstanding == [0, 0, 0]
+
+
+def test_least_outstanding():
+    pool = make_pool(LeastOutstandingPicker())
+    handler = pool.unary_stream("/Service/Method")
+    calls = [handler(i) for i in range(3)]
+    assert pool.outstanding == [1, 1, 1]
+    calls[1].end()
+    assert pool.outstanding == [1, 0, 1]
+    call = handler("request")
+    assert pool.outstanding == [1, 1, 1]
+    call.end()
+    calls[0].end()
+    calls[2].end()
+    assert pool.outstanding == [0, 0, 0]
+
+
+def test_release_on_error():
+    pool = make_pool(RoundRobinPicker(), size=2)
+
+    class FailingChannel(FakeChannel):
+        def unary_unary(self, method, **kwargs):
+            def fail(request, **kwargs):
+                raise RuntimeError("unavailable")
+
+            return fail
+
+    pool.channels[0] = FailingChannel(0)
+    handler = pool.unary_unary("/Service/Method")
+    with pytest.raises(RuntimeError):
+        handler("request")
+    assert pool.outstanding == [0, 0]
+    pool.close()
+    assert all(channel.closed for channel in pool.channels)
+
+
+def test_power_of_two():
+    pool = make_pool(PowerOfTwoChoicesPicker(), size=2)
+    pool.outstanding[0] = 5
+    handler = pool.unary_unary("/Service/Method")
+    assert {handler(i)[0] for i in range(10)} == {1}
+
+
+def test_ewma():
+    pool = make_pool(EwmaPicker(), size=2)
+    handler = pool.unary_stream("/Service/Method")
+    # channels without a measured latency are tried first
+    calls = [handler("request") for _ in range(2)]
+    assert pool.outstanding == [1, 1]
+    for call in calls:
+        call.end()
+    assert pool.outstanding == [0, 0]
+    pool.latencies = [1.0, 0.1]
+    assert {pool.acquire() for _ in range(5)} == {1}
+
+
+def test_ejection():
+    pool = make_pool("round_robin", size=2, eject_after_unavailable=2)
+    handler = pool.unary_stream("/Service/Method")
+    for _ in range(4):
+        handler("request").end(grpc.StatusCode.UNAVAILABLE)
+    assert pool.ejected == [0, 1]
+    # every channel is ejected, calls go to all of them
+    assert pool.candidates() == [0, 1]
+    handler("request").end()
+    assert len(pool.ejected) == 1
+    (ejected,) = pool.ejected
+    assert pool.candidates() == [1 - ejected]
+    # a probe after the ejection time brings the channel back
+    pool.ejected_until[ejected] = 0.0
+    assert pool.candidates() == [0, 1]
+    calls = [handler("request") for _ in range(2)]
+    assert pool.candidates() == [1 - ejected]
+    for call in calls:
+        call.end()
+    assert pool.ejected == []
+
+
+def test_get_picker():
+    picker = RoundRobinPicker()
+    assert get_picker(picker) is picker
+    assert isinstance(get_picker("least_outstanding"), LeastOutstandingPicker)
+    with pytest.raises(ValueError):
+        get_picker("random")
+    with pytest.raises(ValueError):
+        ChannelPool([])
+    assert pool_channel_options(None) == [("grpc.use_local_subchannel_pool", 1)]
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from grpc_requests import aio
+from grpc_requests.client_cache import ClientCache, client_key, freeze_option
+
+"""
+Test cases for the client cache of get_by_endpoint
+"""
+
+
+class FakeClient:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+
+def close(client):
+    client.closed = True
+
+
+def test_client_key():
+    options = [("grpc.max_send_message_length", 1024)]
+    assert client_key(FakeClient, "localhost:50051", {"options": options}) == (
+        client_key(FakeClient, "localhost:50051", {"options": list(options)})
+    )
+    assert client_key(FakeClient, "localhost:50051", {"ssl": True}) != (
+        client_key(FakeClient, "localhost:50051", {"ssl": False})
+    )
+    assert freeze_option({"b": [1, 2], "a": {3}}) == (
+        ("a", frozenset({3})),
+        ("b", (1, 2)),
+    )
+    unhashable = bytearray(b"certificate")
+    assert freeze_option(unhashable) == ("id", id(unhashable))
+
+
+def test_lru_eviction():
+    cache = ClientCache(close, max_size=2)
+    first = cache.get("first", lambda: FakeClient("first"))
+    second = cache.get("second", lambda: FakeClient("second"))
+    assert cache.get("first", lambda: FakeClient("other")) is first
+    cache.get("third", lambda: FakeClient("third"))
+    assert second.closed and not first.closed
+    assert "second" not in cache and "first" in cache
+    assert tuple(cache.stats()) == (1, 3, 1, 2)
+    cache.remove()
+    assert len(cache) == 0 and not first.closed
+
+
+def test_unbounded_by_default():
+    cache = ClientCache(close)
+    clients = [cache.get(index, lambda: FakeClient("client")) for index in range(300)]
+    assert len(cache) == 300
+    assert not any(client.closed for client in clients)
+
+
+def test_idle_eviction():
+    cache = ClientCache(close, idle_seconds=0.05)
+    client = cache.get("idle", lambda: FakeClient("idle"))
+    time.sleep(0.1)
+    cache.evict_idle()
+    assert client.closed
+    assert cache.stats().evictions == 1
+
+
+def test_failed_creation():
+    cache = ClientCache(close)
+
+    def fail():
+        raise ValueError("unreachable")
+
+    with pytest.raises(ValueError):
+        cache.get("key", fail)
+    assert cache.get("key", lambda: FakeClient("key")).name == "key"
+
+
+def test_single_construction():
+    cache = ClientCache(close)
+    created = []
+
+    def create():
+        time.sleep(0.05)
+        created.append(FakeClient("shared"))
+        return created[-1]
+
+    clients = []
+    threads = [
+        threading.Thread(target=lambda: clients.append(cache.get("shared", create)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
+    assert cache.stats().misses == 1
+
+
+class FakeAsyncChannel:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        await asyncio.sleep(0)
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_async_close_tasks_held():
+    cache = ClientCache(aio._close_cached_client, max_size=1)
+    first = cache.get("first", lambda: FakeClient("first"))
+    first.channel = FakeAsyncChannel()
+    cache.get("second", lambda: FakeClient("second"))
+    # the task closing the evicted channel is held until it ends
+    assert len(aio._closing_channels) == 1
+    await asyncio.gather(*aio._closing_channels)
+    await asyncio.sleep(0)
+    assert first.channel.closed
+    assert not aio._closing_channels
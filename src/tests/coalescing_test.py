@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+import pytest
+from grpc_requests.aio import AsyncClient
+from grpc_requests.client import Client
+from grpc_requests.coalescing import RequestCoalescer
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply
+from tests.test_servers.helloworld.helloworld_server import Greeter, HelloWorldServer
+
+"""
+Test cases for coalesced requests
+"""
+
+
+class CountingGreeter(Greeter):
+    """
+    Answers SayHello after a while, counting the calls of every name.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def SayHello(self, request, context):
+        with self.lock:
+            self.calls[request.name] = self.calls.get(request.name, 0) + 1
+        time.sleep(0.2)
+        return HelloReply(message=f"Hello, {request.name}!")
+
+
+@pytest.fixture(scope="module")
+def counting_greeter():
+    greeter = CountingGreeter()
+    server = HelloWorldServer("50057", servicer=greeter)
+    server.server.start()
+    yield greeter
+    server.server.stop(None)
+
+
+ENDPOINT = "localhost:50057"
+
+
+def test_coalesced_requests(counting_greeter):
+    client = Client(ENDPOINT, request_coalescer=RequestCoalescer())
+    barrier = threading.Barrier(8)
+
+    def say_hello(name):
+        barrier.wait()
+        return client.request("helloworld.Greeter", "SayHello", {"name": name})
+
+    names = ["sync"] * 6 + ["sync other"] * 2
+    with ThreadPoolExecutor(8) as executor:
+        responses = list(executor.map(say_hello, names))
+    assert responses == [{"message": f"Hello, {name}!"} for name in names]
+    assert counting_greeter.calls["sync"] == 1
+    assert counting_greeter.calls["sync other"] == 1
+    stats = client.request_coalescer.stats()
+    assert tuple(stats) == (2, 6, 0)
+    # calls after the call ended make a call of their own
+    client.request("helloworld.Greeter", "SayHello", {"name": "sync"})
+    assert counting_greeter.calls["sync"] == 2
+
+
+def test_coalesced_futures(counting_greeter):
+    client = Client(ENDPOINT)
+    coalescer = client.set_request_coalescer(
+        "helloworld.Greeter", "SayHello", RequestCoalescer()
+    )
+    futures = [
+        client.request_future("helloworld.Greeter", "SayHello", {"name": "future"})
+        for _ in range(3)
+    ]
+    raw_future = client.request_future(
+        "helloworld.Greeter", "SayHello", {"name": "future"}, raw_output=True
+    )
+    # calls with other keyword arguments are not coalesced
+    timeout_future = client.request_future(
+        "helloworld.Greeter", "SayHello", {"name": "future"}, timeout=5
+    )
+    assert [future.result() for future in futures] == [
+        {"message": "Hello, future!"}
+    ] * 3
+    assert raw_future.result().message == "Hello, future!"
+    assert timeout_future.result() == {"message": "Hello, future!"}
+    assert counting_greeter.calls["future"] == 2
+    assert tuple(coalescer.stats()) == (2, 3, 0)
+    with pytest.raises(ValueError):
+        client.set_request_coalescer(
+            "helloworld.Greeter", "SayHelloGroup", RequestCoalescer()
+        )
+
+
+def test_coalesced_future_cancelled(counting_greeter):
+    client = Client(ENDPOINT, request_coalescer=RequestCoalescer())
+    future = client.request_future(
+        "helloworld.Greeter", "SayHello", {"name": "future cancelled"}
+    )
+    with ThreadPoolExecutor(1) as executor:
+        waiting = executor.submit(
+            client.request,
+            "helloworld.Greeter",
+            "SayHello",
+            {"name": "future cancelled"},
+        )
+        time.sleep(0.05)
+        assert future.cancel()
+        # the call goes on for the caller still waiting
+        assert waiting.result() == {"message": "Hello, future cancelled!"}
+    assert future.cancelled()
+    with pytest.raises(grpc.FutureCancelledError):
+        future.result()
+    assert counting_greeter.calls["future cancelled"] == 1
+    # the call is cancelled once every caller is
+    futures = [
+        client.request_future(
+            "helloworld.Greeter", "SayHello", {"name": "future cancelled"}
+        )
+        for _ in range(2)
+    ]
+    assert all(future.cancel() for future in futures)
+    assert client.request_coalescer.stats().in_flight == 0
+    assert all(future.cancelled() for future in futures)
+
+
+@pytest.mark.asyncio
+async def test_coalesced_requests_async(counting_greeter):
+    client = AsyncClient(ENDPOINT, request_coalescer=RequestCoalescer())
+    say_hello = await client.get_invoker("helloworld.Greeter", "SayHello")
+    responses = await asyncio.gather(*(say_hello({"name": "async"}) for _ in range(5)))
+    assert responses == [{"message": "Hello, async!"}] * 5
+    assert counting_greeter.calls["async"] == 1
+    assert tuple(client.request_coalescer.stats()) == (1, 4, 0)
+
+
+@pytest.mark.asyncio
+async def test_coalesced_request_cancelled(counting_greeter):
+    client = AsyncClient(ENDPOINT)
+    coalescer = await client.set_request_coalescer(
+        "helloworld.Greeter", "SayHello", RequestCoalescer()
+    )
+    say_hello = await client.get_invoker("helloworld.Greeter", "SayHello")
+    cancelled = asyncio.ensure_future(say_hello({"name": "cancelled"}))
+    waiting = asyncio.ensure_future(say_hello({"name": "cancelled"}))
+    await asyncio.sleep(0.05)
+    cancelled.cancel()
+    # the call goes on for the caller still waiting
+    assert await waiting == {"message": "Hello, cancelled!"}
+    assert cancelled.cancelled()
+    assert coalescer.stats().in_flight == 0
+    # the call is cancelled once every caller is
+    task = asyncio.ensure_future(say_hello({"name": "cancelled"}))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert coalescer.stats().in_flight == 0
+    assert counting_greeter.calls["cancelled"] == 2
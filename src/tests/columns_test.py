@@ -0,0 +1,112 @@
+from array import array
+
+import pytest
+from google.protobuf import descriptor_pb2
+from grpc_requests.columns import (
+    ColumnCollector,
+    get_column_collector,
+    resolve_field_path,
+)
+from tests.test_servers.client_tester import client_tester_pb2
+
+"""
+Test cases for columnar collection of messages
+"""
+
+RequestMessage = client_tester_pb2.TestRequest
+FieldMessage = descriptor_pb2.FieldDescriptorProto
+
+MESSAGES = [
+    RequestMessage(
+        factor=i, uuid=2**64 - 1 - i, sample_flag=i % 2 == 0, request_name=str(i)
+    )
+    for i in range(5)
+]
+
+
+def test_collect_arrays():
+    collector = ColumnCollector(
+        RequestMessage.DESCRIPTOR,
+        "factor,uuid,sampleFlag,request_name",
+        use_numpy=False,
+    )
+    (batch,) = collector.collect(MESSAGES)
+    assert batch == {
+        "factor": array("i", range(5)),
+        "uuid": array("Q", [2**64 - 1 - i for i in range(5)]),
+        "sampleFlag": array("b", [1, 0, 1, 0, 1]),
+        "request_name": ["0", "1", "2", "3", "4"],
+    }
+
+
+def test_collect_batches():
+    collector = ColumnCollector(
+        RequestMessage.DESCRIPTOR, ["factor"], batch_size=2, use_numpy=False
+    )
+    assert list(collector.collect(MESSAGES)) == [
+        {"factor": array("i", [0, 1])},
+        {"factor": array("i", [2, 3])},
+        {"factor": array("i", [4])},
+    ]
+    assert list(collector.collect([])) == []
+
+
+def test_collect_nested_fields():
+    messages = [
+        FieldMessage(number=1, label=FieldMessage.LABEL_REPEATED),
+        FieldMessage(number=2, options=descriptor_pb2.FieldOptions(packed=True)),
+    ]
+    collector = ColumnCollector(
+        FieldMessage.DESCRIPTOR, ["number", "label", "options.packed"], use_numpy=False
+    )
+    assert next(collector.collect(messages)) == {
+        "number": array("i", [1, 2]),
+        "label": array("i", [FieldMessage.LABEL_REPEATED, FieldMessage.LABEL_OPTIONAL]),
+        "options.packed": array("b", [0, 1]),
+    }
+
+
+def test_collect_numpy():
+    numpy = pytest.importorskip("numpy")
+    collector = ColumnCollector(RequestMessage.DESCRIPTOR, "factor,uuid,request_name")
+    (batch,) = collector.collect(MESSAGES)
+    assert batch["factor"].dtype == numpy.int32
+    assert batch["uuid"].dtype == numpy.uint64
+    assert batch["uuid"].tolist() == [2**64 - 1 - i for i in range(5)]
+    assert batch["request_name"].tolist() == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        "missing",
+        "readings",
+        "factor.value",
+        "options",
+        "options.uninterpreted_option",
+        "",
+    ],
+)
+def test_collect_invalid_fields(fields):
+    descriptor = (
+        FieldMessage.DESCRIPTOR
+        if fields.startswith("options")
+        else RequestMessage.DESCRIPTOR
+    )
+    with pytest.raises(ValueError):
+        ColumnCollector(descriptor, fields, use_numpy=False)
+
+
+def test_resolve_field_path():
+    path, field = resolve_field_path(FieldMessage.DESCRIPTOR, "jsonName")
+    assert path == "json_name"
+    assert field.name == "json_name"
+    with pytest.raises(ValueError):
+        ColumnCollector(RequestMessage.DESCRIPTOR, "factor", batch_size=0)
+
+
+def test_get_column_collector():
+    collector = get_column_collector(RequestMessage.DESCRIPTOR, ["factor"], 2, False)
+    assert get_column_collector(RequestMessage.DESCRIPTOR, ("factor",), 2, False) is (
+        collector
+    )
@@ -0,0 +1,510 @@
+import copy
+import json
+import pickle
+
+import pytest
+from google.protobuf import (
+    descriptor_pb2,
+    descriptor_pool,
+    struct_pb2,
+    timestamp_pb2,
+)
+from google.protobuf.json_format import MessageToDict, ParseDict, ParseError
+from google.protobuf.message_factory import GetMessageClass
+from grpc_requests import converters
+from grpc_requests.converters import (
+    DictToMessageConverter,
+    MessageToDictConverter,
+    MessageToDictConverters,
+    MessageView,
+    MessageViewConverter,
+    get_dict_to_message_converter,
+    get_message_to_dict_converter,
+    get_message_view_converter,
+    parse_field_paths,
+)
+from tests.test_servers.client_tester import client_tester_pb2
+
+"""
+Test cases for compiled message converters
+"""
+
+FieldProto = descriptor_pb2.FieldDescriptorProto
+
+
+def make_converter_test_message():
+    pool = descriptor_pool.DescriptorPool()
+    pool.AddSerializedFile(timestamp_pb2.DESCRIPTOR.serialized_pb)
+    pool.AddSerializedFile(struct_pb2.DESCRIPTOR.serialized_pb)
+    file_descriptor = descriptor_pb2.FileDescriptorProto(
+        name="converters_test.proto",
+        package="converters_test",
+        syntax="proto3",
+        dependency=["google/protobuf/timestamp.proto", "google/protobuf/struct.proto"],
+    )
+    color = file_descriptor.enum_type.add(name="Color")
+    color.value.add(name="RED", number=0)
+    color.value.add(name="GREEN", number=1)
+
+    message = file_descriptor.message_type.add(name="Everything")
+    entry = message.nested_type.add(name="CountsEntry")
+    entry.options.map_entry = True
+    entry.field.add(name="key", number=1, type=FieldProto.TYPE_STRING)
+    entry.field.add(name="value", number=2, type=FieldProto.TYPE_INT64)
+    entry = message.nested_type.add(name="ChildrenEntry")
+    entry.options.map_entry = True
+    entry.field.add(name="key", number=1, type=FieldProto.TYPE_INT32)
+    entry.field.add(
+        name="value",
+        number=2,
+        type=FieldProto.TYPE_MESSAGE,
+        type_name=".converters_test.Everything",
+    )
+    message.oneof_decl.add(name="choice")
+
+    fields = [
+        ("int_value", FieldProto.TYPE_INT64, None, False),
+        ("float_value", FieldProto.TYPE_FLOAT, None, False),
+        ("double_value", FieldProto.TYPE_DOUBLE, None, False),
+        ("flag", FieldProto.TYPE_BOOL, None, False),
+        ("text", FieldProto.TYPE_STRING, None, False),
+        ("data", FieldProto.TYPE_BYTES, None, False),
+        ("color", FieldProto.TYPE_ENUM, ".converters_test.Color", False),
+        ("child", FieldProto.TYPE_MESSAGE, ".converters_test.Everything", False),
+        ("numbers", FieldProto.TYPE_INT32, None, True),
+        ("items", FieldProto.TYPE_MESSAGE, ".converters_test.Everything", True),
+        (
+            "counts",
+            FieldProto.TYPE_MESSAGE,
+            ".converters_test.Everything.CountsEntry",
+            True,
+        ),
+        (
+            "children",
+            FieldProto.TYPE_MESSAGE,
+            ".converters_test.Everything.ChildrenEntry",
+            True,
+        ),
+        ("created", FieldProto.TYPE_MESSAGE, ".google.protobuf.Timestamp", False),
+        ("extra", FieldProto.TYPE_MESSAGE, ".google.protobuf.Struct", False),
+        ("first", FieldProto.TYPE_STRING, None, False),
+        ("second", FieldProto.TYPE_INT32, None, False),
+        ("ratios", FieldProto.TYPE_FLOAT, None, True),
+        ("tags", FieldProto.TYPE_STRING, None, True),
+    ]
+    for number, (name, field_type, type_name, repeated) in enumerate(fields, start=1):
+        field = message.field.add(
+            name=name,
+            number=number,
+            type=field_type,
+            label=FieldProto.LABEL_REPEATED if repeated else FieldProto.LABEL_OPTIONAL,
+        )
+        if type_name:
+            field.type_name = type_name
+        if name in ("first", "second"):
+            field.oneof_index = 0
+    pool.Add(file_descriptor)
+    return GetMessageClass(pool.FindMessageTypeByName("converters_test.Everything"))
+
+
+Everything = make_converter_test_message()
+
+
+def parse_or_error(parse, data):
+    try:
+        return parse(data).SerializeToString(deterministic=True)
+    except ParseError as e:
+        return str(e)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        {
+            "intValue": "12",
+            "float_value": 1.5,
+            "doubleValue": 2,
+            "flag": True,
+            "text": "hello",
+            "data": "aGVsbG8",
+            "color": "GREEN",
+            "numbers": [1, 2.0, "3"],
+        },
+        {"child": {"child": {"text": "nested"}}, "items": [{"color": 1}, {}]},
+        {"counts": {"a": 1, "b": "2"}, "children": {"1": {"flag": False}}},
+        {"created": "2024-01-01T00:00:00Z", "extra": {"a": [1, "b", None]}},
+        {"child": {}, "items": [{"child": {}}]},
+        {"first": "one"},
+        {"second": 2},
+        {"first": "one", "child": {"second": 2}},
+        {"text": "json", "text": "overridden"},  # noqa: F601
+        {"first": "one", "second": 2},
+        {"flag": 1},
+        {"int_value": 1.5},
+        {"int_value": True},
+        {"int_value": "1 2"},
+        {"double_value": float("nan")},
+        {"double_value": "Infinity"},
+        {"float_value": 1e39},
+        {"color": "BLUE"},
+        {"color": 7},
+        {"text": None},
+        {"text": "\ud800"},
+        {"numbers": 1},
+        {"numbers": [1, True]},
+        {"ratios": [1.5, 2, 0.1]},
+        {"ratios": [1.0, float("nan")]},
+        {"ratios": [1.0, 1e39]},
+        {"ratios": [1e308, 1e308]},
+        {"tags": ["a", "b"]},
+        {"tags": ["a", "\u00e9", "\ud800"]},
+        {"numbers": [1, None]},
+        {"items": [None]},
+        {"counts": {"a": 1.5}},
+        {"children": {"x": {}}},
+        {"unknown": 1},
+        {"created": "yesterday"},
+    ],
+)
+def test_dict_to_message_matches_parse_dict(data):
+    converter = DictToMessageConverter(Everything)
+    expected = parse_or_error(lambda d: ParseDict(d, Everything()), data)
+    assert parse_or_error(converter, data) == expected
+
+
+def test_dict_to_message_options():
+    converter = DictToMessageConverter(Everything)
+    assert converter({"unknown": 1, "text": "a"}, ignore_unknown_fields=True) == (
+        Everything(text="a")
+    )
+    nested = {"child": {"child": {"child": {}}}}
+    with pytest.raises(ParseError):
+        converter(nested, max_recursion_depth=3)
+    assert converter(nested, max_recursion_depth=4) == ParseDict(nested, Everything())
+
+
+def test_dict_to_message_does_not_fall_back(monkeypatch):
+    data = {
+        "intValue": 12,
+        "text": "hello",
+        "color": "GREEN",
+        "child": {"numbers": [1, 2]},
+        "items": [{"flag": True}],
+        "counts": {"a": 1},
+        "children": {"1": {"data": "aGVsbG8="}},
+        "first": "one",
+    }
+    expected = ParseDict(data, Everything())
+    converter = DictToMessageConverter(Everything)
+
+    def parse_dict(*args, **kwargs):
+        raise AssertionError("ParseDict should not be called")
+
+    monkeypatch.setattr(converters, "ParseDict", parse_dict)
+    assert converter(data) == expected
+
+
+def test_get_dict_to_message_converter():
+    test_request = client_tester_pb2.TestRequest
+    converter = get_dict_to_message_converter(test_request)
+    assert get_dict_to_message_converter(test_request) is converter
+    data = {"factor": 2, "readings": [1.5, 2], "uuid": "18446744073709551615"}
+    assert converter(data) == ParseDict(data, test_request())
+
+
+MESSAGE_TO_DICT_OPTIONS = [
+    {},
+    {"preserving_proto_field_name": True},
+    {"including_default_value_fields": True, "use_integers_for_enums": True},
+    {"float_precision": 3},
+]
+
+
+@pytest.mark.parametrize("options", MESSAGE_TO_DICT_OPTIONS)
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        {
+            "int_value": "-12",
+            "double_value": 2.5,
+            "flag": True,
+            "text": "hello",
+            "data": "aGVsbG8=",
+            "color": "GREEN",
+            "numbers": [1, 2, 3],
+            "ratios": [0.1, 1e38, "NaN", "-Infinity"],
+            "float_value": 3.4028234663852886e38,
+            "tags": ["a", "b"],
+        },
+        {"double_value": "Infinity", "float_value": "NaN"},
+        {"ratios": [1 / 3, 2 / 3, 1e-40, 3.4028234663852886e38, -0.0, 16777217]},
+        {"child": {"child": {"text": "nested"}}, "items": [{"color": 1}, {}]},
+        {"counts": {"a": 1, "b": "2"}, "children": {"1": {"flag": False}}},
+        {"created": "2024-01-01T00:00:00Z", "extra": {"a": [1, "b", None]}},
+        {"first": "one", "child": {"second": 0}},
+    ],
+)
+def test_message_to_dict_matches_message_to_dict(data, options):
+    message = ParseDict(data, Everything())
+    converter = MessageToDictConverter(Everything, **options)
+    assert converter(message) == MessageToDict(message, **options)
+
+
+def test_message_to_dict_does_not_fall_back(monkeypatch):
+    message = ParseDict(
+        {
+            "int_value": "-12",
+            "ratios": [0.1, "NaN"],
+            "data": "aGVsbG8=",
+            "color": "GREEN",
+            "items": [{"color": 1}, {}],
+            "counts": {"a": 1},
+            "children": {"1": {"flag": True}},
+            "first": "one",
+        },
+        Everything(),
+    )
+    expected = MessageToDict(message, including_default_value_fields=True)
+    converter = MessageToDictConverter(Everything, including_default_value_fields=True)
+
+    def message_to_dict(*args, **kwargs):
+        raise AssertionError("MessageToDict should not be called")
+
+    monkeypatch.setattr(converters, "MessageToDict", message_to_dict)
+    assert converter(message) == expected
+
+
+def test_message_to_dict_unknown_enum_value():
+    message = Everything(color=7, items=[Everything(color=8)])
+    assert MessageToDictConverter(Everything)(message) == MessageToDict(message)
+
+
+def test_get_message_to_dict_converter():
+    test_response = client_tester_pb2.TestResponse
+    converter = get_message_to_dict_converter(
+        test_response, preserving_proto_field_name=True
+    )
+    assert (
+        get_message_to_dict_converter(test_response, preserving_proto_field_name=True)
+        is converter
+    )
+    assert get_message_to_dict_converter(test_response) is not converter
+    message = test_response(average=1.5, feedback="good")
+    assert converter(message) == {"average": 1.5, "feedback": "good"}
+
+
+PROJECTED_MESSAGE = {
+    "int_value": "12",
+    "text": "hello",
+    "child": {"text": "child", "color": "GREEN", "numbers": [1]},
+    "items": [{"text": "a", "flag": True, "child": {"text": "b"}}, {"int_value": 3}],
+    "counts": {"a": 1},
+    "created": "2024-01-01T00:00:00Z",
+    "first": "one",
+}
+
+
+@pytest.mark.parametrize("options", MESSAGE_TO_DICT_OPTIONS)
+@pytest.mark.parametrize(
+    "fields, expected",
+    [
+        ("text", {"text": "hello"}),
+        (
+            "intValue,child.color,items.text",
+            {
+                "intValue": "12",
+                "child": {"color": "GREEN"},
+                "items": [{"text": "a"}, {}],
+            },
+        ),
+        (
+            ["items.child.text", "items", "counts"],
+            {
+                "items": [
+                    {"text": "a", "flag": True, "child": {"text": "b"}},
+                    {"intValue": "3"},
+                ],
+                "counts": {"a": "1"},
+            },
+        ),
+        (" created , first ", {"created": "2024-01-01T00:00:00Z", "first": "one"}),
+        ("second,data", {}),
+    ],
+)
+def test_message_to_dict_fields(fields, expected, options):
+    message = ParseDict(PROJECTED_MESSAGE, Everything())
+    full = MessageToDict(message, **options)
+    converter = MessageToDictConverter(Everything, fields=fields, **options)
+    projected = converter(message)
+    # the projection keeps the full conversion of every selected field
+    assert list(projected) == [name for name in full if name in projected]
+    if not options:
+        assert projected == expected
+    for name, value in projected.items():
+        if name not in ("child", "items"):
+            assert value == full[name]
+
+
+@pytest.mark.parametrize("options", MESSAGE_TO_DICT_OPTIONS)
+@pytest.mark.parametrize(
+    "data",
+    [
+        PROJECTED_MESSAGE,
+        {"double_value": -0.0, "float_value": -0.0, "second": 0, "child": {}},
+        {"double_value": "NaN", "data": "", "numbers": [], "items": [{}]},
+    ],
+)
+def test_message_to_dict_all_fields(data, options):
+    message = ParseDict(data, Everything())
+    fields = [field.name for field in Everything.DESCRIPTOR.fields]
+    converter = MessageToDictConverter(Everything, fields=fields, **options)
+    assert converter(message) == MessageToDict(message, **options)
+
+
+def test_message_to_dict_fields_fall_back(monkeypatch):
+    message = ParseDict(PROJECTED_MESSAGE, Everything())
+    converter = MessageToDictConverter(Everything, fields="child.text,items.flag")
+    expected = converter(message)
+
+    def print_message(*args, **kwargs):
+        raise converters._Fallback()
+
+    monkeypatch.setattr(converters._MessagePrinter, "print", print_message)
+    assert converter(message) == expected
+    assert expected == {"child": {"text": "child"}, "items": [{"flag": True}, {}]}
+
+
+@pytest.mark.parametrize(
+    "fields",
+    ["missing", "text.length", "counts.a", "created.seconds", "", "child."],
+)
+def test_message_to_dict_invalid_fields(fields):
+    with pytest.raises(ValueError):
+        MessageToDictConverter(Everything, fields=fields)
+
+
+def test_parse_field_paths():
+    assert parse_field_paths("a.b,a.c.d, e") == (
+        ("a", (("b", None), ("c", (("d", None),)))),
+        ("e", None),
+    )
+    assert parse_field_paths(["a.b", "a"]) == (("a", None),)
+    assert parse_field_paths(["a", "a.b"]) == (("a", None),)
+    assert parse_field_paths(parse_field_paths("a.b")) == parse_field_paths("a.b")
+
+
+def test_message_to_dict_converters():
+    converters_by_type = MessageToDictConverters(preserving_proto_field_name=True)
+    message = client_tester_pb2.TestResponse(average=1.5, feedback="good")
+    assert converters_by_type.convert(message) == {"average": 1.5, "feedback": "good"}
+    assert converters_by_type.convert(message, "feedback") == {"feedback": "good"}
+    assert converters_by_type.convert(message, ["average"]) == {"average": 1.5}
+
+
+@pytest.mark.parametrize("options", MESSAGE_TO_DICT_OPTIONS)
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        PROJECTED_MESSAGE,
+        {"ratios": [0.1, "NaN"], "children": {"1": {"items": [{"flag": True}]}}},
+    ],
+)
+def test_message_view_matches_message_to_dict(data, options):
+    message = ParseDict(data, Everything())
+    expected = MessageToDict(message, **options)
+    view = MessageViewConverter(Everything, **options)(message)
+    assert isinstance(view, MessageView)
+    assert view == expected
+    assert expected == view
+    assert (view != expected) is False
+    assert json.loads(json.dumps(view)) == json.loads(json.dumps(expected))
+    assert dict(MessageViewConverter(Everything, **options)(message)) == expected
+    assert {**MessageViewConverter(Everything, **options)(message)} == expected
+
+
+def test_message_view_converts_on_read():
+    message = ParseDict(PROJECTED_MESSAGE, Everything())
+    view = MessageViewConverter(Everything, preserving_proto_field_name=True)(message)
+    assert list(view) == [
+        "int_value",
+        "text",
+        "child",
+        "items",
+        "counts",
+        "created",
+        "first",
+    ]
+    assert len(view) == 7
+    # strings need no conversion, the other fields are converted on first read
+    assert dict.__getitem__(view, "text") == "hello"
+    assert dict.__getitem__(view, "child") is None
+    child = view["child"]
+    assert isinstance(child, MessageView)
+    assert view["child"] is child
+    assert child["color"] == "GREEN"
+    assert view.get("items")[0]["child"] == {"text": "b"}
+    assert view.get("second") is None
+    assert "created" in view and view["created"] == "2024-01-01T00:00:00Z"
+    assert dict.__getitem__(view, "counts") is None
+    assert view.copy() == MessageToDict(message, preserving_proto_field_name=True)
+    assert type(view.copy()) is dict
+
+
+def test_message_view_is_read_only():
+    view = MessageViewConverter(Everything)(Everything(text="a"))
+    with pytest.raises(TypeError):
+        view["text"] = "b"
+    with pytest.raises(TypeError):
+        del view["text"]
+    with pytest.raises(TypeError):
+        view.update({"text": "b"})
+    with pytest.raises(TypeError):
+        view.pop("text")
+    assert view == {"text": "a"}
+
+
+def test_message_view_copies_are_dicts():
+    message = ParseDict(PROJECTED_MESSAGE, Everything())
+    view = MessageViewConverter(Everything)(message)
+    for copied in (
+        copy.copy(view),
+        copy.deepcopy(view),
+        pickle.loads(pickle.dumps(view)),
+    ):
+        assert type(copied) is dict
+        assert copied == MessageToDict(message)
+
+
+def test_message_view_fields():
+    message = ParseDict(PROJECTED_MESSAGE, Everything())
+    view = MessageViewConverter(Everything, fields="child.color,items.text")(message)
+    assert view == {"child": {"color": "GREEN"}, "items": [{"text": "a"}, {}]}
+
+
+def test_message_view_falls_back(monkeypatch):
+    message = ParseDict(PROJECTED_MESSAGE, Everything())
+    view = MessageViewConverter(Everything)(message)
+
+    def view_list(*args, **kwargs):
+        raise converters._Fallback()
+
+    monkeypatch.setattr(converters, "MessageView", view_list)
+    # nested views are compiled already, so patch the class they are created with
+    monkeypatch.setattr(
+        converters._MessageViewType, "list_fields", lambda *args: view_list()
+    )
+    assert view["items"] == MessageToDict(message)["items"]
+    assert MessageViewConverter(Everything)(message) == MessageToDict(message)
+
+
+def test_get_message_view_converter():
+    test_response = client_tester_pb2.TestResponse
+    converter = get_message_view_converter(test_response, fields="feedback")
+    assert get_message_view_converter(test_response, fields="feedback") is converter
+    message = test_response(average=1.5, feedback="good")
+    assert converter(message) == {"feedback": "good"}
+    converters_by_type = MessageToDictConverters(lazy=True)
+    assert isinstance(converters_by_type.convert(message), MessageView)
@@ -0,0 +1,125 @@
+import asyncio
+
+import grpc
+import pytest
+from grpc_requests.fanout import (
+    ResponseFuture,
+    map_completed,
+    map_completed_async,
+    map_ordered,
+    map_ordered_async,
+)
+
+"""
+Test cases for futures based fan-out
+"""
+
+
+class FakeFuture(grpc.Future):
+    def __init__(self, response):
+        self.response = response
+        self.callbacks = []
+        self.is_done = False
+        self.is_cancelled = False
+
+    def cancel(self):
+        self.is_cancelled = not self.is_done
+        return self.is_cancelled
+
+    def cancelled(self):
+        return self.is_cancelled
+
+    def running(self):
+        return not self.is_done
+
+    def done(self):
+        return self.is_done
+
+    def result(self, timeout=None):
+        return self.response
+
+    def exception(self, timeout=None):
+        return None
+
+    def traceback(self, timeout=None):
+        return None
+
+    def add_done_callback(self, fn):
+        if self.is_done:
+            fn(self)
+        else:
+            self.callbacks.append(fn)
+
+    def end(self):
+        self.is_done = True
+        for callback in self.callbacks:
+            callback(self)
+
+
+def test_response_future():
+    converted = []
+
+    def convert(response):
+        converted.append(response)
+        return response.upper()
+
+    future = ResponseFuture(FakeFuture("response"), convert)
+    assert future.result() == future.result() == "RESPONSE"
+    assert converted == ["response"]
+
+
+def test_map_ordered_cancels_in_flight():
+    calls = []
+
+    def submit(request):
+        calls.append(FakeFuture(request))
+        return ResponseFuture(calls[-1])
+
+    results = map_ordered(submit, range(10), max_in_flight=3)
+    assert next(results) == 0
+    assert len(calls) == 3
+    results.close()
+    assert [call.is_cancelled for call in calls] == [False, True, True]
+
+
+def test_map_completed():
+    calls = []
+
+    def submit(request):
+        calls.append(FakeFuture(request))
+        if request % 2:
+            calls[-1].end()
+        return ResponseFuture(calls[-1])
+
+    results = map_completed(submit, range(4), max_in_flight=2)
+    assert next(results) == (1, 1)
+    calls[0].end()
+    assert next(results) == (0, 0)
+    assert next(results) == (3, 3)
+    calls[2].end()
+    assert list(results) == [(2, 2)]
+    with pytest.raises(ValueError):
+        next(map_completed(submit, range(4), max_in_flight=0))
+
+
+@pytest.mark.asyncio
+async def test_map_async_cancels_in_flight():
+    started = []
+
+    async def call(request):
+        started.append(asyncio.current_task())
+        await asyncio.sleep(0 if request == 0 else 10)
+        return request
+
+    results = map_completed_async(call, range(10), max_in_flight=3)
+    assert await results.__anext__() == (0, 0)
+    await results.aclose()
+    assert len(started) == 3
+    await asyncio.sleep(0)
+    assert [task.cancelled() for task in started] == [False, True, True]
+
+    results = map_ordered_async(call, iter([0, 1]), max_in_flight=1)
+    assert await results.__anext__() == 0
+    await results.aclose()
+    with pytest.raises(ValueError):
+        await map_ordered_async(call, [], max_in_flight=0).__anext__()
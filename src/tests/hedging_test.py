@@ -0,0 +1,111 @@
+import threading
+import time
+
+import grpc
+import pytest
+from grpc_requests.aio import AsyncClient
+from grpc_requests.client import Client, StubClient
+from grpc_requests.hedging import HedgingPolicy
+from tests.test_servers.helloworld.helloworld_pb2 import _GREETER, HelloReply
+from tests.test_servers.helloworld.helloworld_server import Greeter, HelloWorldServer
+
+"""
+Test cases for hedged requests
+"""
+
+
+class SlowFirstGreeter(Greeter):
+    """
+    Answers the first SayHello of every name after a second, and the others at once.
+    """
+
+    def __init__(self):
+        self.names = set()
+        self.lock = threading.Lock()
+
+    def SayHello(self, request, context):
+        with self.lock:
+            first = request.name not in self.names
+            self.names.add(request.name)
+        if first:
+            time.sleep(1)
+        return HelloReply(message=f"Hello, {request.name}!")
+
+
+@pytest.fixture(scope="module")
+def slow_first_server():
+    server = HelloWorldServer("50055", servicer=SlowFirstGreeter())
+    server.server.start()
+    yield "localhost:50055"
+    server.server.stop(None)
+
+
+def test_policy_delay():
+    policy = HedgingPolicy(percentile=50, min_samples=4, min_delay=0.002)
+    assert policy.delay is None
+    for latency in (0.004, 0.001, 0.003):
+        policy.record(latency)
+    assert policy.delay is None
+    policy.record(0.002)
+    assert policy.delay == 0.002
+    policy.record(0.0)
+    assert policy.delay == 0.002
+    # only the latest latencies of the window count
+    policy = HedgingPolicy(percentile=100, window=3, min_samples=1)
+    for latency in (0.005, 0.001, 0.002, 0.001):
+        policy.record(latency)
+    assert policy.delay == 0.002
+    assert list(policy.latencies) == [0.001, 0.002, 0.001]
+    assert HedgingPolicy(delay=0.5, initial_delay=0.1).delay == 0.5
+    assert HedgingPolicy(initial_delay=0.1).delay == 0.1
+    with pytest.raises(ValueError):
+        HedgingPolicy(percentile=0)
+
+
+def test_hedged_request(slow_first_server):
+    client = Client(slow_first_server)
+    policy = client.set_hedging_policy(
+        "helloworld.Greeter", "SayHello", HedgingPolicy(delay=0.05)
+    )
+    start = time.monotonic()
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sync"})
+    assert response == {"message": "Hello, sync!"}
+    assert time.monotonic() - start < 0.9
+    # the second call is answered before the delay
+    client.request("helloworld.Greeter", "SayHello", {"name": "sync"}, timeout=5)
+    assert tuple(policy.stats()) == (2, 1, 1, 0.05)
+    with pytest.raises(ValueError):
+        client.set_hedging_policy(
+            "helloworld.Greeter", "SayHelloGroup", HedgingPolicy(delay=0.05)
+        )
+    client.set_hedging_policy("helloworld.Greeter", "SayHello", None)
+    client.request("helloworld.Greeter", "SayHello", {"name": "sync"})
+    assert policy.stats().calls == 2
+
+
+def test_hedged_request_errors():
+    client = StubClient("localhost:1", [_GREETER])
+    policy = client.set_hedging_policy(
+        "helloworld.Greeter", "SayHello", HedgingPolicy(delay=0.0)
+    )
+    with pytest.raises(grpc.RpcError) as error:
+        client.request("helloworld.Greeter", "SayHello", {"name": "sync"})
+    assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+    assert policy.stats().hedges_won == 0
+    assert len(policy.latencies) == 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_async(slow_first_server):
+    client = AsyncClient(slow_first_server)
+    policy = await client.set_hedging_policy(
+        "helloworld.Greeter", "SayHello", HedgingPolicy(delay=0.05)
+    )
+    start = time.monotonic()
+    response = await client.request(
+        "helloworld.Greeter", "SayHello", {"name": "async"}, timeout=5
+    )
+    assert response == {"message": "Hello, async!"}
+    assert time.monotonic() - start < 0.9
+    await client.request("helloworld.Greeter", "SayHello", {"name": "async"})
+    assert tuple(policy.stats()) == (2, 1, 1, 0.05)
@@ -0,0 +1,162 @@
+import asyncio
+import time
+
+import grpc
+import pytest
+from grpc_requests.aio import AsyncClient
+from grpc_requests.limiter import AdaptiveLimiter, EndpointLimiters, LimitExceededError
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply
+from tests.test_servers.helloworld.helloworld_server import Greeter, HelloWorldServer
+
+"""
+Test cases for the adaptive concurrency limiter
+"""
+
+OK = grpc.StatusCode.OK
+
+
+class SlowGreeter(Greeter):
+    """
+    Answers SayHello after a while.
+    """
+
+    def SayHello(self, request, context):
+        time.sleep(0.2)
+        return HelloReply(message=f"Hello, {request.name}!")
+
+
+@pytest.fixture(scope="module")
+def slow_server():
+    server = HelloWorldServer("50060", servicer=SlowGreeter())
+    server.server.start()
+    yield "localhost:50060"
+    server.server.stop(None)
+
+
+@pytest.mark.asyncio
+async def test_additive_increase():
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=5, latency_tolerance=None)
+    for _ in range(3):
+        await limiter.acquire()
+    limiter.release(0.01, OK)
+    assert limiter.limit == 5
+    limiter.release(0.01, OK)
+    limiter.release(0.01, OK)
+    assert limiter.limit == 5
+    # a call while less than half of the limit is in use does not raise it
+    limiter._limit = 4.0
+    await limiter.acquire()
+    limiter.release(0.01, OK)
+    assert limiter.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_multiplicative_decrease():
+    limiter = AdaptiveLimiter(
+        initial_limit=10, min_limit=8, backoff_ratio=0.5, latency_slack=0.0
+    )
+    await limiter.acquire()
+    limiter.release(None, grpc.StatusCode.UNAVAILABLE)
+    assert limiter.limit == 8
+    limiter._limit = 10.0
+    for latency in (0.01, 0.015, 0.03):
+        await limiter.acquire()
+        limiter.release(latency, OK)
+    # slower than twice the lowest latency
+    assert limiter.limit == 8
+    # errors of the calls themselves do not change the limit
+    await limiter.acquire()
+    limiter.release(0.5, grpc.StatusCode.NOT_FOUND)
+    assert limiter.limit == 8
+
+
+@pytest.mark.asyncio
+async def test_queue():
+    limiter = AdaptiveLimiter(initial_limit=1, max_queue=2, queue_timeout=0.05)
+    await limiter.acquire()
+    waiting = asyncio.ensure_future(limiter.acquire())
+    cancelled = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats() == (1, 1, 2, 0)
+    with pytest.raises(LimitExceededError) as error:
+        await limiter.acquire()
+    assert error.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    cancelled.cancel()
+    await asyncio.gather(cancelled, return_exceptions=True)
+    assert limiter.queue_depth == 1
+    limiter.release()
+    await waiting
+    assert limiter.stats() == (1, 1, 0, 1)
+    with pytest.raises(LimitExceededError):
+        await limiter.acquire()
+    assert limiter.rejected == 2
+
+
+@pytest.mark.asyncio
+async def test_client_limit():
+    limiter = AdaptiveLimiter(initial_limit=2, max_queue=0)
+    client = AsyncClient("localhost:50051", concurrency_limiter=limiter)
+    results = await client.gather(
+        "helloworld.Greeter",
+        "SayHello",
+        [{"name": "sinsky"}] * 10,
+        return_exceptions=True,
+    )
+    assert results[:2] == [{"message": "Hello, sinsky!"}] * 2
+    assert all(isinstance(result, LimitExceededError) for result in results[2:])
+    assert limiter.in_flight == 0
+    assert limiter.rejected == 8
+    # stream response methods are not limited
+    responses = await client.request(
+        "helloworld.Greeter", "SayHelloGroup", {"name": "a b"}
+    )
+    assert [response async for response in responses] == [
+        {"message": "Hello, a!"},
+        {"message": "Hello, b!"},
+    ]
+    with pytest.raises(ValueError):
+        await client.set_concurrency_limiter(
+            "helloworld.Greeter", "SayHelloGroup", AdaptiveLimiter()
+        )
+
+
+@pytest.mark.asyncio
+async def test_per_method_limits():
+    limiter = AdaptiveLimiter(initial_limit=3)
+    client = AsyncClient(
+        "localhost:50051", concurrency_limiter=limiter, per_method_limits=True
+    )
+    say_hello = await client.get_invoker("helloworld.Greeter", "SayHello")
+    hello_everyone = await client.get_invoker("helloworld.Greeter", "HelloEveryone")
+    assert say_hello.limiter is not limiter
+    assert say_hello.limiter is not hello_everyone.limiter
+    assert say_hello.limiter.limit == 3
+    await say_hello({"name": "sinsky"})
+    assert limiter.stats() == (3, 0, 0, 0)
+    own = await client.set_concurrency_limiter(
+        "helloworld.Greeter", "SayHello", AdaptiveLimiter()
+    )
+    assert say_hello.limiter is own
+
+
+@pytest.mark.asyncio
+async def test_endpoint_limits(slow_server):
+    client = AsyncClient(
+        ["localhost:50051", slow_server],
+        concurrency_limiter=AdaptiveLimiter(initial_limit=4, latency_tolerance=None),
+    )
+    assert isinstance(client.endpoint_limiters, EndpointLimiters)
+    # round robin sends every other call to the slow endpoint, where it times out
+    results = await client.gather(
+        "helloworld.Greeter",
+        "SayHello",
+        [{"name": "sinsky"}] * 8,
+        timeout=0.1,
+        return_exceptions=True,
+    )
+    assert results.count({"message": "Hello, sinsky!"}) == 4
+    stats = client.endpoint_limiters.stats()
+    assert stats["localhost:50051"].limit >= 4
+    assert stats[slow_server].limit < 4
+    assert stats[slow_server].in_flight == 0
+    assert client.concurrency_limiter.stats() == (4, 0, 0, 0)
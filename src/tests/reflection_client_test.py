@@ -1,3 +1,5 @@
+from array import array
+import json
 import logging
 
 import grpc
@@ -5,13 +7,24 @@ import pytest
 from google.protobuf import descriptor_pb2, descriptor_pool
 from google.protobuf.descriptor import MethodDescriptor
 from google.protobuf.json_format import ParseError
-from grpc_requests.client import Client, CustomArgumentParsers, MethodType
+from grpc_requests.client import (
+    Client,
+    CustomArgumentParsers,
+    MessageParsers,
+    MethodType,
+    get_by_endpoint,
+    reset_cached_client,
+)
+from grpc_requests.channels import ChannelPool
+from grpc_requests.converters import MessageView
+from grpc_requests.descriptor_cache import DescriptorCache
 from tests.common import MetadataClientInterceptor
 from tests.test_servers.dependencies import (
     dependencies_pb2,
     dependency1_pb2,
     dependency2_pb2,
 )
+from tests.test_servers.helloworld.helloworld_pb2 import HelloReply, HelloRequest
 
 """
 Test cases for reflection based client
@@ -32,7 +45,7 @@ def helloworld_reflection_client():
 @pytest.fixture(scope="module")
 def helloworld_reflection_client_with_interceptor():
     try:
-        # Don't use get_by_endpoint here, because interceptors are not cached. Consider caching kwargs too
+        # Don't use get_by_endpoint here, so the client is not shared with other tests
         client = Client("localhost:50051", interceptors=[MetadataClientInterceptor()])
         yield client
     except:  # noqa: E722
@@ -298,6 +311,25 @@ def test_register_file_descriptors_incomplete_dependencies():
         client.register_file_descriptors(file_descriptors)
 
 
+def test_register_file_descriptors_fetches_missing_dependencies_in_one_batch():
+    client = Client(
+        "localhost:50053", lazy=True, descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    batches = []
+    get_file_descriptors_by_names = client.get_file_descriptors_by_names
+
+    def counting_get_file_descriptors_by_names(names):
+        batches.append(names)
+        return get_file_descriptors_by_names(names)
+
+    client.get_file_descriptors_by_names = counting_get_file_descriptors_by_names
+    proto = descriptor_pb2.FileDescriptorProto()
+    dependencies_pb2.DESCRIPTOR.CopyToProto(proto)
+    client.register_file_descriptors([proto])
+    assert batches == [["dependency1.proto"]]
+    assert client._is_descriptor_registered("dependency2.proto")
+
+
 def test_unary_unary_empty_default(helloworld_empty_reflection_client):
     response = helloworld_empty_reflection_client.request(
         "helloworld.Greeter", "SayHello", {"name": "sinsky"}
@@ -370,3 +402,423 @@ def test_stream_stream_empty_custom(helloworld_empty_reflection_client_custom_pa
     assert all(isinstance(response, dict) for response in responses)
     for response, _ in zip(responses, name_list):
         assert response == {"message": ""}
+
+
+def test_descriptor_cache_written_after_registration(tmp_path):
+    cache = DescriptorCache(tmp_path)
+    Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    file_descriptors = cache.load("localhost:50053")
+    names = [file_descriptor.name for file_descriptor in file_descriptors]
+    assert names.index("dependency2.proto") < names.index("dependency1.proto")
+    assert names.index("dependency1.proto") < names.index("dependencies.proto")
+
+
+def test_descriptor_cache_skips_reflection(tmp_path):
+    cache = DescriptorCache(tmp_path)
+    Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    cache.store("localhost:notaport", cache.load("localhost:50053"))
+    # Connect to not a real server to make sure everything comes from the cache
+    client = Client(
+        "localhost:notaport",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    assert "dependencies.Greeter" in client.service_names
+    meta = client.get_method_meta("dependencies.Greeter", "HasDependencies")
+    assert meta.input_type.DESCRIPTOR.full_name == "dependencies.Dependency1"
+
+
+def test_descriptor_cache_stale(tmp_path):
+    cache = DescriptorCache(tmp_path)
+    Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        descriptor_cache=cache,
+    )
+    assert cache.load("localhost:50053") is not None
+    assert DescriptorCache(tmp_path, max_age=-1).load("localhost:50053") is None
+
+
+def test_get_file_descriptors_by_symbols():
+    client = Client(
+        "localhost:50053", lazy=True, descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    results = client.get_file_descriptors_by_symbols(
+        ["dependencies.Greeter", "dependencies.Dependency2"]
+    )
+    assert results[0][0].name == "dependencies.proto"
+    assert results[1][0].name == "dependency2.proto"
+
+
+def test_registration_uses_single_reflection_stream():
+    client = Client(
+        "localhost:50053", lazy=True, descriptor_pool=descriptor_pool.DescriptorPool()
+    )
+    streams = []
+    server_reflection_info = client.reflection_stub.ServerReflectionInfo
+
+    def counting_server_reflection_info(*args, **kwargs):
+        streams.append(args)
+        return server_reflection_info(*args, **kwargs)
+
+    client.reflection_stub.ServerReflectionInfo = counting_server_reflection_info
+    client.register_all_service()
+    assert len(streams) == 1
+    assert "dependencies.Greeter" in client._service_methods_meta
+
+
+def test_shared_schema_is_reused_between_clients():
+    first = Client(
+        "localhost:50053",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        share_schema=True,
+    )
+    second = Client(
+        "localhost:50053",
+        lazy=True,
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        share_schema=True,
+    )
+    registered = []
+    second.register_file_descriptors = registered.append
+    second.register_all_service()
+    assert registered == []
+
+    first_meta = first.get_method_meta("dependencies.Greeter", "SayHello")
+    second_meta = second.get_method_meta("dependencies.Greeter", "SayHello")
+    assert second_meta.input_type is first_meta.input_type
+    assert second_meta.descriptor is first_meta.descriptor
+    assert second_meta.handler is not first_meta.handler
+    response = second.request("dependencies.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+
+
+def test_lazy_methods_only_builds_invoked_method():
+    client = Client(
+        "localhost:50051",
+        descriptor_pool=descriptor_pool.DescriptorPool(),
+        lazy_methods=True,
+    )
+    methods_meta = client.get_methods_meta("helloworld.Greeter")
+    assert tuple(methods_meta) == (
+        "SayHello",
+        "SayHelloGroup",
+        "HelloEveryone",
+        "SayHelloOneByOne",
+    )
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    assert list(methods_meta._values) == ["SayHello"]
+    assert (
+        client.get_method_meta("helloworld.Greeter", "SayHello")
+        is methods_meta["SayHello"]
+    )
+
+
+def test_get_invoker(helloworld_reflection_client):
+    invoker = helloworld_reflection_client.get_invoker("helloworld.Greeter", "SayHello")
+    assert invoker({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+    assert invoker.method_type == MethodType.UNARY_UNARY
+    assert (
+        helloworld_reflection_client.get_invoker("helloworld.Greeter", "SayHello")
+        is invoker
+    )
+    with pytest.raises(ValueError):
+        helloworld_reflection_client.get_invoker(
+            "helloworld.Greeter", "SayHello", MethodType.STREAM_STREAM
+        )
+
+
+def test_service_client_methods_are_invokers(helloworld_reflection_client):
+    service = helloworld_reflection_client.service("helloworld.Greeter")
+    assert service.SayHello is helloworld_reflection_client.get_invoker(
+        "helloworld.Greeter", "SayHello"
+    )
+    responses = service.SayHelloGroup({"name": "sinsky jack"})
+    assert list(responses) == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+    ]
+    with pytest.raises(AttributeError):
+        service.SayGoodbye  # noqa: B018
+
+
+def test_service_client_reregistered_service():
+    client = Client("localhost:50051")
+    service = client.service("helloworld.Greeter")
+    say_hello = service.SayHello
+    client.register_service("helloworld.Greeter")
+    assert service.SayHello is not say_hello
+    assert service.SayHello is client.get_invoker("helloworld.Greeter", "SayHello")
+    assert service.SayHello({"name": "sinsky"}) == {"message": "Hello, sinsky!"}
+
+
+@pytest.mark.parametrize(
+    "message_parsers",
+    [
+        MessageParsers(compiled_request_parser=True),
+        CustomArgumentParsers(
+            parse_dict_kwargs={"ignore_unknown_fields": True},
+            compiled_request_parser=True,
+        ),
+    ],
+)
+def test_compiled_request_parser(message_parsers):
+    client = Client("localhost:50051", message_parsers=message_parsers)
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    responses = client.request(
+        "helloworld.Greeter", "HelloEveryone", [{"name": "sinsky"}, {"name": "jack"}]
+    )
+    assert responses == {"message": "Hello, sinsky jack!"}
+
+
+def test_compiled_response_parser():
+    client = Client(
+        "localhost:50051",
+        message_parsers=MessageParsers(compiled_response_parser=True),
+    )
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": "Hello, sinsky!"}
+    responses = client.request(
+        "helloworld.Greeter", "SayHelloGroup", {"name": "sinsky jack"}
+    )
+    assert list(responses) == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+    ]
+
+
+def test_compiled_response_parser_custom_arguments():
+    client = Client(
+        "localhost:50054",
+        message_parsers=CustomArgumentParsers(
+            message_to_dict_kwargs={"including_default_value_fields": True},
+            compiled_response_parser=True,
+        ),
+    )
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert response == {"message": ""}
+
+
+def test_response_fields():
+    client = Client(
+        "localhost:50052",
+        message_parsers=CustomArgumentParsers(
+            message_to_dict_kwargs={"including_default_value_fields": True}
+        ),
+    )
+    request = {"readings": [1.0, 2.0]}
+    response = client.request(
+        "client_tester.ClientTester",
+        "TestUnaryUnary",
+        request,
+        response_fields="feedback",
+    )
+    assert response == {"feedback": "Acceptable"}
+    responses = client.unary_stream(
+        "client_tester.ClientTester",
+        "TestUnaryStream",
+        request,
+        response_fields=["feedback"],
+    )
+    assert list(responses) == [{"feedback": "Acceptable"}] * 2
+    assert client.request("client_tester.ClientTester", "TestUnaryUnary", request) == {
+        "average": 0.0,
+        "feedback": "Acceptable",
+    }
+
+
+def test_method_response_fields():
+    client = Client("localhost:50051")
+    service = client.service("helloworld.Greeter")
+    service.SayHelloGroup.response_fields = "message"
+    responses = service.SayHelloGroup({"name": "sinsky jack"})
+    assert list(responses) == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+    ]
+    with pytest.raises(ValueError):
+        client.request(
+            "helloworld.Greeter",
+            "SayHello",
+            {"name": "sinsky"},
+            response_fields="message.text",
+        )
+
+
+def test_lazy_response_parser():
+    client = Client(
+        "localhost:50051",
+        message_parsers=MessageParsers(lazy_response_parser=True),
+    )
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+    assert isinstance(response, MessageView)
+    assert response == {"message": "Hello, sinsky!"}
+    assert json.dumps(response) == '{"message": "Hello, sinsky!"}'
+    responses = client.request(
+        "helloworld.Greeter", "SayHelloGroup", {"name": "sinsky jack"}
+    )
+    assert list(responses) == [
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, jack!"},
+    ]
+
+
+def test_raw_bytes_client():
+    client = Client("localhost:50051", raw_bytes=True)
+    request = HelloRequest(name="sinsky").SerializeToString()
+    response = client.request("helloworld.Greeter", "SayHello", request)
+    assert HelloReply.FromString(response) == HelloReply(message="Hello, sinsky!")
+    response = client.request("helloworld.Greeter", "SayHello", memoryview(request))
+    assert HelloReply.FromString(response).message == "Hello, sinsky!"
+    responses = client.request(
+        "helloworld.Greeter",
+        "SayHelloOneByOne",
+        [HelloRequest(name=name).SerializeToString() for name in ("sinsky", "jack")],
+    )
+    assert [HelloReply.FromString(response).message for response in responses] == [
+        "Hello sinsky",
+        "Hello jack",
+    ]
+    with pytest.raises(ValueError):
+        client.request("helloworld.Greeter", "SayHello", request, raw_bytes=False)
+
+
+def test_raw_bytes_request():
+    client = Client("localhost:50051")
+    names = [HelloRequest(name=name).SerializeToString() for name in ("sinsky", "jack")]
+    response = client.request(
+        "helloworld.Greeter", "HelloEveryone", names, raw_bytes=True
+    )
+    assert HelloReply.FromString(response).message == "Hello, sinsky jack!"
+    response = client.request(
+        "helloworld.Greeter", "SayHello", {"name": "sinsky"}, raw_bytes=False
+    )
+    assert response == {"message": "Hello, sinsky!"}
+
+
+def test_request_template():
+    client = Client("localhost:50051")
+    template = client.set_request_template(
+        "helloworld.Greeter", "SayHello", {"name": "sinsky"}
+    )
+    assert template.message == HelloRequest(name="sinsky")
+    assert client.request("helloworld.Greeter", "SayHello") == {
+        "message": "Hello, sinsky!"
+    }
+    assert client.request("helloworld.Greeter", "SayHello", {"name": "jack"}) == {
+        "message": "Hello, jack!"
+    }
+    service = client.service("helloworld.Greeter")
+    service.set_request_template("HelloEveryone", HelloRequest(name="harry"))
+    assert service.HelloEveryone([None, {"name": "jack"}]) == {
+        "message": "Hello, harry jack!"
+    }
+    assert client.set_request_template("helloworld.Greeter", "SayHello", None) is None
+    assert client.request("helloworld.Greeter", "SayHello", {}) == {
+        "message": "Hello, !"
+    }
+
+
+def test_collect_columns():
+    client = Client("localhost:50052")
+    batches = client.collect_columns(
+        "client_tester.ClientTester",
+        "TestUnaryStream",
+        ["average", "feedback"],
+        {"readings": [1.0, 2.0, 3.0]},
+        batch_size=2,
+        use_numpy=False,
+    )
+    assert list(batches) == [
+        {"average": array("d", [0.0, 0.0]), "feedback": ["Acceptable"] * 2},
+        {"average": array("d", [0.0]), "feedback": ["Acceptable"]},
+    ]
+    with pytest.raises(ValueError):
+        client.collect_columns(
+            "client_tester.ClientTester", "TestUnaryUnary", "average"
+        )
+
+
+def test_channel_pool():
+    client = Client(
+        "localhost:50051", channel_pool_size=3, channel_picker="least_outstanding"
+    )
+    assert isinstance(client.channel, ChannelPool)
+    assert len(client.channel.channels) == 3
+    greeter_service = client.service("helloworld.Greeter")
+    assert [greeter_service.SayHello({"name": "sinsky"}) for _ in range(4)] == [
+        {"message": "Hello, sinsky!"}
+    ] * 4
+    responses = client.request("helloworld.Greeter", "SayHelloGroup", {"name": "a b"})
+    assert list(responses) == [{"message": "Hello, a!"}, {"message": "Hello, b!"}]
+    assert client.channel.outstanding == [0, 0, 0]
+    with pytest.raises(ValueError):
+        Client("localhost:50051", channel_pool_size=0)
+
+
+def test_get_by_endpoint_options():
+    client = get_by_endpoint("localhost:50051")
+    assert Client.get_by_endpoint("localhost:50051") is client
+    options = [("grpc.max_receive_message_length", 1024 * 1024)]
+    optioned = get_by_endpoint("localhost:50051", channel_options=options)
+    assert optioned is not client
+    assert get_by_endpoint("localhost:50051", channel_options=list(options)) is optioned
+    assert optioned.request("helloworld.Greeter", "SayHello", {"name": "sinsky"}) == {
+        "message": "Hello, sinsky!"
+    }
+    reset_cached_client("localhost:50051")
+    assert get_by_endpoint("localhost:50051") is not client
+
+
+def test_request_future(helloworld_reflection_client):
+    client = helloworld_reflection_client
+    future = client.request_future(
+        "helloworld.Greeter", "SayHello", {"name": "sinsky"}, timeout=10
+    )
+    assert future.result() == {"message": "Hello, sinsky!"}
+    assert future.done() and future.call.code() == grpc.StatusCode.OK
+    future = client.request_future(
+        "helloworld.Greeter", "HelloEveryone", iter([{"name": "a"}, {"name": "b"}])
+    )
+    assert future.result() == {"message": "Hello, a b!"}
+    raw_future = client.request_future(
+        "helloworld.Greeter",
+        "SayHello",
+        HelloRequest(name="sinsky").SerializeToString(),
+        raw_bytes=True,
+    )
+    assert HelloReply.FromString(raw_future.result()).message == "Hello, sinsky!"
+    with pytest.raises(ValueError):
+        client.request_future("helloworld.Greeter", "SayHelloGroup", {"name": "a"})
+
+
+def test_map(helloworld_reflection_client):
+    client = helloworld_reflection_client
+    requests = ({"name": f"name{i}"} for i in range(20))
+    responses = client.map("helloworld.Greeter", "SayHello", requests, max_in_flight=4)
+    assert list(responses) == [{"message": f"Hello, name{i}!"} for i in range(20)]
+    pairs = client.map(
+        "helloworld.Greeter",
+        "SayHello",
+        [{"name": f"name{i}"} for i in range(20)],
+        max_in_flight=4,
+        ordered=False,
+        raw_output=True,
+    )
+    assert sorted((index, response.message) for index, response in pairs) == [
+        (i, f"Hello, name{i}!") for i in range(20)
+    ]
+    with pytest.raises(ValueError):
+        list(client.map("helloworld.Greeter", "SayHello", [{}], max_in_flight=0))
+    with pytest.raises(ValueError):
+        client.map("helloworld.Greeter", "SayHelloGroup", [{"name": "a"}])
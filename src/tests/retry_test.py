@@ -0,0 +1,141 @@
+import threading
+import time
+
+import grpc
+import pytest
+from grpc_requests.aio import AsyncClient, StubAsyncClient
+from grpc_requests.client import Client, StubClient
+from grpc_requests.retry import RetryBudget, RetryPolicy
+from tests.test_servers.helloworld.helloworld_pb2 import _GREETER, HelloReply
+from tests.test_servers.helloworld.helloworld_server import Greeter, HelloWorldServer
+
+"""
+Test cases for retried requests
+"""
+
+
+class FlakyGreeter(Greeter):
+    """
+    Fails the first SayHello of every name as UNAVAILABLE, and answers the others.
+    """
+
+    def __init__(self):
+        self.names = set()
+        self.lock = threading.Lock()
+
+    def SayHello(self, request, context):
+        with self.lock:
+            first = request.name not in self.names
+            self.names.add(request.name)
+        if first:
+            context.abort(grpc.StatusCode.UNAVAILABLE, "try again")
+        return HelloReply(message=f"Hello, {request.name}!")
+
+
+@pytest.fixture(scope="module")
+def flaky_server():
+    server = HelloWorldServer("50056", servicer=FlakyGreeter())
+    server.server.start()
+    yield "localhost:50056"
+    server.server.stop(None)
+
+
+def test_budget():
+    budget = RetryBudget(ratio=0.5, max_tokens=2)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
+    with pytest.raises(ValueError):
+        RetryBudget(ratio=-1)
+
+
+def test_backoff():
+    policy = RetryPolicy(initial_backoff=0.1, max_backoff=0.3, backoff_multiplier=2)
+    for _ in range(100):
+        assert 0 <= policy.backoff(1) <= 0.1
+        assert 0 <= policy.backoff(2) <= 0.2
+        assert 0 <= policy.backoff(5) <= 0.3
+    with pytest.raises(ValueError):
+        RetryPolicy(max_attempts=0)
+
+
+def test_retried_request(flaky_server):
+    client = Client(flaky_server, retry_policy=RetryPolicy(initial_backoff=0.01))
+    response = client.request("helloworld.Greeter", "SayHello", {"name": "sync"})
+    assert response == {"message": "Hello, sync!"}
+    stats = client.retry_policy.stats()
+    assert (stats.calls, stats.retries, stats.throttled) == (1, 1, 0)
+    # stream methods are not retried
+    assert client.get_invoker("helloworld.Greeter", "SayHelloGroup").retry is None
+    with pytest.raises(ValueError):
+        client.set_retry_policy("helloworld.Greeter", "SayHelloGroup", RetryPolicy())
+    client.set_retry_policy("helloworld.Greeter", "SayHello", None)
+    with pytest.raises(grpc.RpcError) as error:
+        client.request("helloworld.Greeter", "SayHello", {"name": "sync once"})
+    assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+
+
+def test_retry_limits():
+    client = StubClient("localhost:1", [_GREETER])
+    policy = client.set_retry_policy(
+        "helloworld.Greeter",
+        "SayHello",
+        RetryPolicy(
+            max_attempts=4,
+            initial_backoff=0.001,
+            budget=RetryBudget(ratio=0.0, max_tokens=5),
+        ),
+    )
+    with pytest.raises(grpc.RpcError) as error:
+        client.request("helloworld.Greeter", "SayHello", {"name": "sync"})
+    assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+    assert tuple(policy.stats()) == (1, 3, 0, 2)
+    # the second call has two retries left in the budget, the third none
+    for _ in range(2):
+        with pytest.raises(grpc.RpcError):
+            client.request("helloworld.Greeter", "SayHello", {"name": "sync"})
+    assert tuple(policy.stats()) == (3, 5, 2, 0)
+
+
+def test_retry_deadline():
+    client = StubClient("localhost:1", [_GREETER])
+    policy = client.set_retry_policy(
+        "helloworld.Greeter",
+        "SayHello",
+        RetryPolicy(max_attempts=100, initial_backoff=0.05, max_backoff=0.05),
+    )
+    start = time.monotonic()
+    with pytest.raises(grpc.RpcError):
+        client.request("helloworld.Greeter", "SayHello", {"name": "sync"}, timeout=0.3)
+    assert time.monotonic() - start < 0.5
+    assert 0 < policy.stats().retries < 99
+
+
+@pytest.mark.asyncio
+async def test_retried_request_async(flaky_server):
+    client = AsyncClient(flaky_server)
+    policy = await client.set_retry_policy(
+        "helloworld.Greeter", "SayHello", RetryPolicy(initial_backoff=0.01)
+    )
+    response = await client.request(
+        "helloworld.Greeter", "SayHello", {"name": "async"}, timeout=5
+    )
+    assert response == {"message": "Hello, async!"}
+    assert tuple(policy.stats())[:3] == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_retry_limits_async():
+    policy = RetryPolicy(max_attempts=3, initial_backoff=0.001)
+    client = StubAsyncClient("localhost:1", [_GREETER], retry_policy=policy)
+    with pytest.raises(grpc.RpcError) as error:
+        await client.request("helloworld.Greeter", "SayHello", {"name": "async"})
+    assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+    assert tuple(policy.stats())[:3] == (1, 2, 0)
@@ -1,4 +1,6 @@
 import logging
+
+import grpc
 import pytest
 
 from grpc_requests.client import StubClient
@@ -79,3 +81,40 @@ def test_stream_stream(helloworld_stub_client):
     assert all(isinstance(response, dict) for response in responses)
     for response, name in zip(responses, name_list):
         assert response == {"message": f"Hello, {name}!"}
+
+
+def test_multiple_endpoints():
+    # the second endpoint has no server, its calls fail with UNAVAILABLE
+    client = StubClient(
+        ["localhost:50051", "localhost:1"], [_GREETER], eject_after_unavailable=1
+    )
+
+    def say_hello():
+        try:
+            return client.request("helloworld.Greeter", "SayHello", {"name": "sinsky"})
+        except grpc.RpcError as e:
+            return e.code()
+
+    assert [say_hello() for _ in range(5)] == [
+        {"message": "Hello, sinsky!"},
+        grpc.StatusCode.UNAVAILABLE,
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, sinsky!"},
+        {"message": "Hello, sinsky!"},
+    ]
+    assert client.endpoints == ["localhost:50051", "localhost:1"]
+    assert client.channel.ejected == [1]
+    assert client.channel.outstanding == [0, 0]
+
+
+def test_map_errors():
+    client = StubClient("localhost:1", [_GREETER])
+    results = client.map(
+        "helloworld.Greeter",
+        "SayHello",
+        [{"name": "sinsky"}] * 3,
+        return_exceptions=True,
+    )
+    assert [error.code() for error in results] == [grpc.StatusCode.UNAVAILABLE] * 3
+    with pytest.raises(grpc.RpcError):
+        list(client.map("helloworld.Greeter", "SayHello", [{"name": "sinsky"}]))
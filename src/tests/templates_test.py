@@ -0,0 +1,79 @@
+import pytest
+from google.protobuf.json_format import ParseDict
+from grpc_requests.client import MessageParsers
+from grpc_requests.templates import RequestTemplate, build_request_template
+from tests.test_servers.client_tester import client_tester_pb2
+from tests.test_servers.helloworld.helloworld_pb2 import HelloRequest
+
+"""
+Test cases for request templates
+"""
+
+RequestMessage = client_tester_pb2.TestRequest
+
+TEMPLATE = {
+    "factor": 2,
+    "readings": [1.5, 2.5],
+    "uuid": 7,
+    "request_name": "template",
+    "extra_data": ["YQ=="],
+}
+
+
+@pytest.fixture
+def template():
+    return RequestTemplate(ParseDict(TEMPLATE, RequestMessage()))
+
+
+@pytest.mark.parametrize(
+    "delta, expected",
+    [
+        (None, TEMPLATE),
+        ({}, TEMPLATE),
+        ({"factor": 3}, {**TEMPLATE, "factor": 3}),
+        (
+            {"factor": 0, "sampleFlag": True},
+            {**TEMPLATE, "factor": 0, "sample_flag": True},
+        ),
+        ({"readings": [3.5]}, {**TEMPLATE, "readings": [3.5]}),
+        ({"request_name": None}, {**TEMPLATE, "request_name": ""}),
+    ],
+)
+def test_build(template, delta, expected):
+    assert template.build(delta) == ParseDict(expected, RequestMessage())
+    assert template.message == ParseDict(TEMPLATE, RequestMessage())
+
+
+def test_build_message_delta(template):
+    request = template.build(RequestMessage(factor=3, readings=[3.5]))
+    assert request == ParseDict(
+        {**TEMPLATE, "factor": 3, "readings": [1.5, 2.5, 3.5]}, RequestMessage()
+    )
+
+
+def test_build_returns_copies(template):
+    request = template.build()
+    request.factor = 10
+    assert template.build().factor == 2
+
+
+def test_parse_dict_kwargs():
+    template = RequestTemplate(RequestMessage(), {"ignore_unknown_fields": True})
+    assert template.build({"factor": 3, "unknown": 1}) == RequestMessage(factor=3)
+
+
+def test_parse_stream_requests(template):
+    requests = template.parse_stream_requests([{"factor": 3}, None], RequestMessage)
+    assert [request.factor for request in requests] == [3, 2]
+
+
+def test_build_request_template():
+    parse_request_data = MessageParsers().parse_request_data
+    template = build_request_template(TEMPLATE, RequestMessage, parse_request_data)
+    assert template.message == ParseDict(TEMPLATE, RequestMessage())
+    message = RequestMessage(factor=4)
+    template = build_request_template(message, RequestMessage, parse_request_data)
+    message.factor = 5
+    assert template.build().factor == 4
+    with pytest.raises(ValueError):
+        build_request_template(HelloRequest(), RequestMessage, parse_request_data)